@@ -0,0 +1,71 @@
+import os
+from pathlib import Path
+
+from manifest import hash_file, stat_signature
+
+
+FINGERPRINT_LENGTH = 8      # Hex digits of the content hash put in fingerprinted names, e.g. 'rivendell.3f2a9c8d.png'
+
+
+def fingerprinted_name(name, digest):                           ## Inserts a content hash before a file name's extension: 'a.png' -> 'a.3f2a9c8d.png'
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+class AssetIndex:                                               ## The content hash of every static file, and the output name and URL it gets
+    def __init__(self, static_dir_path, fingerprint=False, dedupe=False):
+        self.static = static_dir_path                           # Directory the static files come from
+        self.fingerprint = fingerprint                          # Whether outputs are named after their content,
+        self.dedupe = dedupe                                    #   and whether files with the same content are stored once
+        self.digests = {}                                       # Static file -> SHA-256 of its contents
+        self.outputs = {}                                       # Static file -> its output path, relative to the output directory
+        self.urls = {}                                          # Root-relative URL of a static file -> the URL it's served at
+        self.first = {}                                         # Content digest -> the first static file with that content
+
+    @classmethod
+    def scan(cls, static_dir_path, manifest=None, fingerprint=False, dedupe=False):     ## Hashes every static file, reusing the previous build's hashes of files whose `stat` is unchanged
+        index = cls(static_dir_path, fingerprint, dedupe)
+        known = {}                                              # Static file -> (signature, digest) recorded by the previous build
+        if manifest is not None:
+            for entry in manifest.entries.values():
+                inputs = entry.get("inputs")
+                if inputs is not None and entry["source"] in inputs:
+                    known[entry["source"]] = (inputs[entry["source"]], entry["digest"])
+        for from_path in _walk(static_dir_path):
+            signature, digest = known.get(from_path, (None, None))
+            if signature is None or signature != stat_signature(from_path):
+                digest = hash_file(from_path)
+            index.add(from_path, digest)
+        return index
+
+    def add(self, from_path, digest):                           ## Adds a static file with the given content digest
+        relative_path = Path(os.path.relpath(from_path, self.static)).as_posix()
+        output = relative_path
+        if self.fingerprint:                                    # 'images/a.png' is served as 'images/a.3f2a9c8d.png'
+            directory, name = os.path.split(relative_path)
+            output = Path(directory, fingerprinted_name(name, digest)).as_posix()
+            self.urls["/" + relative_path] = "/" + output
+        self.digests[from_path] = digest
+        self.outputs[from_path] = output
+        self.first.setdefault(digest, from_path)
+
+    def output_name(self, from_path):                           ## File name of a static file's output
+        return os.path.basename(self.outputs[from_path])
+
+    def original(self, from_path):                              ## The earlier static file with the same contents, if duplicates are stored once
+        first = self.first[self.digests[from_path]]
+        if not self.dedupe or first == from_path:
+            return None
+        return first
+
+
+def _walk(dir_path):                                            ## Yields every file under 'dir_path', in the order the static copy visits them
+    if not os.path.isdir(dir_path):
+        return
+    with os.scandir(dir_path) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_file():
+            yield entry.path
+        else:
+            yield from _walk(entry.path)
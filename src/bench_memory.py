@@ -0,0 +1,97 @@
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import htmlnode
+import inline_markdown
+import markdown_blocks
+import textnode
+
+
+class DictTextNode(textnode.TextNode):          ## The node classes as they were before __slots__: subclasses without
+    pass                                        ##   __slots__ of their own get a per-instance __dict__ again
+
+
+class DictLeafNode(htmlnode.LeafNode):
+    pass
+
+
+class DictParentNode(htmlnode.ParentNode):
+    pass
+
+
+def generate_document(paragraphs, list_items):                          ## Builds a large markdown document with inline-heavy paragraphs and long lists
+    blocks = ["# Memory benchmark"]
+    for i in range(paragraphs):                                         # Paragraphs full of inline fragments,
+        blocks.append(
+            f"Paragraph {i} has **bold {i}**, _italic {i}_, `code {i}`, "
+            f"a [link](/pages/{i}) and an ![image](/images/{i}.png) in it."
+        )
+    blocks.append("\n".join(f"- item **{i}** with a [link](/items/{i})" for i in range(list_items)))    # a long unordered list,
+    blocks.append("\n".join(f"{i}. step _{i}_" for i in range(1, list_items + 1)))                      #   and a long ordered list
+    return "\n\n".join(blocks)
+
+
+def count_nodes(node):                                                  ## Counts the HTML nodes in a tree (without recursion)
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
+
+
+def node_size(node):                                                    ## Bytes used by a node object itself, including its __dict__ if it has one
+    size = sys.getsizeof(node)
+    if hasattr(node, "__dict__"):
+        size += sys.getsizeof(node.__dict__)
+    return size
+
+
+def use_classes(text_node_class, leaf_node_class, parent_node_class):  ## Points the parser at the given node classes
+    inline_markdown.TextNode = text_node_class
+    markdown_blocks.TextNode = text_node_class
+    textnode.LeafNode = leaf_node_class
+    markdown_blocks.ParentNode = parent_node_class
+
+
+def measure(label, markdown):                                           ## Parses 'markdown' and reports node sizes and peak memory
+    gc.collect()
+    tracemalloc.start()
+    tree = markdown_blocks.markdown_to_html_node(markdown)
+    text_nodes = inline_markdown.text_to_textnodes(markdown.split("\n\n")[1])
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nodes = count_nodes(tree)
+    leaf = tree.children[1].children[0]
+    print(f"{label}:")
+    print(f"  HTML nodes in tree:     {nodes}")
+    print(f"  bytes per TextNode:     {node_size(text_nodes[0])}")
+    print(f"  bytes per LeafNode:     {node_size(leaf)}")
+    print(f"  bytes per ParentNode:   {node_size(tree)}")
+    print(f"  tree memory per node:   {current / nodes:.1f} bytes")
+    print(f"  peak memory:            {peak / (1 << 20):.2f} MiB")
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare node memory with and without __slots__.")
+    parser.add_argument("--paragraphs", type=int, default=20000, help="paragraphs in the generated document")
+    parser.add_argument("--list-items", type=int, default=20000, help="items in each generated list")
+    args = parser.parse_args()
+
+    markdown = generate_document(args.paragraphs, args.list_items)
+    print(f"Document: {len(markdown) / (1 << 20):.2f} MiB of markdown")
+
+    use_classes(DictTextNode, DictLeafNode, DictParentNode)             # Before: dict-backed nodes
+    before = measure("before (dict-backed nodes)", markdown)
+    use_classes(textnode.TextNode, htmlnode.LeafNode, htmlnode.ParentNode)  # After: the real, slot-based nodes
+    after = measure("after (__slots__ nodes)", markdown)
+    print(f"Peak memory saved: {(1 - after / before) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from gencontent import collect_pages, extract_title, generate_pages
+from inline_markdown import text_to_textnodes
+from markdown_blocks import BlockType, block_to_block_type, markdown_to_blocks, markdown_to_html_node
+from templates import CompiledTemplate
+from textnode import text_node_to_html_node
+
+
+WORDS = (                                                               ## Vocabulary the synthetic pages are written in
+    "the", "ring", "of", "power", "elves", "and", "men", "journey", "through", "middle",
+    "earth", "shadow", "fell", "upon", "road", "went", "ever", "on", "hobbit", "wizard",
+    "river", "mountain", "forest", "ancient", "tale", "song", "light", "dark", "king", "return",
+)
+
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <title> {{ Title }} </title>
+    <link href="/index.css" rel="stylesheet">
+</head>
+<body>
+    <article>
+        {{ Content }}
+    </article>
+</body>
+</html>
+"""
+
+
+class CorpusGenerator:                                                  ## Builds a deterministic set of synthetic markdown pages for benchmarking
+    def __init__(self, seed=0):
+        self.random = random.Random(seed)                               # Seeded, so the same options always produce the same corpus
+
+    def words(self, count):                                             ## A run of 'count' random words
+        return " ".join(self.random.choice(WORDS) for _ in range(count))
+
+    def inline(self, count):                                            ## Text of roughly 'count' words with inline markup sprinkled in
+        parts = []
+        for _ in range(0, count, 8):
+            kind = self.random.randrange(6)
+            if kind == 0:
+                parts.append(f"**{self.words(2)}**")
+            elif kind == 1:
+                parts.append(f"_{self.words(2)}_")
+            elif kind == 2:
+                parts.append(f"`{self.words(1)}`")
+            elif kind == 3:
+                parts.append(f"[{self.words(2)}](/pages/{self.random.randrange(1000)})")
+            parts.append(self.words(7))
+        return " ".join(parts)
+
+    def links(self, count):                                             ## A link-heavy paragraph with 'count' links and images
+        parts = []
+        for i in range(count):
+            if i % 5 == 0:
+                parts.append(f"![{self.words(2)}](/images/{i}.png)")
+            else:
+                parts.append(f"[{self.words(2)}](https://example.com/{i})")
+            parts.append(self.words(3))
+        return " ".join(parts)
+
+    def page(self, index, paragraphs=20, list_items=200, code_lines=200, links=200):   ## One page mixing every block type
+        blocks = [f"# Page {index}: {self.words(4)}"]
+        for i in range(paragraphs):                                     # Long paragraphs spanning several lines,
+            blocks.append("\n".join(self.inline(40) for _ in range(4)))
+            if i % 5 == 0:
+                blocks.append(f"## {self.words(3)}")
+        blocks.append(self.links(links))                                #   a link-heavy paragraph,
+        blocks.append("\n".join(f"- {self.inline(12)}" for _ in range(list_items)))         # huge lists,
+        blocks.append("\n".join(f"{i}. {self.inline(12)}" for i in range(1, list_items + 1)))
+        blocks.append("\n".join(f"> {self.inline(16)}" for _ in range(5)))
+        code = "\n".join(f"print({self.random.randrange(10 ** 6)})  # {self.words(5)}" for _ in range(code_lines))
+        blocks.append(f"```\n{code}\n```")                              #   and a big code block
+        return "\n\n".join(blocks)
+
+    def corpus(self, pages, **options):                                 ## {relative path: markdown} for 'pages' pages, spread over sections
+        return {
+            os.path.join(f"section-{index % 10}", f"page-{index}", "index.md"): self.page(index, **options)
+            for index in range(pages)
+        }
+
+
+def write_corpus(corpus, dir_path):                                     ## Writes a corpus as a content directory
+    for relative_path, markdown in corpus.items():
+        path = os.path.join(dir_path, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(markdown)
+
+
+def inline_texts(block):                                                ## The inline text of a block, roughly as the block handlers pass it on
+    block_type = block_to_block_type(block)
+    if block_type == BlockType.CODE:                                    # Code blocks aren't parsed for inline markdown
+        return []
+    if block_type in (BlockType.ULIST, BlockType.OLIST):                # Each list item is parsed on its own
+        return [line.split(" ", 1)[1] for line in block.split("\n")]
+    return [block.replace("\n", " ")]
+
+
+def best_of(repeat, function):                                          ## Runs 'function' 'repeat' times, returning the fastest wall time in seconds
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run_benchmarks(corpus, repeat=3):                                   ## Times every stage of the pipeline over the corpus, returning {stage: seconds}
+    pages = list(corpus.values())
+    blocks = [block for markdown in pages for block in markdown_to_blocks(markdown)]
+    texts = [text for block in blocks for text in inline_texts(block)]
+    text_nodes = [node for text in texts for node in text_to_textnodes(text)]
+    trees = [markdown_to_html_node(markdown) for markdown in pages]
+    bodies = [tree.to_html() for tree in trees]
+    titles = [extract_title(markdown) for markdown in pages]
+    template = CompiledTemplate(TEMPLATE, "/")
+    filled = [template.render(Title=title, Content=body) for title, body in zip(titles, bodies)]
+
+    results = {}
+    results["markdown_to_blocks"] = best_of(repeat, lambda: [markdown_to_blocks(markdown) for markdown in pages])
+    results["block_to_block_type"] = best_of(repeat, lambda: [block_to_block_type(block) for block in blocks])
+    results["text_to_textnodes"] = best_of(repeat, lambda: [text_to_textnodes(text) for text in texts])
+    results["text_node_to_html_node"] = best_of(repeat, lambda: [text_node_to_html_node(node) for node in text_nodes])
+    results["to_html"] = best_of(repeat, lambda: [tree.to_html() for tree in trees])
+    results["template_fill"] = best_of(repeat, lambda: [
+        template.render(Title=title, Content=body) for title, body in zip(titles, bodies)
+    ])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def write_files():                                              # Writing the finished pages to disk
+            for index, page in enumerate(filled):
+                with open(os.path.join(tmp, f"{index}.html"), "w") as file:
+                    file.write(page)
+        results["file_write"] = best_of(repeat, write_files)
+
+        content = os.path.join(tmp, "content")                          # The full build: read, parse, render and write every page
+        template_path = os.path.join(tmp, "template.html")
+        write_corpus(corpus, content)
+        with open(template_path, "w") as file:
+            file.write(TEMPLATE)
+        site_pages = collect_pages(content, os.path.join(tmp, "docs"))
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):     # Keep the per-page progress lines out of the results
+            results["full_build"] = best_of(repeat, lambda: generate_pages(site_pages, template_path, "/"))
+    return results
+
+
+def compare(results, baseline, threshold):                              ## Lists the stages that got slower than the baseline by more than 'threshold'
+    regressions = []
+    for stage, seconds in results.items():
+        before = baseline.get(stage)
+        if before and seconds > before * (1 + threshold):
+            regressions.append((stage, before, seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the site generator on a synthetic corpus.")
+    parser.add_argument("--pages", type=int, default=50, help="pages in the corpus (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the corpus generator (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is kept (default: %(default)s)")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against results saved with --output")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown that counts as a regression, as a fraction (default: %(default)s)")
+    parser.add_argument("--write-corpus", metavar="DIR", help="only write the corpus to DIR as a content directory")
+    args = parser.parse_args()
+
+    corpus = CorpusGenerator(args.seed).corpus(args.pages)
+    if args.write_corpus:
+        write_corpus(corpus, args.write_corpus)
+        print(f"Wrote {len(corpus)} pages to {args.write_corpus}")
+        return 0
+
+    stages = run_benchmarks(corpus, args.repeat)
+    report = {
+        "pages": args.pages,
+        "seed": args.seed,
+        "markdown_bytes": sum(len(markdown) for markdown in corpus.values()),
+        "python": sys.version.split()[0],
+        "stages": stages,
+    }
+    for stage, seconds in stages.items():
+        print(f"{stage:24} {seconds * 1000:10.2f} ms")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(stages, baseline["stages"], args.threshold)
+        for stage, before, after in regressions:
+            print(f"REGRESSION {stage}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({after / before - 1:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
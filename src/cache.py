@@ -0,0 +1,47 @@
+from collections import OrderedDict
+
+
+class LRUCache:                                                 ## A bounded mapping that evicts the least recently used entry, counting hits, misses and evictions
+    def __init__(self, maxsize):
+        self.maxsize = maxsize                                  # Most entries held at once
+        self.entries = OrderedDict()                            # Key -> value, least recently used first
+        self.hits = 0                                           # Lookups that found their key,
+        self.misses = 0                                         #   lookups that didn't,
+        self.evictions = 0                                      #   and entries dropped to make room
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):                           ## The value for 'key' (marking it as recently used), or 'default'
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):                                  ## Stores 'value' under 'key', evicting the least recently used entry if full
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):                                            ## Drops every entry (the counters are kept)
+        self.entries.clear()
+
+    def stats(self):                                            ## The counters, as a tuple that can be sent between processes
+        return (self.hits, self.misses, self.evictions)
+
+    def add_stats(self, stats):                                 ## Adds counters from another cache, e.g. a worker process's copy of this one
+        hits, misses, evictions = stats
+        self.hits += hits
+        self.misses += misses
+        self.evictions += evictions
+
+    def summary(self):                                          ## One line describing how well the cache did
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.1%} hit rate), {self.evictions} evictions (size {self.maxsize})"
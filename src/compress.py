@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from publish import atomic_open
+
+try:
+    import brotli                                           # Brotli siblings are only written when the optional `brotli` package is installed
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".htm", ".css", ".js", ".mjs", ".json", ".xml", ".svg", ".txt", ".md", ".map"}
+DEFAULT_MIN_SIZE = 1024                                     # Files smaller than this (1 KiB) gain too little to be worth a sibling
+
+
+def available_suffixes():                                   ## The sibling files written for each output: '.gz', and '.br' when brotli is installed
+    return (".gz", ".br") if brotli is not None else (".gz",)
+
+
+def is_compressible(path):                                  ## True if 'path' is a text file worth pre-compressing (images and fonts already are compressed)
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def compress_bytes(data, suffix):                           ## Compresses 'data' for the sibling with the given suffix, at the highest level
+    if suffix == ".gz":
+        return gzip.compress(data, compresslevel=9, mtime=0)    # A fixed timestamp keeps the output deterministic
+    return brotli.compress(data, quality=11)
+
+
+def sibling_paths(dest_path, suffixes):                     ## The compressed siblings of an output, e.g. 'index.html.gz'
+    return [dest_path + suffix for suffix in suffixes]
+
+
+def remove_siblings(dest_path, suffixes):                   ## Deletes the compressed siblings of an output that exist
+    for path in sibling_paths(dest_path, suffixes):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def compress_outputs(manifest, enabled=True, min_size=DEFAULT_MIN_SIZE, threads=None):  ## Brings the compressed siblings of every output of the build up to date
+    stats = CompressStats()
+    suffixes = list(available_suffixes()) if enabled else []
+    tasks = []
+    for key, entry in sorted(manifest.current.items()):    # Each output's manifest entry records the siblings written for it:
+        dest_path = os.path.join(manifest.root, key)
+        recorded = entry.get("compressed") or (manifest.entries.get(key) or {}).get("compressed")
+        if not suffixes and recorded is None:               #   kept from the previous build, or (for an output built again) the previous entry's
+            continue
+        try:
+            dest_stat = os.stat(dest_path)
+        except FileNotFoundError:
+            continue
+        wanted = suffixes if is_compressible(key) and dest_stat.st_size >= min_size else []
+        if not wanted:                                      # Outputs that shouldn't have siblings (any more) lose them
+            if recorded is not None:
+                remove_siblings(dest_path, recorded["suffixes"])
+                entry.pop("compressed", None)
+            continue
+        signature = [dest_stat.st_size, dest_stat.st_mtime_ns]
+        if (recorded is not None and recorded["stat"] == signature and recorded["suffixes"] == wanted
+                and all(os.path.exists(path) for path in sibling_paths(dest_path, wanted))):
+            entry["compressed"] = recorded                  # The output wasn't touched since it was compressed
+            stats.skipped += 1
+            continue
+        tasks.append((entry, signature, dest_path, recorded, wanted))
+
+    with ThreadPoolExecutor(max_workers=threads or os.cpu_count() or 1) as executor:    # zlib and brotli release the GIL while compressing
+        results = executor.map(lambda task: compress_file(*task[2:]), tasks)
+        for (entry, signature, _, _, wanted), (digest, sizes) in zip(tasks, results):
+            entry["compressed"] = {"stat": signature, "digest": digest, "suffixes": wanted}
+            if sizes is None:                               # Rewritten with the same bytes: the siblings are still right
+                stats.skipped += 1
+                continue
+            stats.add(sizes)
+    stats.finish()
+    return stats
+
+
+def compress_file(dest_path, recorded, suffixes):           ## Writes the siblings of one output unless its bytes are unchanged; returns (digest, {suffix: size} or None)
+    with open(dest_path, "rb") as file:
+        data = file.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if (recorded is not None and recorded["digest"] == digest and recorded["suffixes"] == suffixes
+            and all(os.path.exists(path) for path in sibling_paths(dest_path, suffixes))):
+        return digest, None                                 # Only its timestamp changed (e.g. rendered again to the same page)
+    sizes = {"": len(data)}
+    for suffix in suffixes:
+        compressed = compress_bytes(data, suffix)
+        with atomic_open(dest_path + suffix, "wb") as file: # Served siblings are replaced in one step, like the outputs
+            file.write(compressed)
+        sizes[suffix] = len(compressed)
+    if recorded is not None:                                # Siblings that are no longer wanted (e.g. brotli was uninstalled) are removed
+        remove_siblings(dest_path, [suffix for suffix in recorded["suffixes"] if suffix not in suffixes])
+    return digest, sizes
+
+
+class CompressStats:                                        ## Totals of a compression pass: outputs compressed, bytes in and out, outputs skipped
+    def __init__(self):
+        self.files = 0                                      # Outputs compressed
+        self.bytes = 0                                      # Their total size
+        self.compressed = {}                                # Suffix -> total size of the siblings written
+        self.skipped = 0                                    # Outputs whose siblings were already up to date
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def add(self, sizes):                                   ## Counts one compressed output, given the sizes `compress_file` returned
+        self.files += 1
+        self.bytes += sizes[""]
+        for suffix, size in sizes.items():
+            if suffix:
+                self.compressed[suffix] = self.compressed.get(suffix, 0) + size
+
+    def finish(self):                                       ## Stops the clock
+        self.seconds = time.perf_counter() - self.started
+
+    def summary(self):                                      ## One line describing the pass, e.g. for the end of a build
+        ratios = ", ".join(f"{suffix} {100 * size / self.bytes:.0f}%" for suffix, size in sorted(self.compressed.items()))
+        return (f"compressed {self.files} files ({self.bytes / (1 << 20):.1f} MiB{'; ' + ratios if ratios else ''}) "
+                f"in {self.seconds:.2f}s, {self.skipped} unchanged")
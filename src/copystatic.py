@@ -1,18 +1,184 @@
 import os
 import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+from manifest import hash_file
+from publish import temp_path
 
-def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):                   # If the destination directory doesn't exist,
-        os.mkdir(dest_dir_path)                             #   create it
+try:
+    import fcntl                                            # Reflinks use the FICLONE ioctl, only available on Unix
+except ImportError:
+    fcntl = None
 
-    for filename in os.listdir(source_dir_path):            # Iterate over every file and subdirectory in the source directory
-        from_path = os.path.join(source_dir_path, filename) #   full source file path
-        dest_path = os.path.join(dest_dir_path, filename)   #   full destination file path
-        print(f" * {from_path} -> {dest_path}")             #   inform the user of the file being copied
- 
-        if os.path.isfile(from_path):                       # If the current item is a file,
-            shutil.copy(from_path, dest_path)               #   copy it to the destination
+FICLONE = 0x40049409                                        # Linux ioctl number for cloning a file's extents (btrfs, XFS, ...)
+LINK_MODES = ("hardlink", "reflink")                        # Ways of placing a static file in the output without copying its bytes
+DEFAULT_THREADS = 8                                         # Copy threads used by default
+ZERO_COPY_THRESHOLD = 1 << 20                               # Files at least this big (1 MiB) are copied inside the kernel, without passing through Python
 
-        else:                                               # If the current item is a directory,
-            copy_files_recursive(from_path, dest_path)      #   call the function recursively
\ No newline at end of file
+
+def copy_files_recursive(source_dir_path, dest_dir_path, manifest=None, checksum=False, link=None, threads=DEFAULT_THREADS, verbose=True,
+                         assets=None):
+    threads = max(1, threads)
+    stats = CopyStats()                                                 # Totals for the summary printed at the end
+    duplicates = []                                                     # (original's output, output) for files stored once (with an `AssetIndex`)
+    with ThreadPoolExecutor(max_workers=threads) as executor:           # Copies run on a pool of threads, since they mostly wait on the disk
+        pending = set()
+        for from_path, dest_path in plan_copies(source_dir_path, dest_dir_path, manifest, checksum, stats, verbose, assets):
+            original = assets.original(from_path) if assets is not None else None
+            if original is not None:                                    # A duplicate is linked to its original's output,
+                duplicates.append((os.path.join(dest_dir_path, assets.outputs[original]), dest_path))
+                continue                                                #   once that has been copied
+            if len(pending) >= threads * 4:                             # Keep a bounded number of copies in flight,
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)  # waiting for one to finish before queuing more,
+                for future in done:
+                    future.result()                                     #   and re-raising the first copy that failed
+            pending.add(executor.submit(transfer_file, from_path, dest_path, link))
+        for future in pending:                                          # Wait for the remaining copies (and report their errors)
+            future.result()
+    for original_path, dest_path in duplicates:                         # Identical contents are stored once, as hardlinks
+        transfer_file(original_path, dest_path, "hardlink")
+    stats.finish()
+    return stats
+
+
+def plan_copies(source_dir_path, dest_dir_path, manifest, checksum, stats, verbose, assets=None):     ## Yields (source, destination) for every static file that has to be copied
+    if not os.path.exists(dest_dir_path):                               # If the destination directory doesn't exist,
+        os.mkdir(dest_dir_path)                                         #   create it (before any file is copied into it)
+
+    with os.scandir(source_dir_path) as entries:                        # `scandir` lists a directory along with each entry's type, so no extra `isfile` calls
+        entries = sorted(entries, key=lambda entry: entry.name)         # Sorted, so every build copies (and logs) in the same order
+    for entry in entries:                                               # Iterate over every file and subdirectory in the source directory
+        from_path = entry.path                                          #   full source file path
+        dest_path = os.path.join(dest_dir_path, entry.name)             #   full destination file path
+
+        if entry.is_file():                                             # If the current item is a file,
+            source_stat = entry.stat()                                  #   look at the source once,
+            if assets is not None:                                      #   and with an asset index, which already hashed every file,
+                dest_path = os.path.join(dest_dir_path, assets.output_name(from_path))     # name its output (maybe fingerprinted),
+                if manifest is not None:                                #   and judge its copy by content
+                    digest, unchanged = check_copy(manifest, from_path, dest_path, source_stat, checksum, assets.digests[from_path])
+                    manifest.record(dest_path, from_path, digest, {from_path: [source_stat.st_size, source_stat.st_mtime_ns]})
+                    if unchanged:                                       #   (so the next scan can reuse the hash while the `stat` matches)
+                        stats.skipped += 1
+                        continue
+            elif manifest is not None:                                  #   and when the build tracks its outputs, compare it with its copy
+                digest, unchanged = check_copy(manifest, from_path, dest_path, source_stat, checksum)
+                manifest.record(dest_path, from_path, digest)           # The file belongs to this build either way,
+                if unchanged:                                           #   but only new or changed files are copied
+                    stats.skipped += 1
+                    continue
+            if verbose:
+                print(f" * {from_path} -> {dest_path}")                 #   inform the user of the file being copied
+            if assets is not None and assets.original(from_path) is not None:
+                stats.linked += 1                                       #   (a duplicate is linked rather than copied)
+            else:
+                stats.files += 1
+                stats.bytes += source_stat.st_size
+            yield from_path, dest_path                                  #   and hand it to the copy threads
+
+        else:                                                           # If the current item is a directory,
+            if verbose:
+                print(f" * {from_path} -> {dest_path}")                 #   inform the user of the directory being copied
+            yield from plan_copies(from_path, dest_path, manifest, checksum, stats, verbose, assets)    # and plan its contents recursively
+
+
+def check_copy(manifest, from_path, dest_path, source_stat, checksum=False, digest=None):  ## Returns (digest, True if the copy is up to date) - shared by builds and `--dry-run` plans, so both agree
+    if digest is not None:                                              # Already hashed (by an asset index): judge the copy by content,
+        return digest, manifest.is_fresh(dest_path, digest)
+    if checksum:                                                        #   identify its contents by hash (a full read) when asked,
+        digest = hash_file(from_path)
+        return digest, manifest.is_fresh(dest_path, digest)
+    return stat_digest(source_stat), same_stat(source_stat, dest_path)  #   or, by default, by size and modification time alone
+
+
+class CopyStats:                                        ## Totals of a static copy: files and bytes copied, files skipped, time taken
+    def __init__(self):
+        self.files = 0                                  # Files copied
+        self.bytes = 0                                  # Bytes copied
+        self.skipped = 0                                # Files whose copy was already up to date
+        self.linked = 0                                 # Files stored as hardlinks to an identical file
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def finish(self):                                   ## Stops the clock
+        self.seconds = time.perf_counter() - self.started
+
+    def summary(self):                                  ## One line describing the copy, e.g. for the end of a build
+        mebibytes = self.bytes / (1 << 20)
+        throughput = mebibytes / self.seconds if self.seconds > 0 else 0.0
+        return (f"copied {self.files} files ({mebibytes:.1f} MiB) in {self.seconds:.2f}s "
+                f"({throughput:.1f} MiB/s), {self.skipped} unchanged"
+                + (f", {self.linked} deduplicated" if self.linked else ""))
+
+
+def stat_digest(source_stat):                               ## Identifies a static file's version by its size and modification time
+    return f"{source_stat.st_size}:{source_stat.st_mtime_ns}"
+
+
+def same_stat(source_stat, dest_path):                      ## True if 'dest_path' has the source's size and modification time (one `stat` call)
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:                               # A missing copy is never up to date
+        return False
+    return (dest_stat.st_size == source_stat.st_size
+        and dest_stat.st_mtime_ns == source_stat.st_mtime_ns)
+
+
+def transfer_file(from_path, dest_path, link=None):         ## Places a copy of 'from_path' at 'dest_path', as a hardlink or reflink when asked
+    temp = temp_path(dest_path)                             # The copy is made under a temporary name,
+    try:
+        place_file(from_path, temp, link)
+        os.replace(temp, dest_path)                         #   then renamed over any previous copy in one step, so it's never seen half-copied
+    finally:                                                #   and a hardlinked previous copy is never written through to the file it links to
+        if os.path.lexists(temp):                           # (left behind if the copy failed, or if the rename found both names already
+            os.remove(temp)                                 #   linking the same file)
+
+
+def place_file(from_path, dest_path, link=None):            ## Creates 'dest_path' (which must not exist) as a copy, hardlink or reflink of 'from_path'
+    if link == "hardlink":
+        try:
+            os.link(from_path, dest_path)                   # A hardlink shares the source's data (and its modification time)
+            return
+        except OSError:                                     # e.g. the output is on another file system:
+            pass                                            #   fall back to copying
+    if link == "reflink" and fcntl is not None:
+        try:
+            with open(from_path, "rb") as source, open(dest_path, "wb") as dest:
+                fcntl.ioctl(dest.fileno(), FICLONE, source.fileno())    # A reflink shares data blocks until either file is modified
+            shutil.copystat(from_path, dest_path)           # Keep the modification time so the next build sees it as unchanged
+            return
+        except OSError:                                     # e.g. the file system can't clone extents:
+            pass                                            #   fall back to copying
+    if os.path.getsize(from_path) >= ZERO_COPY_THRESHOLD:   # Large files are copied inside the kernel where possible,
+        zero_copy(from_path, dest_path)
+        shutil.copystat(from_path, dest_path)               #   keeping the modification time so the next build sees them as unchanged
+        return
+    shutil.copy2(from_path, dest_path)                      # Copy the data along with the modification time
+
+
+def zero_copy(from_path, dest_path):                        ## Copies a file with `copy_file_range` or `sendfile`, falling back to a buffered copy
+    with open(from_path, "rb") as source, open(dest_path, "wb") as dest:
+        remaining = os.fstat(source.fileno()).st_size
+        if hasattr(os, "copy_file_range"):                  # `copy_file_range` (Linux) copies between files without leaving the kernel,
+            try:                                            #   and some file systems turn it into a server-side copy or clone
+                while remaining > 0:
+                    copied = os.copy_file_range(source.fileno(), dest.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            except OSError:                                 # e.g. unsupported across these file systems: try the next method
+                pass
+        if remaining > 0 and hasattr(os, "sendfile"):       # `sendfile` also avoids copying the data through user space
+            try:
+                while remaining > 0:
+                    offset = source.tell()
+                    sent = os.sendfile(dest.fileno(), source.fileno(), offset, remaining)
+                    if sent == 0:
+                        break
+                    source.seek(offset + sent)
+                    remaining -= sent
+            except OSError:
+                pass
+        if remaining > 0:                                   # Whatever is left is copied the ordinary way
+            shutil.copyfileobj(source, dest)
@@ -0,0 +1,125 @@
+import os
+
+from copystatic import check_copy
+from gencontent import PageCheck, collect_pages
+from manifest import GENERATED_SOURCE, page_params
+from templates import TemplateRegistry
+from urls import asset_urls_digest
+
+
+class Output:                                                   ## One file of the built site and the inputs it depends on
+    __slots__ = ("kind", "dest", "source", "inputs", "params")
+
+    def __init__(self, kind, dest, source, inputs, params=None):
+        self.kind = kind                                        # "page" (rendered from markdown) or "asset" (copied from static)
+        self.dest = dest                                        # Path of the output file
+        self.source = source                                    # The file it's built from
+        self.inputs = inputs                                    # Every file it depends on: its source and, for pages, the template
+        self.params = params                                    # Digest of the settings a page depends on (basepath, generator version, asset URLs),
+                                                                #   or of an asset's contents when they were hashed
+
+
+class BuildGraph:                                               ## The dependency graph of a site: every output, and the files and settings it's built from
+    def __init__(self, basepath="/"):
+        self.outputs = {}                                       # Output path -> Output, which holds the edges to its inputs
+        self.basepath = basepath                                # Base path the pages are built with
+
+    def add(self, kind, dest, source, inputs, params=None):     ## Adds an output, with edges from every input
+        dest = str(dest)
+        self.outputs[dest] = Output(kind, dest, source, inputs, params)
+
+    @classmethod
+    def for_site(cls, dir_path_content, dir_path_static, template_path, dir_path_templates, dir_path_public, basepath,
+                 assets=None):                                  ## The graph of the whole site, with static outputs named by 'assets' (an `AssetIndex`) if given
+        graph = cls(basepath)
+        params = page_params(basepath, asset_urls_digest())     # Every page depends on the basepath (and the generator version, and asset URLs),
+        templates = TemplateRegistry(template_path, dir_path_templates, dir_path_content)
+        for from_path, dest_path in collect_pages(dir_path_content, dir_path_public):   # its markdown, and its template
+            graph.add("page", dest_path, from_path, [from_path, templates.template_for(from_path)], params)
+        for from_path, dest_path in _walk_static(dir_path_static, dir_path_public):     # Every asset depends on its static file
+            if assets is not None:
+                graph.add("asset", os.path.join(dir_path_public, assets.outputs[from_path]), from_path, [from_path],
+                          assets.digests[from_path])
+                continue
+            graph.add("asset", dest_path, from_path, [from_path])
+        return graph
+
+    def plan(self, manifest, checksum=False, clean=False):      ## Works out the minimal build against the previous build's manifest, deciding like the build itself
+        if clean:                                               #   (by `stat`, hashing only what was touched, or everything with 'checksum'),
+            return self.plan_clean(manifest)                    #   or a clean build, which starts from nothing
+        plan = BuildPlan()
+        pages = PageCheck(manifest, self.basepath, checksum)
+        for dest, output in sorted(self.outputs.items()):
+            shown = os.path.join(manifest.root, manifest.key(dest))        # Outputs are listed the way the manifest names them
+            if output.kind == "asset":                          # Assets are up to date when their copy matches the source's size and mtime
+                _, fresh = check_copy(manifest, output.source, dest, os.stat(output.source), checksum, output.params)
+                if fresh:                                       #   (or, once hashed, the recorded contents)
+                    plan.unchanged.append(shown)
+                    continue
+                plan.copy.append((shown, "new" if manifest.key(dest) not in manifest.entries else "changed"))
+                continue
+            reason, _, _ = pages.check(output.source, dest, output.inputs[1])  # Pages are up to date when no input or setting changed since they were built
+            if reason is None:
+                plan.unchanged.append(shown)
+            else:
+                plan.render.append((shown, reason))
+        keys = {manifest.key(dest) for dest in self.outputs}    # Outputs of the previous build that no longer have a source
+        plan.delete = [os.path.join(manifest.root, key) for key, entry in sorted(manifest.entries.items())   # (outputs generated from the
+                       if key not in keys and entry["source"] != GENERATED_SOURCE]                          #   whole site aren't modelled)
+        return plan
+
+    def plan_clean(self, manifest):                             ## The plan of a clean build: every output is built into an empty directory,
+        plan = BuildPlan()                                      #   so every live file it doesn't produce is dropped when it's published
+        for dest, output in sorted(self.outputs.items()):
+            shown = os.path.join(manifest.root, manifest.key(dest))
+            if output.kind == "asset":
+                plan.copy.append((shown, "clean build"))
+            else:
+                plan.render.append((shown, "clean build"))
+        keys = {manifest.key(dest) for dest in self.outputs}
+        keys.update(generated_keys(manifest))                   # (outputs generated from the whole site aren't modelled)
+        plan.delete = [path for path, _ in _walk_static(manifest.root, manifest.root) if manifest.key(path) not in keys]
+        return plan
+
+
+class BuildPlan:                                                ## What a build has to do: pages to render, assets to copy, outputs to delete
+    def __init__(self):
+        self.render = []                                        # (page, reason) for every page to render,
+        self.copy = []                                          #   (asset, reason) for every asset to copy,
+        self.delete = []                                        #   outputs to delete,
+        self.unchanged = []                                     #   and outputs that are already up to date
+
+    def summary(self):                                          ## One line describing the plan
+        return (f"{len(self.render)} to render, {len(self.copy)} to copy, "
+                f"{len(self.delete)} to delete, {len(self.unchanged)} unchanged")
+
+    def print(self):                                            ## Prints every step of the plan, then the summary
+        for dest, reason in self.render:
+            print(f" * render {dest} ({reason})")
+        for dest, reason in self.copy:
+            print(f" * copy {dest} ({reason})")
+        for dest in self.delete:
+            print(f" * delete {dest}")
+        print(f"Plan: {self.summary()}")
+
+
+def generated_keys(manifest):                                   ## Keys of the outputs a build generates from the whole site, or beside other outputs (compressed siblings)
+    keys = set()
+    for key, entry in manifest.entries.items():
+        if entry["source"] == GENERATED_SOURCE:
+            keys.add(key)
+        keys.update(key + suffix for suffix in entry.get("compressed", {}).get("suffixes", ()))
+    return keys
+
+
+def _walk_static(source_dir_path, dest_dir_path):               ## Yields (static file, output path) for every static file, like the static copy does
+    if not os.path.isdir(source_dir_path):
+        return
+    with os.scandir(source_dir_path) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        dest_path = os.path.join(dest_dir_path, entry.name)
+        if entry.is_file():
+            yield entry.path, dest_path
+        else:
+            yield from _walk_static(entry.path, dest_path)
@@ -0,0 +1,152 @@
+import json
+import os
+import tempfile
+import time
+
+from htmlnode import LeafNode, ParentNode
+from manifest import GENERATOR_VERSION, hash_inputs
+
+
+CACHE_FORMAT = "1"              # Bump whenever the layout of a cache entry changes
+URL_PROPS = ("href", "src")     # Attributes holding URLs, which are stored unresolved so entries don't depend on the base path
+DEFAULT_MAX_BYTES = 256 << 20   # Default size cap of the cache directory
+STALE_TEMP_SECONDS = 3600       # Temporary files older than this were left behind by a build that crashed
+
+document_cache = None           # DocumentCache used by this process, if enabled
+
+
+def enable_document_cache(path, max_bytes=DEFAULT_MAX_BYTES):  ## Makes pages parse through the document cache at 'path' in this process (None disables it)
+    global document_cache
+    if path is None:
+        document_cache = None
+    elif document_cache is None or (document_cache.path, document_cache.max_bytes) != (path, max_bytes):
+        document_cache = DocumentCache(path, max_bytes)
+    return document_cache
+
+
+def node_to_data(node):                                         ## Converts an HTML tree into nested lists that JSON can store
+    if isinstance(node, ParentNode):                            # Parents are [tag, [children...], props],
+        return [node.tag, [node_to_data(child) for child in node.children], node.props]
+    return [node.tag, node.value, node.props]                   #   leaves are [tag, value, props]
+
+
+def data_to_node(data, resolver=None):                          ## Rebuilds an HTML tree from `node_to_data`'s lists, resolving its URLs with 'resolver'
+    tag, content, props = data
+    if props is not None and resolver is not None:
+        props = resolve_props(props, resolver)
+    if isinstance(content, list):
+        return ParentNode(tag, [data_to_node(child, resolver) for child in content], props)
+    return LeafNode(tag, content, props)
+
+
+def resolve_urls(node, resolver):                               ## Resolves the URLs of a freshly parsed tree in place
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.props is not None:
+            node.props = resolve_props(node.props, resolver)
+        if node.children is not None:
+            stack.extend(node.children)
+
+
+def resolve_props(props, resolver):                             ## A copy of 'props' with its URL attributes resolved
+    return {name: resolver.resolve(value) if name in URL_PROPS else value for name, value in props.items()}
+
+
+class DocumentCache:                                            ## Parsed pages stored on disk by content hash, shared by every build (and build process)
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path                                        # Directory holding one JSON file per parsed page
+        self.max_bytes = max_bytes                              # Size the directory is pruned down to after a build
+        self.hits = 0                                           # Pages loaded from the cache,
+        self.misses = 0                                         #   pages that had to be parsed,
+        self.writes = 0                                         #   and entries stored
+
+    def key(self, markdown):                                    ## The key of a page: its content and everything else that shapes the parsed tree
+        return hash_inputs(GENERATOR_VERSION, CACHE_FORMAT, markdown)
+
+    def entry_path(self, key):                                  ## Entries are spread over subdirectories by the first two characters of their key
+        return os.path.join(self.path, key[:2], key + ".json")
+
+    def get(self, key):                                         ## The (title, tree data) stored under 'key', or None
+        entry_path = self.entry_path(key)
+        try:
+            with open(entry_path, "r") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):                           # Missing, removed by a concurrent prune, or unreadable: a miss
+            self.misses += 1
+            return None
+        try:
+            os.utime(entry_path)                                # Entries are evicted least recently used first, so mark it as used
+        except OSError:
+            pass
+        self.hits += 1
+        return entry["title"], entry["tree"]
+
+    def put(self, key, title, tree):                            ## Stores a parsed page, atomically so concurrent builds never read half an entry
+        entry_path = self.entry_path(key)
+        dir_path = os.path.dirname(entry_path)
+        try:
+            os.makedirs(dir_path, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=dir_path, suffix=".tmp")  # A unique temporary file per writer,
+            try:
+                with os.fdopen(fd, "w") as file:
+                    json.dump({"title": title, "tree": tree}, file, separators=(",", ":"))
+                os.replace(temp_path, entry_path)               #   swapped into place in one step (the last writer wins, with identical content)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError:                                         # The cache only saves time, so failing to store an entry isn't an error
+            return
+        self.writes += 1
+
+    def prune(self):                                            ## Evicts the least recently used entries until the cache fits its size cap, returning how many
+        entries = []
+        total = 0
+        now = time.time()
+        for dir_entry in _scan(self.path):
+            for file_entry in _scan(dir_entry.path):
+                try:
+                    stat = file_entry.stat()
+                except OSError:                                 # Removed by another build meanwhile
+                    continue
+                if file_entry.name.endswith(".tmp"):            # Temporary files are another build's entries in progress,
+                    if now - stat.st_mtime > STALE_TEMP_SECONDS:    # unless they're old enough to have been abandoned
+                        _remove(file_entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_entry.path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):                   # Oldest first,
+            if total <= self.max_bytes:
+                break
+            _remove(path)                                       #   removing entries another build may also be removing
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self):                                            ## The counters, as a tuple that can be sent between processes
+        return (self.hits, self.misses, self.writes)
+
+    def add_stats(self, stats):                                 ## Adds counters from another process's copy of this cache
+        hits, misses, writes = stats
+        self.hits += hits
+        self.misses += misses
+        self.writes += writes
+
+    def summary(self):                                          ## One line describing how well the cache did
+        return f"{self.hits} pages loaded, {self.misses} parsed, {self.writes} stored"
+
+
+def _scan(dir_path):                                            ## The entries of a directory, or none if it doesn't exist (yet, or any more)
+    try:
+        with os.scandir(dir_path) as entries:
+            return list(entries)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _remove(path):                                              ## Removes a file that may already be gone
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
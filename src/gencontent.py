@@ -1,50 +1,330 @@
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from markdown_blocks import markdown_to_html_node
 
+import doccache
+import inline_markdown
+import search
+import sitemap
+import urls
+from doccache import data_to_node, node_to_data, resolve_urls
+from markdown_blocks import iter_lines, line_title, markdown_to_page
+from manifest import GENERATOR_VERSION, hash_file, hash_inputs, page_params, stat_signature
+from pipeline import PageWriter, make_dirs, prefetch
+from profiler import PageProfile
+from publish import atomic_open
+from sharding import in_shard
+from templates import TemplateRegistry, clear_template_cache, load_template
+from urls import LinkCollector, asset_urls_digest, get_resolver, set_asset_urls
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    for filename in os.listdir(dir_path_content):                                          # Iterate over all files and subdirectories in the source content directory
+PAGE_FACTS = ("links", "title", "terms", "words", "summary")    # What a page's manifest entry remembers from parsing it, carried over while the page is unchanged
+
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, manifest=None, jobs=1, template_dir=None, profiler=None,
+                             checksum=False, writers=0, shard=None):
+    pages = collect_pages(dir_path_content, dest_dir_path)                                 # Find every page first, so the work can be planned and shared out
+    if shard is not None:                                                                  # A sharded build only generates its own share of the pages
+        pages = [(from_path, dest_path) for from_path, dest_path in pages if in_shard(dest_path, dest_dir_path, shard)]
+    templates = TemplateRegistry(template_path, template_dir, dir_path_content)            # Sections of the site may use their own named templates
+    generate_pages(pages, template_path, basepath, manifest, jobs, templates, profiler, checksum, writers)  # then generate them
+
+
+def collect_pages(dir_path_content, dest_dir_path):                                        ## Lists (markdown path, html path) for every page, in a stable order
+    pages = []
+    for filename in sorted(os.listdir(dir_path_content)):                                  # Iterate over all files and subdirectories in sorted order, so every build sees the same list
         from_path = os.path.join(dir_path_content, filename)                               #   full path of the source file/directory
         dest_path = os.path.join(dest_dir_path, filename)                                  #   full path of the destination source file/directory
 
         if os.path.isfile(from_path):                                                      # If the item is a file, 
-            dest_path = Path(dest_path).with_suffix(".html")                               #   modify the destination path to have an .html extension, 
-            generate_page(from_path, template_path, dest_path, basepath)                   #   generate an HTML page from the markdown file
-
+            pages.append((from_path, html_path(dest_path)))                                #   it becomes a page with an .html extension
         else:                                                                              # If the item is a directory,
-            generate_pages_recursive(from_path, template_path, dest_path, basepath)        #   recursively process its contents
+            pages.extend(collect_pages(from_path, dest_path))                              #   recursively collect its contents
+    return pages
+
+
+def html_path(dest_path):                                                                  ## The output path of a page: its destination with an .html extension
+    return Path(dest_path).with_suffix(".html")
+
+
+def page_for(from_path, dir_path_content, dest_dir_path):                                  ## The (markdown path, html path) pair of a single content file
+    relative_path = os.path.relpath(from_path, dir_path_content)
+    return from_path, html_path(os.path.join(dest_dir_path, relative_path))
+
+
+def generate_pages(pages, template_path, basepath, manifest=None, jobs=1, templates=None, profiler=None, checksum=False, writers=0):    ## Generates the given pages, skipping unchanged ones and optionally using several processes (or writer threads)
+    clear_template_cache()                                                                 # Templates are compiled once per build, so pick up any edits since the last one
+    if templates is None:                                                                  # Without a registry every page uses 'template_path'
+        templates = TemplateRegistry(template_path)
+    pages = [(from_path, dest_path, templates.template_for(from_path)) for from_path, dest_path in pages]
+
+    digests = {}                                                                           # (input digest, input signatures) of every page that will be regenerated
+    if manifest is not None:                                                               # When building incrementally,
+        check = PageCheck(manifest, basepath, checksum)                                    #   decide for every page (exactly as `--dry-run` plans do)
+        changed_pages = []
+        for from_path, dest_path, page_template in pages:
+            reason, digest, inputs = check.check(from_path, dest_path, page_template)
+            if reason is None and digest is None:                                          # no input was touched since the last build:
+                manifest.keep(dest_path)                                                   #   keep the existing page without reading anything,
+                continue
+            if reason is None:                                                             # its inputs were touched but haven't changed after all:
+                facts = {name: value for name, value in manifest.previous(dest_path).items() if name in PAGE_FACTS}
+                manifest.record(dest_path, from_path, digest, inputs, check.params, facts)  #   keep the existing page (and what it recorded) as part of this build
+                continue
+            digests[dest_path] = (digest, inputs, check.params)                            #   otherwise it has to be regenerated
+            changed_pages.append((from_path, dest_path, page_template))
+        pages = changed_pages
+
+    make_dirs([dest_path for _, dest_path, _ in pages])                                    # Every output directory is created up front, once
+
+    if jobs <= 1 and writers > 0 and profiler is None:                                     # With a single job and writer threads,
+        generate_pages_pipelined(pages, basepath, manifest, digests, writers)              #   overlap reading and writing with parsing
+        return
+    if jobs <= 1:                                                                          # With a single job,
+        for from_path, dest_path, page_template in pages:                                  #   generate each page in turn
+            facts = generate_page(from_path, page_template, dest_path, basepath, profiler)
+            record_page(manifest, from_path, dest_path, digests, facts)
+        return
+
+    track_memory = None                                                                    # Workers only profile when the build is being profiled
+    if profiler is not None:
+        track_memory = profiler.track_memory
+    caches = process_caches()                                                              # Workers keep caches of their own, set up like this process's
+    cache_config = _cache_config()
+
+    failures = []                                                                          # (page, error) for every page a worker failed to generate
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(urls.asset_urls, search.collect_terms, sitemap.collect_metadata)) as executor:  # Share the pages out over a pool of worker processes,
+        tasks = [(from_path, page_template, dest_path, basepath, track_memory, cache_config)
+                 for from_path, dest_path, page_template in pages]
+        chunksize = max(1, len(tasks) // (jobs * 8))                                       #   in batches big enough to keep inter-process overhead low
+        results = executor.map(_render_page_task, tasks, chunksize=chunksize)              #   each worker compiles a template once and reuses it for its pages
+        for (from_path, page_template, dest_path, *_), (error, profile, cache_stats, facts) in zip(tasks, results):  # Results arrive in page order, so progress output is deterministic
+            if profile is not None:                                                        # Page profiles come back from the workers with the results,
+                profiler.add(profile)
+            for name, stats in cache_stats.items():                                        #   as do their cache counters
+                caches[name].add_stats(stats)
+            if error is not None:                                                          # If the page failed,
+                print(f" ! {from_path}: {error}")                                          #   report it and carry on with the rest
+                failures.append((from_path, error))
+                continue
+            print(page_message(from_path, page_template, dest_path))                       # Otherwise print the same line a serial build would
+            record_page(manifest, from_path, dest_path, digests, facts)
+    if failures:                                                                           # Once every page has been tried, fail the build if any page failed
+        raise ValueError(f"{len(failures)} page(s) failed to generate: " + ", ".join(path for path, _ in failures))
+
+
+def generate_pages_pipelined(pages, basepath, manifest, digests, writers):  ## Parses pages one by one while their markdown is read ahead and their HTML is written behind
+    sources = prefetch(from_path for from_path, _, _ in pages)                             # Markdown files are read ahead on a background thread,
+    facts = {}                                                                             # Page -> what was learnt parsing it
+    with PageWriter(writers) as writer:                                                    #   and finished pages are written by 'writers' threads
+        for (from_path, dest_path, page_template), markdown in zip(pages, sources):
+            print(page_message(from_path, page_template, dest_path))
+            page, facts[dest_path] = render_markdown(markdown, page_template, basepath)
+            writer.write(dest_path, page)                                                  # Only parsing and rendering happen on this thread
+    failed = {str(path) for path, _ in writer.failures}
+    for from_path, dest_path, _ in pages:                                                  # Pages that reached the disk belong to the build,
+        if str(dest_path) not in failed:
+            record_page(manifest, from_path, dest_path, digests, facts[dest_path])
+    if writer.failures:                                                                    #   while failed writes fail the build
+        for path, error in writer.failures:
+            print(f" ! {path}: {error}")
+        raise ValueError(f"{len(writer.failures)} page(s) failed to write: " + ", ".join(str(path) for path, _ in writer.failures))
+
+
+class PageCheck:                                                    ## Decides whether pages are up to date against a manifest - shared by builds and `--dry-run` plans, so both agree
+    def __init__(self, manifest, basepath, checksum=False):
+        self.manifest = manifest
+        self.basepath = basepath
+        self.checksum = checksum                                    # Hash every page, even when no input was touched
+        self.asset_digest = asset_urls_digest()                     # Pages depend on the served names of assets they may link to,
+        self.params = page_params(basepath, self.asset_digest)      #   and on the build settings
+        self.signatures = {}                                        # Each input is looked at once, and each template hashed once,
+        self.template_digests = {}                                  #   however many pages share it
+
+    def signature(self, path):
+        if path not in self.signatures:
+            self.signatures[path] = stat_signature(path)
+        return self.signatures[path]
+
+    def check(self, from_path, dest_path, page_template):      ## Returns (reason to render or None, input digest or None if nothing was hashed, input signatures)
+        inputs = {str(from_path): self.signature(from_path), page_template: self.signature(page_template)}
+        previous = self.manifest.previous(dest_path)
+        reason = self.manifest.change_reason(dest_path, inputs, self.params)    # Judged by `stat` first,
+        if reason is None and not has_facts(previous):          #   though a page that didn't record what this build needs is parsed again
+            reason = "page facts missing"
+        if reason is None and not self.checksum:                # Nothing was touched: up to date without reading anything
+            return None, None, inputs
+        if page_template not in self.template_digests:
+            self.template_digests[page_template] = hash_file(page_template)
+        digest = page_digest(from_path, self.template_digests[page_template], self.basepath, self.asset_digest)
+        if self.manifest.is_fresh(dest_path, digest) and has_facts(previous):  # Touched, but with the same contents
+            return None, digest, inputs
+        return reason or "contents changed", digest, inputs
+
+
+def page_digest(from_path, template_digest, basepath, asset_digest=""):    ## Hashes every input a generated page depends on
+    if asset_digest:
+        return hash_inputs(GENERATOR_VERSION, basepath, template_digest, hash_file(from_path), asset_digest)
+    return hash_inputs(GENERATOR_VERSION, basepath, template_digest, hash_file(from_path))
+
+
+def record_page(manifest, from_path, dest_path, digests, facts):  ## Records a freshly generated page and what was learnt parsing it in the manifest (if the build has one)
+    if manifest is not None:
+        manifest.record(dest_path, from_path, *digests[dest_path], facts)
+
+
+def page_facts(collector, node, title):                             ## What the build remembers about a page: its title and links, plus its search terms and metadata when needed
+    facts = {"links": sorted(collector.links), "title": title}
+    if search.collect_terms:                                        # Both come from the tree already in memory, not from re-reading the page
+        facts["terms"] = search.page_terms(node)
+    if sitemap.collect_metadata:
+        facts.update(sitemap.page_metadata(node))
+    return facts
+
+
+def has_facts(entry):                                               ## True if a page's manifest entry records everything this build collects
+    if "links" not in entry:                                        # (the title is only needed by the search index and the metadata)
+        return False
+    if search.collect_terms and ("terms" not in entry or "title" not in entry):
+        return False
+    return not sitemap.collect_metadata or ("words" in entry and "title" in entry)
+
+
+def check_facts(manifest):                                          ## Raises ValueError if pages built elsewhere (e.g. merged shards) lack facts this build collects
+    missing = sorted(key for key, entry in manifest.current.items()   # (only pages record the build settings they depend on)
+                     if entry.get("params") is not None and not has_facts(entry))
+    if missing:                                                     # Their whole-site outputs would silently leave those pages out
+        raise ValueError(f"{len(missing)} page(s) lack the facts --search or --site-url need, e.g. {missing[0]}: "
+                         "build every shard with the same --search and --site-url flags")
+
+
+def page_message(from_path, template_path, dest_path):             ## The progress line printed for every generated page
+    return f" * {from_path} {template_path} -> {dest_path}"
+
+
+def process_caches():                                               ## The caches enabled in this process, by name
+    caches = {}
+    if inline_markdown.inline_cache is not None:
+        caches["inline"] = inline_markdown.inline_cache
+    if doccache.document_cache is not None:
+        caches["document"] = doccache.document_cache
+    return caches
+
+
+def _cache_config():                                                ## How this process's caches are set up, for worker processes to copy
+    inline_cache = inline_markdown.inline_cache
+    document_cache = doccache.document_cache
+    return (
+        inline_cache.maxsize if inline_cache is not None else 0,
+        document_cache.path if document_cache is not None else None,
+        document_cache.max_bytes if document_cache is not None else None,
+    )
+
+
+def _init_worker(asset_urls, collect_terms, collect_metadata):      ## Runs once in every worker process: applies the build's settings that aren't per page
+    set_asset_urls(asset_urls)
+    search.enable_search(collect_terms)
+    sitemap.enable_metadata(collect_metadata)
+
+
+def _render_page_task(task):                                        ## Runs in a worker process: renders one page, returning (error message, profile, cache counters, page facts) instead of raising
+    from_path, template_path, dest_path, basepath, track_memory, (inline_size, cache_path, cache_bytes) = task
+    profile = None
+    if track_memory is not None:                                    # When the build is profiled, so is every page
+        profile = PageProfile(from_path, track_memory)
+    inline_markdown.enable_inline_cache(inline_size)                # The worker's caches live on from page to page
+    doccache.enable_document_cache(cache_path, cache_bytes)
+    caches = process_caches()
+    before = {name: cache.stats() for name, cache in caches.items()}
+    try:
+        facts = render_page(from_path, template_path, dest_path, basepath, profile)
+    except Exception as e:                                          # Any failure is reported back to the parent as text,
+        return f"{type(e).__name__}: {e}", None, {}, None           #   so one bad page can't hide the errors of the others
+    if profile is not None:
+        profile = profile.to_dict()
+    cache_stats = {                                                 # Only this page's share of the counters is sent back,
+        name: tuple(after - start for after, start in zip(cache.stats(), before[name]))  # since a forked worker starts with the parent's
+        for name, cache in caches.items()
+    }
+    return None, profile, cache_stats, facts
+
+
+def generate_page(from_path, template_path, dest_path, basepath, profiler=None):  ## Builds one page, returning its facts
+    print(page_message(from_path, template_path, dest_path))       # Inform the user of the generated file paths
+    if profiler is None:
+        return render_page(from_path, template_path, dest_path, basepath)  # Then build the page
+    profile = profiler.page(from_path)                              # When profiling, build it while recording its timings,
+    facts = render_page(from_path, template_path, dest_path, basepath, profile)
+    profiler.add(profile.to_dict())                                 #   and add them to the build's profile
+    return facts
+
+
+def render_page(from_path, template_path, dest_path, basepath, profile=None):   ## Reads a markdown file, renders it into the template, and writes the HTML page; returns its facts
+    if profile is not None:                                         # Profiled pages take a path that times each stage on its own
+        with profile:
+            return _render_page_profiled(from_path, template_path, dest_path, basepath, profile)
+
+    template = load_template(template_path, basepath)               # Get the compiled template (read from disk only once per process)
+
+    collector = LinkCollector(get_resolver(basepath))               # Every link and image URL is noted as it's resolved,
+    node, title = parse_page(from_path, collector)                  # while the markdown is parsed into an HTML node, and its title found
+
+    with atomic_open(dest_path) as to_file:                         # Open the destination file (in a directory `generate_pages` created) for writing, replacing it only once complete,
+        template.write(to_file, Title=title, Content=node.iter_html())  # and stream the filled-in template (the page's HTML produced lazily) straight into it
+    return page_facts(collector, node, title)
+
+
+def _render_page_profiled(from_path, template_path, dest_path, basepath, profile):    ## `render_page`, with each stage run to completion and timed
+    with profile.stage("read"):
+        with open(from_path, "r") as from_file:
+            markdown_content = from_file.read()
+    with profile.stage("template"):
+        template = load_template(template_path, basepath)
+    with profile.stage("parse"):                                    # Inline parsing records itself as the nested "inline" stage
+        collector = LinkCollector(get_resolver(basepath))
+        node, title = parse_markdown(markdown_content, collector)
+    with profile.stage("render"):                                   # Rendering isn't streamed here, so it can be timed apart from writing
+        html = node.to_html()
+    with profile.stage("template"):
+        page = template.render(Title=title, Content=html)
+    with profile.stage("write"):
+        with atomic_open(dest_path) as to_file:
+            to_file.write(page)
+    return page_facts(collector, node, title)
 
 
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f" * {from_path} {template_path} -> {dest_path}")         # Inform the user of the generated file paths
-    from_file = open(from_path, "r")                                # Open the markdown file for reading,
-    markdown_content = from_file.read()                             #   read its contents,
-    from_file.close()                                               #   close the file
+def render_markdown(markdown, template_path, basepath):             ## The finished HTML page for markdown text, as a string, and its facts
+    template = load_template(template_path, basepath)
+    collector = LinkCollector(get_resolver(basepath))
+    node, title = parse_markdown(markdown, collector)
+    return template.render(Title=title, Content=node.iter_html()), page_facts(collector, node, title)
 
-    template_file = open(template_path, "r")                        # Open the template file,
-    template = template_file.read()                                 #   read its contents,
-    template_file.close()                                           #   close the file
 
-    node = markdown_to_html_node(markdown_content)                  # Parse the markdown content into an HTML node,
-    html = node.to_html()                                           #   convert that HTML node to an HTML string
+def parse_page(from_path, resolver):                                ## Parses a markdown file into (HTML node, title), with links resolved by 'resolver'
+    if doccache.document_cache is not None:                         # With the document cache, the whole file is needed to find its key
+        with open(from_path, "r") as from_file:
+            return parse_markdown(from_file.read(), resolver)
+    with open(from_path, "r") as from_file:                         # Otherwise open the markdown file for reading, and parse it block by block
+        return markdown_to_page(from_file, resolver)                #   as it's read into an HTML node, finding its title on the way
 
-    title = extract_title(markdown_content)                         # Extract the title (first top-level heading) from the markdown content
-    template = template.replace("{{ Title }}", title)               # Replace the "{{ Title }}" placeholder in the template with the extracted title
-    template = template.replace("{{ Content }}", html)              # Replace the "{{ Content }}" placeholdee with the generated HTML content
-    template = template.replace('href="/', 'href="' + basepath)     # Adjust href links to include the base path
-    template = template.replace('src="/', 'src="' + basepath)       # Adjust src links to include the base path
 
-    dest_dir_path = os.path.dirname(dest_path)                      # Get the directory path for the destination file
-    if dest_dir_path != "":                                         # If the destination directory path is not empty,
-        os.makedirs(dest_dir_path, exist_ok=True)                   #   ensure the destination directory exists (create it if necessary)
-    to_file = open(dest_path, "w")                                  # Open the destination file for writing,
-    to_file.write(template)                                         #   write the final HTML ftemplate to the destination file
+def parse_markdown(markdown, resolver):                             ## Parses markdown into (HTML node, title), loading it from the document cache if possible
+    cache = doccache.document_cache
+    if cache is None:
+        return markdown_to_page(markdown, resolver)
+    key = cache.key(markdown)
+    entry = cache.get(key)
+    if entry is not None:                                           # Pages parsed by an earlier build are only rebuilt from the cache,
+        title, tree = entry                                         #   resolving their links for this build's base path
+        return data_to_node(tree, resolver), title
+    node, title = markdown_to_page(markdown)                        # Otherwise parse the page with its links unresolved,
+    cache.put(key, title, node_to_data(node))                       #   store it for later builds,
+    resolve_urls(node, resolver)                                    #   then resolve its links for this one
+    return node, title
 
 
-def extract_title(md):
-    lines = md.split("\n")                 # Split the markdown content into individual lines,
-    for line in lines:                     #   iterate through each line,
-        if line.startswith("# "):          #   if a line starts with "# " (a top-level heading)
-            return line[2:]                #   return the text following the "# " as the title
+def extract_title(md):                     ## Returns the text of the first top-level heading of markdown given as a string or an open file
+    for line in iter_lines(md):            # Iterate through each line of the markdown content,
+        title = line_title(line)           #   if a line is a top-level heading (the same rule `markdown_to_page` uses)
+        if title is not None:
+            return title                   #   return the text following the "# " as the title
     raise ValueError("no title found")     # Raise an error if no top-level heading is found to be the title
\ No newline at end of file
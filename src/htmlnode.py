@@ -1,5 +1,12 @@
+import sys
+
+
 class HTMLNode:                                                              ## Base class represents a generic HTML node, forming a templat for all specific node types to inheret from.
+    __slots__ = ("tag", "value", "children", "props")                        # Fixed attributes instead of a per-instance __dict__, since documents hold many thousands of nodes
+
     def __init__(self, tag=None, value=None, children=None, props=None):     # Initializes with attributes common to all HTML nodes.
+        if tag is not None:                                                  # Interned tags are shared by every node with the same tag
+            tag = sys.intern(tag)                                            #   (e.g. all the "h2" strings built from f"h{level}")
         self.tag = tag                                                       # 'tag' is the HTML tag name (e.g, "div", "p", "span") - or None for non-element nodes.
         self.value = value                                                   # 'value' is the text content inside the node (if any) - typically used by text and leaf nodes.
         self.children = children                                             # 'children' is a list of child HTMLNode objects (nested nodes) - for non-leaf nodes.
@@ -11,16 +18,33 @@ class HTMLNode:                                                              ##
     def props_to_html(self):      ## Converts dictionary of attributes (self.props) into string of HTML attributes: {"class": "header", "id": "main"} -> ' class="header" id="main"'
         if self.props is None:                                # If no props are provided,
             return ""                                         #   return an empty string
-        props_html = ""                                       # Initialize a string to accumulalte key-value pairs in the dictionary
-        for prop in self.props:                               # Iterate over all key-value pairs in the dictionary,
-            props_html += f' {prop}="{self.props[prop]}"'     #   format and append each key-value pair
-        return props_html
+        return "".join(                                       # Format every key-value pair and join them in one step,
+            f' {prop}="{value}"'                              #   instead of growing a string pair by pair
+            for prop, value in self.props.items()
+        )
+
+    def iter_html(self):                                      ## Yields this node's HTML in chunks, in document order, without recursion
+        stack = [self]                                        # Nodes still to render, and closing tags still to emit (top of the stack comes next)
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):                         # A closing tag left behind by a parent,
+                yield item                                    #   emitted once all of its children are done
+            else:                                             # A node: yield its opening HTML,
+                yield item._open_html(stack)                  #   letting it push its children and closing tag onto the stack
+
+    def write_html(self, fp):                                 ## Streams this node's HTML into a file-like object, never building the whole string
+        fp.writelines(self.iter_html())
+
+    def _open_html(self, stack):                              ## Returns the HTML emitted when the node is reached; nodes with children push them onto 'stack'
+        return self.to_html()
     
     def __repr__(self):                                       # Provides a developer-friendly string representation of the HTMLNode instance.
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
 
 
 class LeafNode(HTMLNode):                             ## LeafNode represents a terminal node in the HTML tree.  Has a 'tag' and a 'value', but no children.
+    __slots__ = ()                                    # No attributes beyond those of HTMLNode
+
     def __init__(self, tag, value, props=None):       # Initializes a LeafNode - requiring 'tag' and 'value'
         super().__init__(tag, value, None, props)     #   may optionally have 'props' - a dictionary of tag properties/attributes
 
@@ -36,18 +60,22 @@ class LeafNode(HTMLNode):                             ## LeafNode represents a t
 
 
 class ParentNode(HTMLNode):                           ## ParentNode represents an HTML node with child nodes, allowing nested HTML structures.
+    __slots__ = ()                                    # No attributes beyond those of HTMLNode
+
     def __init__(self, tag, children, props=None):    # Initialize the ParentNode with an HTML tag, a list of child nodes, and optional attributes,
         super().__init__(tag, None, children, props)  #   'tag': the HTML element's type - 'children': a list of child HTMLNode instances - 'props': dictionary of optional HTML attributes
 
     def to_html(self):                                                                # Converts the ParentNode and all its children into a complete HTML string
+        return "".join(self.iter_html())                                              # Render the whole subtree chunk by chunk and join it once at the end
+
+    def _open_html(self, stack):                                                      # Called by `iter_html` when this node is reached,
         if self.tag is None:                                                          # Ensure the node has a valid HTML tag,
             raise ValueError("invalid HTML: no tag")                                  #   raise an error if that is not the case
         if self.children is None:                                                     # Ensure the node has children,
             raise ValueError("invalid HTML: no children")                             #   raise an error if that is not the case
-        children_html = ""                                                            # Initiate a list of children,
-        for child in self.children:                                                   #   look for children,
-            children_html += child.to_html()                                          #   call `to_html` on the children
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"      # Create the complete HTML element by combining the tag, attributes, and the rendered children
+        stack.append(f"</{self.tag}>")                                                # The closing tag comes after every child,
+        stack.extend(reversed(self.children))                                         #   children are pushed in reverse so the first child is rendered first
+        return f"<{self.tag}{self.props_to_html()}>"                                  # Emit the opening tag with its attributes
 
     def __repr__(self):                                                               # Provides a developer-friendly string representation of the ParentNode instance.
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
\ No newline at end of file
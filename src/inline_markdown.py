@@ -1,18 +1,95 @@
 import re
 
+from cache import LRUCache
 from textnode import TextNode, TextType
 
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")         # Markdown image syntax: ![alt_text](url)
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")      # Markdown link syntax: [link_text](url), not preceded by `!`
+
+DELIMITERS = (                  ## Inline delimiters, in the order they take precedence
+    ("**", TextType.BOLD),      # **bold** text
+    ("_", TextType.ITALIC),     # _italic_ text
+    ("`", TextType.CODE),       # `inline code` text
+)
+
+
 def text_to_textnodes(text):                                                # Converts raw text into a list of 'TextNode' objects, parsing inline markdown elements
-    nodes = [TextNode(text, TextType.TEXT)]                                 # Starts by treating the entire text as plain text,
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)               #   parse **bold** text,
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)              #   parse __italic__ text,
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)                #   parse 'inline code' text,
-    nodes = split_nodes_image(nodes)                                        #   parse image text in the format ![Alt](url)
-    nodes = split_nodes_link(nodes)                                         #   parse link text in the format [Text](url)
+    nodes = []                                                              # Nodes are appended to a single list as they are found,
+    _scan_delimiters(text, 0, nodes)                                        #   starting with the highest-precedence delimiter (**bold**)
     return nodes
 
 
+inline_cache = None             # LRUCache of parsed inline text shared by every page of the build, if enabled: text -> tuple of node fields
+MAX_CACHED_TEXT = 4096          # Longer texts are unlikely to repeat, so they're parsed without filling the cache
+
+
+def enable_inline_cache(maxsize):                                           ## Makes `parse_inline` cache up to 'maxsize' texts in this process (0 disables it)
+    global inline_cache
+    if maxsize <= 0:
+        inline_cache = None
+    elif inline_cache is None or inline_cache.maxsize != maxsize:           # An existing cache of the right size is kept, with its entries
+        inline_cache = LRUCache(maxsize)
+    return inline_cache
+
+
+def parse_inline(text):                                                     ## `text_to_textnodes`, through the inline cache when it's enabled
+    if inline_cache is None or len(text) > MAX_CACHED_TEXT:
+        return text_to_textnodes(text)
+    fields = inline_cache.get(text)
+    if fields is None:                                                      # Parse the text only the first time it's seen,
+        fields = tuple((node.text, node.text_type, node.url) for node in text_to_textnodes(text))
+        inline_cache.put(text, fields)                                      #   storing immutable tuples rather than the nodes themselves,
+    return [TextNode(*node) for node in fields]                             #   so every caller gets fresh nodes it's free to change
+
+
+def _scan_delimiters(text, level, nodes):                                   ## Splits 'text' on the delimiter at 'level', appending the resulting nodes to 'nodes'
+    if level == len(DELIMITERS):                                            # Once every delimiter has been handled,
+        _scan_images(text, nodes)                                           #   what's left is searched for images and links
+        return
+    delimiter, text_type = DELIMITERS[level]
+    start = 0                                                               # Where the current section starts,
+    formatted = False                                                       #   and whether it lies between a pair of delimiters
+    while True:
+        end = text.find(delimiter, start)                                   # Find the next delimiter by offset, without splitting the text into a list
+        if end == -1:
+            break
+        if end > start:                                                     # Non-empty sections become nodes:
+            section = text[start:end]
+            if formatted:                                                   #   sections between delimiters are formatted text,
+                nodes.append(TextNode(section, text_type))
+            else:                                                           #   the rest is scanned for the lower-precedence syntax
+                _scan_delimiters(section, level + 1, nodes)
+        formatted = not formatted                                           # Every delimiter opens or closes a formatted section
+        start = end + len(delimiter)
+    if formatted:                                                           # Raise error if the last delimiter was never closed
+        raise ValueError("invalid markdown, formatted section not closed")
+    if start < len(text):                                                   # Plain text after the last delimiter
+        _scan_delimiters(text[start:], level + 1, nodes)
+
+
+def _scan_images(text, nodes):                                              ## Appends the images in 'text' (and the links in the text around them) to 'nodes'
+    start = 0
+    for match in IMAGE_PATTERN.finditer(text):                              # For every image, using the match offsets rather than re-splitting the text,
+        if match.start() > start:                                           #   the text before the image may still contain links,
+            _scan_links(text[start:match.start()], nodes)
+        nodes.append(TextNode(match.group(1), TextType.IMAGE, match.group(2)))  # then comes the image with its alt text and URL
+        start = match.end()
+    if start < len(text):                                                   # The text after the last image
+        _scan_links(text[start:], nodes)
+
+
+def _scan_links(text, nodes):                                               ## Appends the links in 'text', and the plain text around them, to 'nodes'
+    start = 0
+    for match in LINK_PATTERN.finditer(text):                               # For every link,
+        if match.start() > start:                                           #   the text before it is plain text,
+            nodes.append(TextNode(text[start:match.start()], TextType.TEXT))
+        nodes.append(TextNode(match.group(1), TextType.LINK, match.group(2)))   # then comes the link with its label and URL
+        start = match.end()
+    if start < len(text):                                                   # The text after the last link is plain text
+        nodes.append(TextNode(text[start:], TextType.TEXT))
+
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):                 # The function called in 'text_to_textnodes' function to parse bold, italic, and code text
     
     new_nodes = []                                                          # Stores the resulting list of text nodes
@@ -91,12 +168,10 @@ def split_nodes_link(old_nodes):
 
 
 def extract_markdown_images(text):                      ## Identifies and extracts all Markdown image elements using the syntax `![alt_text](url)` from the given text
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"          # Regular expression to match Markdown image syntax
-    matches = re.findall(pattern, text)                 # Find all matches of the pattern in the input text
+    matches = IMAGE_PATTERN.findall(text)               # Find all matches of the (precompiled) image pattern in the input text
     return matches                                      # Return a list of tuples, where each tuple contains `(alt_text, url)`
 
 
 def extract_markdown_links(text):                       ## Identifies and extracts all Markdown link elements using the syntax `[link_text](url)`
-    pattern = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"     # Regular expression to match Markdown link syntax
-    matches = re.findall(pattern, text)                 # Find all matches of the pattern in the input text
+    matches = LINK_PATTERN.findall(text)                # Find all matches of the (precompiled) link pattern in the input text
     return matches                                      # Return a list of tuples, where each tuple contains `(link_text, url)`
\ No newline at end of file
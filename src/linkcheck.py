@@ -0,0 +1,60 @@
+import posixpath
+from urllib.parse import urlsplit
+
+from manifest import hash_inputs
+from urls import rename_asset
+
+
+def link_target(url, page_key):                                 ## The output path a link points at, relative to the site root, or None for external links
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc:                            # 'https://...', 'mailto:...', '//host/...' leave the site
+        return None
+    if not parts.path:                                          # '#top' or '?q=1' stay on the same page
+        return None
+    if parts.path.startswith("/"):                              # Root-relative links are written before fingerprinting renames assets
+        path = rename_asset(parts.path)
+    else:                                                       # Relative links are relative to the page's directory
+        path = posixpath.join("/" + posixpath.dirname(page_key), parts.path)
+    return posixpath.normpath(path).lstrip("/")
+
+
+def candidates(target):                                         ## The outputs a server would answer a path with: the file itself or its directory's index
+    if target in ("", "."):
+        return ("index.html",)
+    return (target, target + "/index.html")
+
+
+class LinkChecker:                                              ## Checks the links of every page against an index of the site's outputs
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.outputs = set(manifest.current)                    # Every page and static file of the build, for O(1) lookups
+        self.pages = 0                                          # Pages whose links were checked,
+        self.reused = 0                                         #   pages whose previous results still hold,
+        self.links = 0                                          #   links checked,
+        self.broken = []                                        #   and (page, link) for every broken link
+
+    def is_broken(self, url, page_key):                         ## True if an internal link points at no output
+        target = link_target(url, page_key)
+        if target is None:
+            return False
+        return not any(candidate in self.outputs for candidate in candidates(target))
+
+    def check(self):                                            ## Checks every page's links, reusing the results of unchanged pages while no output was added or removed
+        outputs = hash_inputs(*sorted(self.outputs))            # Identifies the set of outputs the links were checked against
+        for key, entry in sorted(self.manifest.current.items()):
+            links = entry.get("links")
+            if links is None:                                   # Static files have no links
+                continue
+            if entry.get("checked") == outputs:                 # Kept from a previous check: same links, same targets
+                self.reused += 1
+            else:
+                entry["broken"] = [url for url in links if self.is_broken(url, key)]
+                entry["checked"] = outputs
+                self.pages += 1
+                self.links += len(links)
+            self.broken.extend((key, url) for url in entry["broken"])
+        return self.broken
+
+    def summary(self):                                          ## One line describing the check, e.g. for the end of a build
+        return (f"checked {self.links} links on {self.pages} pages ({self.reused} unchanged), "
+                f"{len(self.broken)} broken")
@@ -1,35 +1,247 @@
+import argparse                                     # Module for parsing command-line arguments and flags
 import os                                           # Module for interacting with the file system (e.g., paths, directories)
-import shutil                                       # Module for high-level file operations like deleting entire directories
-import sys                                          # Module for accessing command-line arguments (among other utilities)
 
-from copystatic import copy_files_recursive         # Custom function to copy static files (e.g., images/styles) to the destination
-from gencontent import generate_pages_recursive     # Custom function to generate HTML pages from content and a template
+from assets import AssetIndex                       # Custom class hashing static files, to fingerprint and deduplicate them
+from compress import DEFAULT_MIN_SIZE, compress_outputs    # Custom function writing pre-compressed siblings of the outputs
+from copystatic import DEFAULT_THREADS, LINK_MODES, copy_files_recursive    # Custom function to copy static files (e.g., images/styles) to the destination
+from depgraph import BuildGraph                     # Custom class modelling what every output is built from, to plan a build
+from doccache import enable_document_cache         # Custom function enabling the on-disk cache of parsed pages
+from gencontent import check_facts, generate_pages_recursive     # Custom functions to generate HTML pages from content and a template
+from inline_markdown import enable_inline_cache     # Custom function enabling the cache of parsed inline markdown
+from linkcheck import LinkChecker                   # Custom class checking every internal link against the built site
+from manifest import BuildManifest                  # Custom class recording the inputs of every output, for incremental builds
+from profiler import BuildProfiler                  # Custom class collecting per-page and per-stage timings of the build
+from publish import StagedPublish                   # Custom class building the site next to the live one and swapping it into place
+from search import SearchIndex, enable_search       # Custom class writing the client-side search index of the site
+from sitemap import enable_metadata, write_site_files     # Custom functions writing the sitemap and RSS feed from page metadata
+from sharding import merge_shards, parse_shard, shard_dir, shard_manifest   # Custom functions splitting a build over several machines
+from urls import set_asset_urls                     # Custom function making page links point at fingerprinted assets
+from watch import SiteWatcher                       # Custom class that keeps the site up to date as files change
 
                                     ## Paths to various key directories and files.
 dir_path_static = "./static"        # Directory containing static assets (e.g., CSS, images, JS files)
 dir_path_public = "./docs"          # Target 'public' directory where the site will be built
 dir_path_content = "./content"      # Directory containing site content files (e.g., Markdown, JSON)
 template_path = "./template.html"   # HTML template used to wrap content into full HTML pages
+dir_path_templates = "./templates"  # Optional directory of named templates - 'templates/blog.html' is used by pages under 'content/blog'
+manifest_path = "./.build-manifest.json"    # Build manifest stored next to the public directory (not inside it, so it's never published)
+profile_path = "./build-profile.json"      # Where '--profile' writes its report
+document_cache_path = "./.build-cache"      # On-disk cache of parsed pages, shared by every build
 default_basepath = "/"              # Default base path for links in the generated site
 
+
+def parse_args():                               ## Parses the command line: `main.py [basepath] [options]`
+    parser = argparse.ArgumentParser(description="Build the static site.")
+    parser.add_argument("basepath", nargs="?", default=default_basepath,
+                        help="base path prepended to absolute links (default: %(default)s)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild pages and static files whose inputs changed since the last build")
+    parser.add_argument("--checksum", action="store_true",
+                        help="detect changed static files by content hash instead of size and modification time")
+    parser.add_argument("--link-static", choices=LINK_MODES,
+                        help="hardlink or reflink static files into the public directory instead of copying them")
+    parser.add_argument("--copy-threads", type=int, default=DEFAULT_THREADS,
+                        help="number of threads copying static files (default: %(default)s)")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="name static files after their content hash (e.g. 'rivendell.3f2a9c8d.png') and point links at those names")
+    parser.add_argument("--dedupe-static", action="store_true",
+                        help="store static files with identical contents once, as hardlinks")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="don't list every static file copied, only the summary")
+    parser.add_argument("--watch", action="store_true",
+                        help="after building, keep running and rebuild whatever changes in content, static or templates")
+    parser.add_argument("--interval", type=float, default=0.2,
+                        help="seconds between checks for changes in watch mode (default: %(default)s)")
+    parser.add_argument("--writers", type=int, default=0,
+                        help="with a single job, read pages ahead and write them on this many background threads, "
+                             "overlapping disk latency with parsing (default: %(default)s, off)")
+    parser.add_argument("--compress", action="store_true",
+                        help="write .gz (and .br, if the brotli package is installed) siblings of text outputs, "
+                             "recompressing only outputs whose bytes changed")
+    parser.add_argument("--compress-min-size", type=int, default=DEFAULT_MIN_SIZE, metavar="BYTES",
+                        help="smallest output given compressed siblings (default: %(default)s)")
+    parser.add_argument("--check-links", action="store_true",
+                        help="report internal links and images pointing at no page or static file "
+                             "(re-checking only pages that changed while the set of outputs stays the same)")
+    parser.add_argument("--search", action="store_true",
+                        help="write a client-side search index to 'search/', from terms collected while pages are parsed "
+                             "(rewriting only the index shards that changed)")
+    parser.add_argument("--site-url", metavar="URL",
+                        help="write sitemap.xml and an RSS feed (feed.xml) for the site served at URL, e.g. 'https://example.com', "
+                             "from metadata recorded while pages are parsed")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only print what the build would render, copy and delete: everything for a clean build (and every live file "
+                             "it would drop), or with --incremental what changed, decided exactly like the build by stat calls, "
+                             "hashing only touched files (or every file with --checksum)")
+    parser.add_argument("--shard", metavar="I/N",
+                        help="only build shard I of N (pages split by a stable hash of their path, static files in shard 1), "
+                             "into 'docs.shard-I-of-N' with its own manifest")
+    parser.add_argument("--merge-shards", type=int, metavar="N",
+                        help="combine the outputs and manifests of shards 1 to N into 'docs', instead of building "
+                             "(with --search or --site-url, every shard must have been built with the same flags)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of processes generating pages in parallel, 0 for one per CPU (default: %(default)s)")
+    parser.add_argument("--inline-cache", type=int, default=0, metavar="SIZE",
+                        help="cache the parsed inline markdown of up to SIZE distinct texts (nav, footers, list items) for the whole build")
+    parser.add_argument("--doc-cache", action="store_true",
+                        help="keep parsed pages in an on-disk cache, so rebuilds after template or basepath changes skip parsing")
+    parser.add_argument("--doc-cache-dir", default=document_cache_path,
+                        help="directory of the on-disk document cache (default: %(default)s)")
+    parser.add_argument("--doc-cache-size", type=int, default=256, metavar="MIB",
+                        help="size the document cache is pruned to after each build, in MiB (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every page and pipeline stage, print the totals and slowest pages, and write a JSON report")
+    parser.add_argument("--profile-top", type=int, default=10,
+                        help="number of slowest pages to report when profiling (default: %(default)s)")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="also record the peak memory of every page when profiling (slower)")
+    parser.add_argument("--profile-output", default=profile_path,
+                        help="file the profiling report is written to (default: %(default)s)")
+    args = parser.parse_args()
+    if args.shard is not None:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.watch or args.dry_run:                  # A shard is only part of a site, to be merged with the others
+            parser.error("--shard can't be combined with --watch or --dry-run")
+    if args.watch and args.fingerprint:                 # Watch mode copies changed static files under their own names
+        parser.error("--fingerprint can't be combined with --watch")
+    return args
+
+
+def scan_assets(args, manifest):                ## Hashes the static files when fingerprinting or deduplicating them, pointing links at their new names
+    if not (args.fingerprint or args.dedupe_static):
+        return None
+    assets = AssetIndex.scan(dir_path_static, manifest, args.fingerprint, args.dedupe_static)
+    set_asset_urls(assets.urls)
+    return assets
+
+
+def check_links(manifest):                      ## Reports the broken internal links of a built site
+    checker = LinkChecker(manifest)
+    for page, url in checker.check():
+        print(f" ! broken link in {page}: {url}")
+    print(f" * links: {checker.summary()}")
+
+
+def write_search_index(manifest, basepath):     ## Writes the search index of a built site from the terms its pages recorded
+    index = SearchIndex(manifest, basepath).build().write()
+    print(f" * search: {index.summary()}")
+
+
+def write_sitemap(manifest, site_url, basepath):   ## Writes the sitemap and feed of a built site from the metadata its pages recorded
+    pages = write_site_files(manifest, site_url, basepath)
+    print(f" * sitemap: listed {pages} pages in sitemap.xml and feed.xml")
+
+
 def main():                                     ## Main function used to build static site.
+    args = parse_args()                         # Read the basepath and build options from the command line
+    basepath = args.basepath                    # Use default basepath unless overridden
+    jobs = args.jobs or os.cpu_count() or 1     # '--jobs 0' means one worker process per CPU
+    dir_path_output = dir_path_public           # Where this build's site and manifest go: 'docs' itself,
+    build_manifest_path = manifest_path
+    if args.shard is not None:                  #   or the shard's own directory and manifest
+        dir_path_output = shard_dir(dir_path_public, args.shard)
+        build_manifest_path = shard_manifest(manifest_path, args.shard)
+
+    enable_search(args.search)                                      # Pages record their search terms and metadata while they're parsed
+    enable_metadata(args.site_url is not None)                      #   (shards too, for the merge), which plans and merges have to know about too
+
+    if args.merge_shards:                                           # Merging only combines shards built elsewhere
+        print(f"Merging {args.merge_shards} shard(s)...")
+        def finish(merged):                                         # Only the merged site has every page a link may point at
+            print(f" * merged {len(merged.current)} outputs")       #   or a search may find,
+            check_facts(merged)                                     #   as long as every shard recorded what the merge needs
+            if args.search:
+                write_search_index(merged, basepath)
+            if args.site_url:
+                write_sitemap(merged, args.site_url, basepath)
+            if args.compress:
+                print(f" * {compress_outputs(merged, True, args.compress_min_size).summary()}")
+            if args.check_links:
+                check_links(merged)
+        manifest = merge_shards(dir_path_public, manifest_path, args.merge_shards, finish)
+        manifest.save()                                             # The merged manifest lets later builds of the whole site be incremental
+        return
+
+    if args.dry_run:                                                # A dry run only plans the build: a clean build rebuilds everything
+        manifest = BuildManifest.load(manifest_path, dir_path_public)   #   (dropping every other live file), an incremental one only
+        graph = BuildGraph.for_site(dir_path_content, dir_path_static, template_path, dir_path_templates,  # what changed since the last build
+                                    dir_path_public, basepath, scan_assets(args, manifest))
+        graph.plan(manifest, args.checksum, clean=not args.incremental).print()
+        return
 
-    basepath = default_basepath                 # Use default basepath unless overridden,
-    if len(sys.argv) > 1:                       #   if a base path is provided,
-        basepath = sys.argv[1]                  #   use it instead of the default
+    print("Preparing staging directory...")                         # The site is built next to 'docs', which stays untouched until it's complete:
+    staged = StagedPublish(dir_path_output)                         #   an incremental build starts from hardlinks to the live files,
+    dir_path_staging = staged.prepare(args.incremental)             #   a clean build from an empty directory
+    if args.incremental:                                            # For an incremental build,
+        manifest = BuildManifest.load(build_manifest_path, dir_path_staging)    # load what the previous build produced (keys are relative, so they match the copy)
+    else:
+        manifest = BuildManifest(build_manifest_path, dir_path_staging)     # A clean build starts from an empty manifest
+    inline_cache = enable_inline_cache(args.inline_cache)           # Repeated snippets are parsed once per process when the cache is enabled
+    document_cache = None
+    if args.doc_cache:                                              # Unchanged pages are loaded instead of parsed when the document cache is enabled
+        document_cache = enable_document_cache(args.doc_cache_dir, args.doc_cache_size << 20)
+    profiler = None
+    if args.profile or args.profile_memory:                         # Only pay for timing pages when asked to
+        profiler = BuildProfiler(args.profile_memory)
 
-    print("Deleting public directory...")       # Notify user the directory is being deleted
-    if os.path.exists(dir_path_public):         # Check if the target directory 'docs' exist
-        shutil.rmtree(dir_path_public)          # Delete the 'docs' directory and all of its contents recursively
+    assets = scan_assets(args, manifest)                            # Static files are hashed first when pages link to them by content
 
-    print("Copying static files to public directory...")    # Notify user of files being copied over to public directory
-    copy_files_recursive(dir_path_static, dir_path_public)  # Recursively copy all files from 'static'
+    if args.shard is None or args.shard[0] == 1:            # Static files are copied by a single shard (others only hash them when fingerprinting)
+        print("Copying static files to public directory...")    # Notify user of files being copied over to public directory
+        copy_stats = copy_files_recursive(dir_path_static, dir_path_staging, manifest, args.checksum, args.link_static,
+                                          args.copy_threads, not args.quiet, assets)
+        ### Recursively copy all files from 'static' over several threads, skipping those whose copy is already up to date
+        print(f" * {copy_stats.summary()}")                # Summarize the files, bytes and throughput of the copy
 
     print("Generating content...")              # Notify user that HTML pages will be created using the content and the template - content generation process is beginning
-    generate_pages_recursive(dir_path_content, template_path, dir_path_public, basepath)
+    generate_pages_recursive(dir_path_content, template_path, dir_path_staging, basepath, manifest, jobs, dir_path_templates,
+                             profiler, args.checksum, args.writers, args.shard)
     ### Traverse through the 'content' directory ('dir_path_content'), processing each content file
-    ### Use the 'template_path' file to wrap the raw content in a standardized HTML structure
-    ### Write the newly generated HJTML files into the 'docs' directory ('dir_path_public')
-    ### The 'basepath' is used to adjust relative links in the HTML 
+    ### Use the 'template_path' file (or a section's named template) to wrap the raw content in a standardized HTML structure
+    ### Write the newly generated HJTML files into the staging copy of the 'docs' directory ('dir_path_staging')
+    ### The 'basepath' is used to adjust relative links in the HTML
+    ### Pages whose inputs match the manifest are skipped, the rest are shared out over 'jobs' processes
+    ### With '--shard', only the pages of that shard are generated
+
+    if args.search and args.shard is None:                      # The index, sitemap and feed are written from what pages recorded,
+        write_search_index(manifest, basepath)                  #   before compression sees them
+    if args.site_url and args.shard is None:
+        write_sitemap(manifest, args.site_url, basepath)
+    compress_stats = compress_outputs(manifest, args.compress, args.compress_min_size)  # Without '--compress', this only removes siblings a previous build wrote
+    if args.compress:
+        print(f" * {compress_stats.summary()}")
+    for removed_path in manifest.remove_stale():                # Delete outputs whose sources no longer exist,
+        print(f" * removed {removed_path}")                     #   informing the user of each one
+    if args.check_links:                                        # Check links against the finished site, before anyone sees it
+        if args.shard is None:
+            check_links(manifest)
+        else:
+            print(" * links are checked when the shards are merged")
+    print("Publishing...")
+    staged.publish()                                            # Swap the finished site into place in one step
+    manifest.root = dir_path_output                             # The outputs are now the live ones,
+    manifest.save()                                             #   remembered for the next incremental build only once they are
+    if inline_cache is not None:                                # Report how the inline cache did, to help size it
+        print(f" * inline cache: {inline_cache.summary()}")
+    if document_cache is not None:                              # Report how the document cache did,
+        evicted = document_cache.prune()                        #   after evicting entries beyond its size cap
+        print(f" * document cache: {document_cache.summary()}, {evicted} evicted")
+
+    if profiler is not None:                                    # Report where the build spent its time
+        report = profiler.write(args.profile_output, args.profile_top)
+        profiler.print_summary(report)
+        print(f"Wrote profile of {len(profiler.pages)} page(s) to {args.profile_output}")
+
+    if args.watch:                                              # In watch mode, keep the process (and everything it imported) running,
+        manifest.rebase()                                       #   starting from what this build produced,
+        watcher = SiteWatcher(dir_path_content, dir_path_static, template_path, dir_path_templates,
+                              dir_path_public, basepath, manifest, args.link_static,
+                              args.compress, args.compress_min_size, args.search, args.site_url)
+        watcher.run(args.interval)                              #   and rebuild only what changes
+
 
-main()
\ No newline at end of file
+if __name__ == "__main__":                      # Only build when run as a script, so worker processes can import this module safely
+    main()
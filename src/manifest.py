@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from publish import atomic_open
+
+
+GENERATOR_VERSION = "5"     # Bump whenever a change to the generator alters its output, so every page is rebuilt once
+GENERATED_SOURCE = "(generated)"    # Source recorded for outputs generated from the whole site (e.g. the search index) rather than from one file
+
+
+def hash_file(path):                                            ## Returns the SHA-256 hex digest of a file's contents
+    digest = hashlib.sha256()                                   # Start a new hash,
+    with open(path, "rb") as file:                              #   open the file in binary mode,
+        for chunk in iter(lambda: file.read(1 << 16), b""):     #   read it in 64 KiB chunks so big files never sit in memory whole,
+            digest.update(chunk)                                #   feed every chunk into the hash
+    return digest.hexdigest()                                   # Return the digest as a hex string
+
+
+def hash_inputs(*parts):                        ## Combines several input strings (hashes, basepath, version) into a single digest
+    digest = hashlib.sha256()                   # Start a new hash,
+    for part in parts:                          #   for every input,
+        digest.update(part.encode("utf-8"))     #   feed in its bytes,
+        digest.update(b"\0")                    #   followed by a separator so ("ab", "c") and ("a", "bc") differ
+    return digest.hexdigest()                   # Return the combined digest as a hex string
+
+
+def stat_signature(path):                       ## Identifies a file's version by (size, modification time) with one `stat` call, None if it's missing
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]     # A list, so it compares equal to the copy read back from JSON
+
+
+def page_params(basepath, asset_digest=""):     ## Digest of the build settings every page depends on besides its files
+    if asset_digest:                            # Pages linking to fingerprinted assets also depend on their names
+        return hash_inputs(GENERATOR_VERSION, basepath, asset_digest)
+    return hash_inputs(GENERATOR_VERSION, basepath)
+
+
+class BuildManifest:                                    ## Records which inputs produced each output file, so unchanged outputs can be skipped next build
+    def __init__(self, path, root, entries=None):       # 'path' is where the manifest is stored, 'root' is the output directory it describes
+        self.path = path                                # Location of the manifest file
+        self.root = root                                # Output directory - manifest keys are paths relative to it
+        self.entries = entries or {}                    # Entries from the previous build: output key -> {"source": ..., "digest": ...}
+        self.current = {}                               # Entries recorded during this build
+
+    @classmethod
+    def load(cls, path, root):                          ## Loads the manifest of the previous build, or an empty one if there is none
+        if not os.path.exists(path):                    # If no build has recorded a manifest yet,
+            return cls(path, root)                      #   start from an empty manifest
+        try:
+            with open(path, "r") as file:               # Read the stored manifest,
+                data = json.load(file)
+        except (OSError, ValueError):                   # If it can't be read or is corrupt,
+            return cls(path, root)                      #   fall back to an empty manifest (a full rebuild)
+        return cls(path, root, data.get("entries", {}))
+
+    def key(self, dest_path):                                           ## Converts an output path into its manifest key
+        return Path(os.path.relpath(dest_path, self.root)).as_posix()   # Keys are relative to the output root and always use '/' separators
+
+    def is_fresh(self, dest_path, digest):                              ## True if 'dest_path' was built last time from inputs with the same digest
+        entry = self.entries.get(self.key(dest_path))                   # Look up what the previous build recorded for this output,
+        if entry is None or entry["digest"] != digest:                  #   if it wasn't built or its inputs changed,
+            return False                                                #   it has to be rebuilt
+        return os.path.exists(dest_path)                                # Otherwise it's fresh as long as the file is still there
+
+    def change_reason(self, dest_path, inputs, params=None):            ## Why 'dest_path' needs rebuilding, judged by `stat` alone, or None if it's up to date
+        entry = self.entries.get(self.key(dest_path))                   # 'inputs' maps every input file to its current `stat_signature`
+        if entry is None:
+            return "new"
+        if entry.get("params") != params:
+            return "settings changed"
+        recorded = entry.get("inputs")
+        if recorded is None:                                            # Recorded by a build that didn't keep signatures
+            return "changed"
+        for path, signature in inputs.items():
+            if recorded.get(path) != signature:
+                return f"{path} changed"
+        if not os.path.exists(dest_path):
+            return "output missing"
+        return None
+
+    def record(self, dest_path, source_path, digest, inputs=None, params=None, facts=None):    ## Records that 'dest_path' is now built from 'source_path' with inputs 'digest'
+        entry = {"source": str(source_path), "digest": digest}
+        if inputs is not None:                                          # The `stat` signatures of its input files and the settings it
+            entry["inputs"] = inputs                                    #   was built with let the next build skip it without hashing
+            entry["params"] = params
+        if facts is not None:                                           # What was learnt parsing a page (links, search terms), so
+            entry.update(facts)                                         #   whole-site steps never have to parse it again
+        self.current[self.key(dest_path)] = entry
+
+    def write_generated(self, dest_path, content):                      ## Writes an output generated from the whole site (bytes), unless it already holds 'content'; True if written
+        digest = hashlib.sha256(content).hexdigest()
+        previous = self.previous(dest_path)
+        written = previous is None or previous["digest"] != digest or not os.path.exists(dest_path)
+        if written:                                                     # Unchanged files keep their mtime, so servers and caches see no change
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            with atomic_open(dest_path, "wb") as file:
+                file.write(content)
+        self.record(dest_path, GENERATED_SOURCE, digest)                # Recorded either way, so it isn't removed as stale
+        return written
+
+    def previous(self, dest_path):                                      ## What the previous build recorded for 'dest_path', or None
+        return self.entries.get(self.key(dest_path))
+
+    def keep(self, dest_path):                                          ## Records 'dest_path' exactly as the previous build did, since nothing it depends on changed
+        key = self.key(dest_path)
+        self.current[key] = self.entries[key]
+
+    def rebase(self):                                                   ## Makes this build's entries the baseline for the next one, keeping them recorded
+        self.entries = dict(self.current)                               #   (used between the rebuilds of watch mode)
+
+    def remove_stale(self):                                             ## Deletes outputs of the previous build that were not produced by this one
+        removed = []                                                    # Paths that were deleted, for reporting
+        for key in sorted(self.entries):                                # Check every output the previous build produced,
+            if key in self.current:                                     #   skip those this build produced again
+                continue
+            if self._remove_output(key, self.entries[key]):             # Otherwise its source is gone, so delete the output
+                removed.append(os.path.join(self.root, key))
+        return removed
+
+    def forget(self, dest_path):                                        ## Deletes an output whose source was removed during this build (e.g. in watch mode)
+        key = self.key(dest_path)
+        entry = self.current.pop(key, None) or self.entries.get(key)
+        return self._remove_output(key, entry)
+
+    def _remove_output(self, key, entry=None):                          ## Deletes the output with the given key, returning whether it existed
+        dest_path = os.path.join(self.root, key)
+        existed = os.path.isfile(dest_path)
+        if existed:                                                     # If the stale output still exists,
+            os.remove(dest_path)                                        #   delete it,
+        for suffix in ((entry or {}).get("compressed") or {}).get("suffixes", []):
+            if os.path.isfile(dest_path + suffix):                      #   along with its compressed siblings,
+                os.remove(dest_path + suffix)
+        self._prune_empty_dirs(os.path.dirname(dest_path))              #   and drop directories that are now empty
+        return existed
+
+    def _prune_empty_dirs(self, dir_path):                              ## Removes empty directories from 'dir_path' up to (not including) the output root
+        root = os.path.abspath(self.root)
+        dir_path = os.path.abspath(dir_path)
+        while dir_path != root and dir_path.startswith(root + os.sep):  # Never walk above the output root,
+            if not os.path.isdir(dir_path) or os.listdir(dir_path):     #   stop at the first directory that is missing or not empty
+                return
+            os.rmdir(dir_path)                                          # Remove the empty directory,
+            dir_path = os.path.dirname(dir_path)                        #   then look at its parent
+
+    def save(self):                                                     ## Writes the entries recorded during this build to disk
+        data = {"version": GENERATOR_VERSION, "entries": self.current}
+        temp_path = self.path + ".tmp"                                  # Write to a temporary file first,
+        with open(temp_path, "w") as file:
+            json.dump(data, file, indent=1, sort_keys=True)             #   with sorted keys so the manifest itself is deterministic,
+        os.replace(temp_path, self.path)                                #   then swap it into place so a crash never leaves half a manifest
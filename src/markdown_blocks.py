@@ -1,7 +1,8 @@
 from enum import Enum
 
+import profiler
 from htmlnode import ParentNode
-from inline_markdown import text_to_textnodes
+from inline_markdown import parse_inline
 from textnode import text_node_to_html_node, TextNode, TextType
 
 
@@ -14,105 +15,163 @@ class BlockType(Enum):          ##  Enumeration of Markdown block types
     ULIST = "unordered_list"    # Unordered list (lines starting with `'`)
 
 
-def markdown_to_blocks(markdown):           ## Splits Markdown into isolated blocks by double line breaks
-    blocks = markdown.split("\n\n")         # Break on double new lines
-    filtered_blocks = []                    # Holds non-empty blocks
-    for block in blocks:                    # Iterates each block,
-        if block == "":                     #   skip empty block
-            continue                        
-        block = block.strip()               # Remove unnecessary white space
-        filtered_blocks.append(block)       # Add cleaned block to the list
-    return filtered_blocks                  # Returns all cleaned Markdown blocks
-
-
-def block_to_block_type(block):                                                             ## Determines the type of a Markdown block
-    lines = block.split("\n")                                                               # Splits the block into individual lines
-
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):               # If block starts with 1-6 `#`,
-        return BlockType.HEADING                                                            #   block is a markdown heading
-
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):       # If block is more than 1 line, and starts + ends with ```,
-        return BlockType.CODE                                                               #   block is fenced code block
-
-    if block.startswith(">"):                                                               # If block starts with `>`,
-        for line in lines:                                                                  #   check each line in the block,
-            if not line.startswith(">"):                                                    #     if any line does NOT start with `>`,
-                return BlockType.PARAGRAPH                                                  #       treat block as a paragraph, not a quote
-        return BlockType.QUOTE                                                              #   otherwise, (if every line DOES start with `>`) block is quote block
-
-    if block.startswith("- "):                                                              # If block starts with `- `,
-        for line in lines:                                                                  #   check each line in the block,
-            if not line.startswith("- "):                                                   #     if any line does NOT start with `- `,
-                return BlockType.PARAGRAPH                                                  #       treat block as a paragraph, not an unordered list
-        return BlockType.ULIST                                                              #   otherwise (if every line DOES start with `- `) block is an unordered list
-
-    if block.startswith("1. "):                                                             # If block starts with `1. `,
-        i = 1                                                                               #   initialize counter for ordered list numbering
-        for line in lines:                                                                  #   check each line in the block,
-            if not line.startswith(f"{i}. "):                                               #     if any line does NOT match the expected number + `. `,
-                return BlockType.PARAGRAPH                                                  #       treat block as a paragraph, not an ordered list
-            i += 1                                                                          #   increment counter to checklthe next number
-        return BlockType.OLIST                                                              #   otherwise (if every line DOES start with appropriate number + `. `) block is an ordered list
-    return BlockType.PARAGRAPH
-
-
-def markdown_to_html_node(markdown):                ## Converts Markdown text into an HTML node tree
-    blocks = markdown_to_blocks(markdown)           # Break Markdown into blocks of content
-    children = []                                   # Prepare to collect child HTML nodes
-    for block in blocks:                            # Process each block,
-        html_node = block_to_html_node(block)       #   convert block into corresponding HTML node
-        children.append(html_node)                  #   add HTML node to children list
-    return ParentNode("div", children, None)        # Return a `div` containing all child nodes
-
-
-def block_to_html_node(block):                      ## Converts a block of Markdown to its corresponding HTML node
-    block_type = block_to_block_type(block)         # Determine the tupe of the Markdown block
-    if block_type == BlockType.PARAGRAPH:           # If the block is a paragraph,
-        return paragraph_to_html_node(block)        #   convert it to a paragraph HTML node
-    if block_type == BlockType.HEADING:             # If the block is a heading,
-        return heading_to_html_node(block)          #   convert it to a heading HTML node
-    if block_type == BlockType.CODE:                # If the block is a code block,
-        return code_to_html_node(block)             #   convert it to a code HTML node
-    if block_type == BlockType.OLIST:               # If the block is an ordered list,
-        return olist_to_html_node(block)            #   convert it to an ordered list HTML node
-    if block_type == BlockType.ULIST:               # If the block is an unordered list,
-        return ulist_to_html_node(block)            #   convert it to an unordered list HTML node
-    if block_type == BlockType.QUOTE:               # If the block is a quote block,
-        return quote_to_html_node(block)            #   convert it to a blockquote HTML node
-    raise ValueError("invalid block type")          # Raise an error if the block type is not recognized
-
-
-def text_to_children(text):                                 ## Converts raw text into a list of HTML child nodes
-    text_nodes = text_to_textnodes(text)                    # Break up the text into text nodes
+def iter_lines(markdown):                                   ## Yields the lines of markdown given as a string or as an open file, without their '\n'
+    if not isinstance(markdown, str):                       # A file (or any iterable of lines) is read one line at a time,
+        for line in markdown:
+            yield line[:-1] if line.endswith("\n") else line
+        return
+    start = 0                                               #   while a string is scanned in place, never split into a list
+    while True:
+        end = markdown.find("\n", start)
+        if end == -1:
+            yield markdown[start:]
+            return
+        yield markdown[start:end]
+        start = end + 1
+
+
+def iter_blocks(markdown):                                  ## Yields (block type, payload) for every block, scanning the markdown once, line by line
+    for lines in iter_block_lines(markdown):                #   (see `classify_block` for what each payload holds)
+        yield classify_block(lines)
+
+
+def iter_block_lines(markdown):                             ## Yields the lines of every block as soon as the block ends
+    lines = []                                              # Lines of the block being collected - the only part of the document held in memory
+    in_fence = False                                        # Inside a ``` code block, blank lines belong to the code
+    for line in iter_lines(markdown):
+        if in_fence:
+            lines.append(line)
+            if line.startswith("```"):                      # The closing fence ends the code, though not (yet) the block
+                in_fence = False
+            continue
+        if line == "" or line.isspace():                    # Blank and whitespace-only lines (any number of them) separate blocks
+            if lines:
+                yield _finish_block(lines)
+                lines = []
+            continue
+        if not lines:
+            line = line.lstrip()                            # A block never starts with whitespace,
+            in_fence = line.startswith("```") and "```" not in line[3:]     # and one opening with a fence runs until the fence closes
+        lines.append(line)
+    if lines:
+        yield _finish_block(lines)
+
+
+def _finish_block(lines):                                   ## Trims a block's lines, once its last line is known
+    while lines[-1] == "" or lines[-1].isspace():           # An unclosed fence can end on blank lines,
+        lines.pop()
+    lines[-1] = lines[-1].rstrip()                          #   and a block never ends with whitespace
+    return lines
+
+
+def markdown_to_blocks(markdown):                           ## Splits Markdown into isolated blocks separated by blank lines
+    return ["\n".join(lines) for lines in iter_block_lines(markdown)]
+
+
+def block_to_block_type(block):                             ## Determines the type of a Markdown block
+    return classify_block(block.split("\n"))[0]            # Splits the block into individual lines
+
+
+def classify_block(lines):                                                  ## Works out a block's type and extracts its payload in a single scan of its lines
+    first = lines[0]                                                        # The first line decides which type the block can be,
+                                                                            #   and only that type's rule is checked against the other lines
+    if first.startswith("#"):                                               # If block starts with 1-6 `#` and a space,
+        level = len(first) - len(first.lstrip("#"))
+        if level <= 6 and first.startswith(" ", level):                     #   block is a markdown heading: payload is (level, text)
+            return BlockType.HEADING, (level, "\n".join(lines)[level + 1 :])
+
+    elif first.startswith("```"):                                           # If block is more than 1 line, and starts + ends with ```,
+        if len(lines) > 1 and lines[-1].startswith("```"):                  #   block is fenced code block: payload is the whole block, fences included
+            return BlockType.CODE, "\n".join(lines)
+
+    elif first.startswith(">"):                                             # If block starts with `>`,
+        quoted = []
+        for line in lines:                                                  #   check each line in the block,
+            if not line.startswith(">"):                                    #     if any line does NOT start with `>`,
+                break                                                       #       treat block as a paragraph, not a quote
+            quoted.append(line.lstrip(">").strip())                         #     otherwise keep the line without its `>` and whitespace
+        else:                                                               #   if every line DOES start with `>` block is quote block:
+            return BlockType.QUOTE, " ".join(quoted)                        #   payload is the quoted text
+
+    elif first.startswith("- "):                                            # If block starts with `- `,
+        items = []
+        for line in lines:                                                  #   check each line in the block,
+            if not line.startswith("- "):                                   #     if any line does NOT start with `- `,
+                break                                                       #       treat block as a paragraph, not an unordered list
+            items.append(line[2:])                                          #     otherwise keep the item without its `- `
+        else:                                                               #   if every line DOES, block is an unordered list:
+            return BlockType.ULIST, items                                   #   payload is the text of every item
+
+    elif first.startswith("1. "):                                           # If block starts with `1. `,
+        items = []
+        for i, line in enumerate(lines, 1):                                 #   check each line in the block,
+            number = str(i)
+            if not line.startswith(number) or not line.startswith(". ", len(number)):  # if any line does NOT match the expected number + `. `,
+                break                                                       #       treat block as a paragraph, not an ordered list
+            items.append(line[3:])                                          #     otherwise keep the item without its "1. " prefix
+        else:                                                               #   if every line DOES, block is an ordered list:
+            return BlockType.OLIST, items                                   #   payload is the text of every item
+
+    return BlockType.PARAGRAPH, " ".join(lines)                             # Anything else is a paragraph: payload is its lines joined by spaces
+
+
+def markdown_to_html_node(markdown, resolver=None):         ## Converts Markdown (a string or an open file) into an HTML node tree, resolving link URLs with 'resolver'
+    children = []                                           # Prepare to collect child HTML nodes
+    for block_type, payload in iter_blocks(markdown):       # Process each block as soon as it has been scanned,
+        children.append(BLOCK_HANDLERS[block_type](payload, resolver))  # converting it into the corresponding HTML node
+    return ParentNode("div", children, None)                # Return a `div` containing all child nodes
+
+
+def line_title(line):                                       ## The title a line of markdown gives its page (the text of a top-level heading), or None
+    return line[2:] if line.startswith("# ") else None      # Any line starting with "# " counts, wherever it is in a block
+
+
+def markdown_to_page(markdown, resolver=None):              ## Converts a page's Markdown into (HTML node tree, title), finding the title (its first top-level heading) in the same scan
+    title = None
+
+    def watched_lines():                                    # Every line is checked for the title as the blocks are scanned,
+        nonlocal title                                      #   so the markdown never has to be read again for it
+        for line in iter_lines(markdown):
+            if title is None:
+                title = line_title(line)
+            yield line
+
+    children = [BLOCK_HANDLERS[block_type](payload, resolver) for block_type, payload in iter_blocks(watched_lines())]
+    if title is None:
+        raise ValueError("no title found")
+    return ParentNode("div", children, None), title
+
+
+def block_to_html_node(block, resolver=None):               ## Converts a block of Markdown to its corresponding HTML node
+    block_type, payload = classify_block(block.split("\n"))    # Determine the type of the Markdown block and extract its payload,
+    return BLOCK_HANDLERS[block_type](payload, resolver)    #   then convert it with the handler for that type
+
+
+def text_to_children(text, resolver=None):                  ## Converts raw text into a list of HTML child nodes
+    if profiler.active is None:                             # Break up the text into text nodes,
+        text_nodes = parse_inline(text)
+    else:                                                   #   timing it as its own stage when the page is being profiled
+        with profiler.active.stage("inline"):
+            text_nodes = parse_inline(text)
     children = []                                           # Prepare a list for the resulting HTML nodes
     for text_node in text_nodes:                            # Iterates though each text node,
-        html_node = text_node_to_html_node(text_node)       #   convert the text node to an HTML node
+        html_node = text_node_to_html_node(text_node, resolver)     # convert the text node to an HTML node, resolving its URL
         children.append(html_node)                          #   append the HTML node to the list of children
     return children                                         # Return the list of HTML child nodes
 
 
-def paragraph_to_html_node(block):              ## Converts a Markdown paragraph block to an HTML node
-    lines = block.split("\n")                   # Split the block into lines, as parahraphs may span multiple lines
-    paragraph = " ".join(lines)                 # Join all lines into one, separating with spaces to maintain cohesion
-    children = text_to_children(paragraph)      # Convert the paragraph text into child HTML nodes
+def paragraph_to_html_node(paragraph, resolver=None):   ## Converts the text of a Markdown paragraph block to an HTML node
+    children = text_to_children(paragraph, resolver)    # Convert the paragraph text (its lines joined by spaces) into child HTML nodes
     return ParentNode("p", children)            # Wrap the children in a 'p' (paragraph) HTML node and return it
 
 
-def heading_to_html_node(block):                                ## Converts a Markdown heading block to an HTML node
-    level = 0                                                   # Initialize the heading level ('h1', 'h2', etc.)
-    for char in block:                                          # Loop through each character in the block,
-        if char == "#":                                         #   increment the level for each '#' encountered
-            level += 1
-        else:                                                   
-            break                                               # Stop counting once non-# characters are encountered
-    if level + 1 >= len(block):                                 # Check for invalid headings with too few characters after '#'
-        raise ValueError(f"invalid heading level: {level}")     #   raise an error if invalid
-    text = block[level + 1 :]                                   # Extract the heading's text (skip `level + 1` characters for '#', spaces, etc.)
-    children = text_to_children(text)                           # Convert the heading text into child HTML nodes
+def heading_to_html_node(heading, resolver=None):               ## Converts the (level, text) of a Markdown heading block to an HTML node
+    level, text = heading                                       # The level ('h1', 'h2', etc.) and text were found while classifying the block
+    children = text_to_children(text, resolver)                 # Convert the heading text into child HTML nodes
     return ParentNode(f"h{level}", children)                    # Return an HTML node with the appropriate heading level
 
 
-def code_to_html_node(block):                                           ## Converts a Markdown code block to an HTML node
+def code_to_html_node(block, resolver=None):                            ## Converts a Markdown code block to an HTML node
     if not block.startswith("```") or not block.endswith("```"):        # Ensure the block starts AND ends with ```
         raise ValueError("invalid code block")                          #   raise an error if that is not the case
     text = block[4:-3]                                                  # Extract the content inside the triple backticks
@@ -122,33 +181,32 @@ def code_to_html_node(block):                                           ## Conve
     return ParentNode("pre", [code])                                    # Wrap the <code> element in a <pre> HTML element node, and return
 
 
-def olist_to_html_node(block):                              ## Converts a Markdown ordered list block to an HTML node
-    items = block.split("\n")                               # Split the block into individual list items
+def olist_to_html_node(items, resolver=None):               ## Converts the item texts of a Markdown ordered list block to an HTML node
     html_items = []                                         # Initialize a list to store the HTML representations of each item
-    for item in items:                                      # Loop through each list item in the block,
-        text = item[3:]                                     #   skip the "1. " prefix
-        children = text_to_children(text)                   #   convert the text of the list item into child HTML nodes
+    for text in items:                                      # Loop through each list item in the block,
+        children = text_to_children(text, resolver)         #   convert the text of the list item into child HTML nodes
         html_items.append(ParentNode("li", children))       #   create an <li> node for the item and append it to the list
     return ParentNode("ol", html_items)                     # Wrap all <li> nodes in an <ol> HTML element node and return
 
 
-def ulist_to_html_node(block):                              ## Converts a Markdown unordered list block to an HTML node
-    items = block.split("\n")                               # Split the block into individual list items
+def ulist_to_html_node(items, resolver=None):               ## Converts the item texts of a Markdown unordered list block to an HTML node
     html_items = []                                         # Initialize a list to store the HTML representations of each item
-    for item in items:                                      # Loop through each list item in the block, 
-        text = item[2:]                                     #   skip the "- " prefix,
-        children = text_to_children(text)                   #   convert the text of the list item into child HTML nodes
-        html_items.append(ParentNode("li", children))       #   create an <li> node for the item and append it to the list 
+    for text in items:                                      # Loop through each list item in the block,
+        children = text_to_children(text, resolver)         #   convert the text of the list item into child HTML nodes
+        html_items.append(ParentNode("li", children))       #   create an <li> node for the item and append it to the list
     return ParentNode("ul", html_items)                     # Wrap all <li> noddes in a <ul> HTML element node and return
 
 
-def quote_to_html_node(block):                              ## Converts a Markdown blockquote block to an HTML node
-    lines = block.split("\n")                               # Split the block into individual lines using newlines
-    new_lines = []                                          # Initialize a list to store processed lines from the blockquote
-    for line in lines:                                      # Loop through each line in the block
-        if not line.startswith(">"):                        # Check if the line starts with a ">", as is reqauired for a blockquote
-            raise ValueError("invalid quote block")         #   raise an error if a line does not start with the correct character
-        new_lines.append(line.lstrip(">").strip())          #   remove the leading ">", struop any extra whitespace, and store the result
-    content = " ".join(new_lines)                           # Combine all processed lines into a single string, forming the quote content
-    children = text_to_children(content)                    # Convert the combined content into HTML nodes
-    return ParentNode("blockquote", children)               # Wrap the child nodes in a <blockquote> node and return the result
\ No newline at end of file
+def quote_to_html_node(content, resolver=None):             ## Converts the quoted text of a Markdown blockquote block to an HTML node
+    children = text_to_children(content, resolver)          # Convert the quoted lines (joined by spaces) into HTML nodes
+    return ParentNode("blockquote", children)               # Wrap the child nodes in a <blockquote> node and return the result
+
+
+BLOCK_HANDLERS = {                          ## Block type -> function converting the block's payload into an HTML node
+    BlockType.PARAGRAPH: paragraph_to_html_node,
+    BlockType.HEADING: heading_to_html_node,
+    BlockType.CODE: code_to_html_node,
+    BlockType.OLIST: olist_to_html_node,
+    BlockType.ULIST: ulist_to_html_node,
+    BlockType.QUOTE: quote_to_html_node,
+}
@@ -0,0 +1,73 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from publish import atomic_open
+
+
+PREFETCH_DEPTH = 16     # Files read ahead of the page being parsed
+
+
+def make_dirs(file_paths):                                      ## Creates the directories of all the given files at once, each only once
+    dir_paths = sorted({os.path.dirname(path) for path in file_paths} - {""})
+    for i, dir_path in enumerate(dir_paths):                    # Sorted, a directory comes right before the ones inside it,
+        following = dir_paths[i + 1] if i + 1 < len(dir_paths) else ""
+        if following.startswith(os.path.join(dir_path, "")):    #   which create it along the way
+            continue
+        os.makedirs(dir_path, exist_ok=True)
+
+
+def read_text(path):                                            ## The contents of a text file
+    with open(path, "r") as file:
+        return file.read()
+
+
+def prefetch(paths, read=read_text, depth=PREFETCH_DEPTH):      ## Yields read(path) for every path in order, reading up to 'depth' files ahead on a background thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = deque()                                       # Reads submitted but not yet handed out, oldest first
+        for path in paths:
+            pending.append(executor.submit(read, path))
+            if len(pending) > depth:                            # Once far enough ahead, hand out the oldest read for each new one
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class PageWriter:                                               ## Writes files on background threads, fed through a bounded queue
+    def __init__(self, threads, queue_size=None):
+        self.queue = queue.Queue(maxsize=queue_size or threads * 4)     # Bounded, so rendering can't run arbitrarily far ahead of the disk
+        self.failures = []                                      # (path, error message) for every write that failed
+        self.threads = [threading.Thread(target=self._run, daemon=True) for _ in range(max(1, threads))]
+        for thread in self.threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def write(self, path, text):                                ## Queues 'text' to be written to 'path', waiting while the queue is full
+        self.queue.put((path, text))
+
+    def close(self):                                            ## Waits for every queued write, returning the failures
+        for _ in self.threads:                                  # One stop marker per thread, behind the queued writes
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        return self.failures
+
+    def _run(self):                                             ## A writer thread: writes queued files until it takes a stop marker
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            path, text = item
+            try:
+                with atomic_open(path) as file:                 # Pages replace their previous version in one step
+                    file.write(text)
+            except OSError as e:                                # Failures are collected, so the other pages still get written
+                self.failures.append((path, f"{type(e).__name__}: {e}"))
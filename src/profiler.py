@@ -0,0 +1,130 @@
+import json
+import time
+import tracemalloc
+
+
+active = None   # PageProfile of the page this process is generating, when profiling (checked by the parser for inline timing)
+
+
+class StageTimer:                                               ## Context manager timing one stage; time spent in nested stages is not counted twice
+    __slots__ = ("profile", "name", "wall", "cpu", "child_wall", "child_cpu")
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.child_wall = 0.0                                   # Time spent in stages nested inside this one
+        self.child_cpu = 0.0
+        self.profile._stack.append(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall                  # Total time inside the stage,
+        cpu = time.process_time() - self.cpu
+        stack = self.profile._stack
+        stack.pop()
+        totals = self.profile.stages.setdefault(self.name, [0.0, 0.0])
+        totals[0] += wall - self.child_wall                     #   minus the time its nested stages already recorded
+        totals[1] += cpu - self.child_cpu
+        if stack:                                               # The enclosing stage must not count this time again
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        return False
+
+
+class PageProfile:                                              ## Wall time, CPU time and (optionally) peak memory of one page, per stage
+    def __init__(self, page, track_memory=False):
+        self.page = str(page)                                   # Source path of the page
+        self.track_memory = track_memory                        # Whether to record the page's peak traced memory
+        self.stages = {}                                        # Stage name -> [wall seconds, CPU seconds]
+        self.wall = 0.0                                         # Totals for the whole page
+        self.cpu = 0.0
+        self.peak_memory = None
+        self._stack = []                                        # Stages currently running, innermost last
+
+    def stage(self, name):                                      ## Times a stage: `with profile.stage("parse"): ...`
+        return StageTimer(self, name)
+
+    def __enter__(self):                                        ## Times the whole page, and makes it the active profile of this process
+        global active
+        if self.track_memory:
+            if not tracemalloc.is_tracing():                    # Memory tracing starts lazily, so it also works in worker processes
+                tracemalloc.start()
+            tracemalloc.reset_peak()                            # Peak memory is measured per page
+        active = self
+        self._started = (time.perf_counter(), time.process_time())
+        return self
+
+    def __exit__(self, *exc_info):
+        global active
+        self.wall = time.perf_counter() - self._started[0]
+        self.cpu = time.process_time() - self._started[1]
+        if self.track_memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+        active = None
+        return False
+
+    def to_dict(self):                                          ## A JSON-friendly (and picklable) summary of the profile
+        return {
+            "page": self.page,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "peak_memory": self.peak_memory,
+            "stages": {name: {"wall": wall, "cpu": cpu} for name, (wall, cpu) in self.stages.items()},
+        }
+
+
+class BuildProfiler:                                            ## Collects the page profiles of a build and reports on them
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory                        # Whether pages record their peak memory (slows the build down)
+        self.pages = []                                         # Page profiles as dictionaries, in the order pages finished
+        self.started = (time.perf_counter(), time.process_time())
+
+    def page(self, page):                                       ## A new profile for one page
+        return PageProfile(page, self.track_memory)
+
+    def add(self, profile):                                     ## Adds a finished page profile (from this process or a worker)
+        self.pages.append(profile)
+
+    def slowest(self, count):                                   ## The 'count' pages that took the most wall time
+        return sorted(self.pages, key=lambda page: page["wall"], reverse=True)[:count]
+
+    def report(self, top=10):                                   ## The whole profile as a JSON-friendly dictionary
+        stages = {}
+        for page in self.pages:                                 # Add up every stage across all pages
+            for name, times in page["stages"].items():
+                totals = stages.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+                totals["wall"] += times["wall"]
+                totals["cpu"] += times["cpu"]
+        return {
+            "build": {
+                "wall": time.perf_counter() - self.started[0],
+                "cpu": time.process_time() - self.started[1],  # CPU time of this process (workers' CPU time is in the page totals)
+                "pages": len(self.pages),
+            },
+            "stages": stages,
+            "slowest": [page["page"] for page in self.slowest(top)],
+            "pages": sorted(self.pages, key=lambda page: page["page"]),
+        }
+
+    def write(self, path, top=10):                              ## Writes the report as JSON, returning it
+        report = self.report(top)
+        with open(path, "w") as file:
+            json.dump(report, file, indent=1)
+        return report
+
+    def print_summary(self, report):                            ## Prints per-stage totals and the slowest pages
+        print("Stage totals:")
+        for name, times in sorted(report["stages"].items(), key=lambda item: -item[1]["wall"]):
+            print(f"   {name:10} {times['wall'] * 1000:10.1f} ms wall {times['cpu'] * 1000:10.1f} ms cpu")
+        print("Slowest pages:")
+        pages = {page["page"]: page for page in report["pages"]}
+        for name in report["slowest"]:
+            page = pages[name]
+            memory = ""
+            if page["peak_memory"] is not None:
+                memory = f" {page['peak_memory'] / (1 << 20):8.2f} MiB peak"
+            print(f"   {page['wall'] * 1000:10.1f} ms wall {page['cpu'] * 1000:10.1f} ms cpu{memory}  {name}")
@@ -0,0 +1,86 @@
+import contextlib
+import ctypes
+import os
+import shutil
+import sys
+import threading
+
+
+AT_FDCWD = -100         # `renameat2` directory argument meaning "relative to the working directory"
+RENAME_EXCHANGE = 2     # `renameat2` flag swapping two paths in one atomic step (Linux 3.15+)
+
+
+def temp_path(path):                                            ## A temporary path next to 'path', unique to this process and thread
+    dir_path, name = os.path.split(path)
+    return os.path.join(dir_path, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+@contextlib.contextmanager
+def atomic_open(path, mode="w"):                                ## Opens a temporary file for writing that replaces 'path' once closed, so readers see the old file or the new one
+    temp = temp_path(path)
+    try:
+        with open(temp, mode) as file:                          # A new file (created with the usual permissions),
+            yield file
+        os.replace(temp, path)                                  #   renamed over the old one in one step - which also leaves any
+    except BaseException:                                       #   other hardlink to the old file untouched
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(temp)
+        raise
+
+
+def link_tree(source_dir_path, dest_dir_path):                  ## Recreates a directory tree with every file hardlinked (copied if linking fails), returning the file count
+    count = 0
+    os.makedirs(dest_dir_path, exist_ok=True)
+    with os.scandir(source_dir_path) as entries:
+        for entry in entries:
+            dest_path = os.path.join(dest_dir_path, entry.name)
+            if entry.is_dir(follow_symlinks=False):
+                count += link_tree(entry.path, dest_path)
+                continue
+            try:
+                os.link(entry.path, dest_path)                  # Sharing the file costs no copy,
+            except (OSError, NotImplementedError):              #   unless the file system (or platform) can't hardlink
+                shutil.copy2(entry.path, dest_path)
+            count += 1
+    return count
+
+
+def exchange(path, other_path):                                 ## Atomically swaps two paths with `renameat2(RENAME_EXCHANGE)`, returning False where that's unsupported
+    if not sys.platform.startswith("linux"):                    # `renameat2` is Linux-only (and `CDLL(None)` raises TypeError on Windows)
+        return False
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2 # glibc 2.28+
+    except (AttributeError, OSError, TypeError):
+        return False
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    if renameat2(AT_FDCWD, os.fsencode(path), AT_FDCWD, os.fsencode(other_path), RENAME_EXCHANGE) == 0:
+        return True
+    return False                                                # e.g. the kernel or file system doesn't support the flag
+
+
+class StagedPublish:                                            ## Builds a site in a staging directory and swaps it into place, so readers never see a partial site
+    def __init__(self, live_path):
+        self.live_path = live_path.rstrip("/\\")                # The directory being served
+        self.staging_path = self.live_path + ".staging"         # Where the next version is built, next to it (so on the same file system)
+        self.old_path = self.live_path + ".old"                 # Where the previous version goes when the paths can't be exchanged
+
+    def prepare(self, reuse=False):                             ## Creates the staging directory, optionally starting from hardlinks to the live site; returns its path
+        for path in (self.staging_path, self.old_path):         # Leftovers of an interrupted build are discarded
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        if reuse and os.path.isdir(self.live_path):             # An incremental build starts from the live files, linked rather than copied
+            link_tree(self.live_path, self.staging_path)        #   (every output is replaced, never written through, so the live files stay intact)
+        else:
+            os.makedirs(self.staging_path)
+        return self.staging_path
+
+    def publish(self):                                          ## Puts the staging directory in place of the live one, then removes the previous version
+        if not os.path.exists(self.live_path):                  # Nothing to replace: a rename is atomic on its own
+            os.rename(self.staging_path, self.live_path)
+            return
+        if exchange(self.staging_path, self.live_path):         # Swap both directories in one step,
+            shutil.rmtree(self.staging_path)                    #   the staging path now holds the previous version
+            return
+        os.rename(self.live_path, self.old_path)                # Otherwise move the live site aside and the new one in (leaving only a
+        os.rename(self.staging_path, self.live_path)            #   moment without the directory, rather than the whole build)
+        shutil.rmtree(self.old_path)
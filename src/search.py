@@ -0,0 +1,118 @@
+import json
+import os
+import re
+
+from manifest import GENERATED_SOURCE
+from urls import page_url
+
+
+SEARCH_DIR = "search"       # Directory of the site the index is written to: 'search/index.json' and 'search/terms/<prefix>.json'
+PREFIX_LENGTH = 2           # Terms are sharded by their first characters, so a browser only loads the shards of what's typed
+HEADING_WEIGHT = 3          # A term in a heading counts this many times
+SKIPPED_TAGS = {"pre"}      # Code blocks are left out of the index
+TERM_PATTERN = re.compile(r"\w{2,}")    # Terms are words of at least two letters or digits
+
+collect_terms = False       # Whether pages record their search terms as they're built (enabled with `enable_search`)
+
+
+def enable_search(enabled=True):                                ## Makes pages record their search terms while they're parsed
+    global collect_terms
+    collect_terms = enabled
+    return enabled
+
+
+def page_terms(node):                                           ## The weighted terms of a parsed page: {term: weight}, walking its HTML tree once
+    terms = {}
+    stack = [(node, 1)]
+    while stack:
+        node, weight = stack.pop()
+        if node.tag in SKIPPED_TAGS:
+            continue
+        if node.tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+            weight = HEADING_WEIGHT
+        if node.children:
+            stack.extend((child, weight) for child in node.children)
+        elif node.value:
+            for term in TERM_PATTERN.findall(node.value.lower()):
+                terms[term] = terms.get(term, 0) + weight
+    return terms
+
+
+def encode(data):                                               ## Compact, deterministic JSON
+    return json.dumps(data, separators=(",", ":"), sort_keys=True, ensure_ascii=False).encode("utf-8")
+
+
+class SearchIndex:                                              ## An inverted index of the site's pages, written as JSON shards by term prefix
+    def __init__(self, manifest, basepath):
+        self.manifest = manifest
+        self.basepath = basepath
+        self.docs = []                                          # Page id -> [url, title], or None for an id freed by a removed page
+        self.shards = {}                                        # Term prefix -> {term: [[page id, weight], ...]}
+        self.written = 0                                        # Files written,
+        self.unchanged = 0                                      #   and files that were already up to date
+
+    def path(self, *parts):
+        return os.path.join(self.manifest.root, SEARCH_DIR, *parts)
+
+    def previous_docs(self):                                    ## The page list of the index being replaced, so pages keep their ids
+        try:
+            with open(self.path("index.json"), "rb") as file:
+                return json.load(file)["docs"]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def build(self):                                            ## Builds the index from the terms pages recorded in the manifest (unchanged pages aren't read again)
+        pages = sorted((key, entry) for key, entry in self.manifest.current.items() if "terms" in entry)
+        previous = self.previous_docs()
+        ids = {doc[0]: i for i, doc in enumerate(previous) if doc is not None}
+        urls = {key: page_url(key, self.basepath) for key, _ in pages}
+        self.docs = [None] * len(previous)
+        new_pages = []
+        for key, entry in pages:                                # Pages keep their ids, so only shards with changed pages change,
+            page_id = ids.get(urls[key])
+            if page_id is None:
+                new_pages.append((key, entry))
+                continue
+            self.docs[page_id] = [urls[key], entry.get("title", "")]
+        free = [i for i, doc in reversed(list(enumerate(self.docs))) if doc is None]
+        for key, entry in new_pages:                            #   and new pages take the ids of removed ones first (lowest first)
+            page_id = free.pop() if free else len(self.docs)
+            if page_id == len(self.docs):
+                self.docs.append(None)
+            self.docs[page_id] = [urls[key], entry.get("title", "")]
+            ids[urls[key]] = page_id
+        while self.docs and self.docs[-1] is None:
+            self.docs.pop()
+
+        for key, entry in pages:
+            page_id = ids[urls[key]]
+            for term, weight in entry["terms"].items():
+                self.shards.setdefault(term[:PREFIX_LENGTH], {}).setdefault(term, []).append([page_id, weight])
+        for shard in self.shards.values():                      # Best matches first
+            for postings in shard.values():
+                postings.sort(key=lambda posting: (-posting[1], posting[0]))
+        return self
+
+    def write(self):                                            ## Writes the files that changed and records every file in the manifest
+        files = {("index.json",): {"docs": self.docs, "shards": sorted(self.shards)}}
+        for prefix, shard in self.shards.items():
+            files[("terms", f"{prefix}.json")] = shard
+        keep = set()
+        for parts, data in sorted(files.items()):
+            dest_path = self.path(*parts)
+            if self.manifest.write_generated(dest_path, encode(data)):  # Shards no longer needed are removed with the build's stale outputs,
+                self.written += 1
+            else:
+                self.unchanged += 1
+            keep.add(self.manifest.key(dest_path))
+        prefix = SEARCH_DIR + "/"
+        for key, entry in sorted(self.manifest.current.items()):        #   or right away when they were carried over (e.g. in watch mode)
+            if entry["source"] == GENERATED_SOURCE and key.startswith(prefix) and key not in keep:
+                self.manifest.forget(os.path.join(self.manifest.root, key))
+        return self
+
+    def summary(self):                                          ## One line describing the index, e.g. for the end of a build
+        pages = sum(doc is not None for doc in self.docs)
+        terms = sum(len(shard) for shard in self.shards.values())
+        return (f"indexed {terms} terms of {pages} pages in {len(self.shards)} shards, "
+                f"{self.written} files written, {self.unchanged} unchanged")
@@ -0,0 +1,61 @@
+import hashlib
+import os
+from pathlib import Path
+
+from manifest import BuildManifest
+from publish import StagedPublish, link_tree
+
+
+def parse_shard(text):                                          ## Parses '--shard i/N' into (i, N), with shards numbered from 1
+    index, _, count = text.partition("/")
+    try:
+        shard = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"invalid shard {text!r}, expected e.g. '1/4'") from None
+    if not 1 <= shard[0] <= shard[1]:
+        raise ValueError(f"invalid shard {text!r}, the shard number must be between 1 and the shard count")
+    return shard
+
+
+def shard_of(key, count):                                       ## The shard (from 1) an output belongs to: a stable hash of its path, the same on every machine
+    digest = hashlib.sha256(key.encode("utf-8")).digest()       # Unlike `hash()`, which is salted per process
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def in_shard(dest_path, dest_dir_path, shard):                  ## True if the output at 'dest_path' is built by 'shard' (always, without sharding)
+    if shard is None:
+        return True
+    key = Path(os.path.relpath(dest_path, dest_dir_path)).as_posix()    # Keyed like the manifest, so every OS agrees
+    return shard_of(key, shard[1]) == shard[0]
+
+
+def shard_dir(dir_path, shard):                                 ## Where a shard writes its outputs: './docs' -> './docs.shard-1-of-4'
+    return f"{dir_path.rstrip('/')}.shard-{shard[0]}-of-{shard[1]}"
+
+
+def shard_manifest(manifest_path, shard):                       ## Where a shard writes its manifest: '.build-manifest.json' -> '.build-manifest.shard-1-of-4.json'
+    root, extension = os.path.splitext(manifest_path)
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{extension}"
+
+
+def merge_shards(dir_path_public, manifest_path, count, finish=None):   ## Combines the outputs and manifests of every shard into one site, published like a build; returns its manifest, unsaved
+    staged = StagedPublish(dir_path_public)
+    staging = staged.prepare()
+    merged = BuildManifest(manifest_path, staging)
+    for index in range(1, count + 1):
+        shard = (index, count)
+        shard_dir_path = shard_dir(dir_path_public, shard)
+        shard_manifest_path = shard_manifest(manifest_path, shard)
+        if not os.path.isdir(shard_dir_path) or not os.path.isfile(shard_manifest_path):
+            raise FileNotFoundError(f"shard {index}/{count} is missing: expected {shard_dir_path} and {shard_manifest_path}")
+        entries = BuildManifest.load(shard_manifest_path, shard_dir_path).entries
+        overlap = sorted(key for key in entries if key in merged.current)
+        if overlap:                                             # Shards never share outputs, unless they were built differently
+            raise ValueError(f"shard {index}/{count} rebuilt outputs of another shard: " + ", ".join(overlap[:5]))
+        merged.current.update(entries)
+        link_tree(shard_dir_path, staging)                      # Outputs are linked, not copied, into the merged site
+    if finish is not None:                                      # Steps that need the whole site (search index, link check) run
+        finish(merged)                                          #   on the merged staging tree, before it's published
+    staged.publish()
+    merged.root = dir_path_public
+    return merged
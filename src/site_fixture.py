@@ -0,0 +1,62 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from gencontent import collect_pages, generate_pages
+from manifest import BuildManifest
+
+
+BUILD_MODES = [{}, {"writers": 2}, {"jobs": 2}]     # Serial, pipelined and multi-process page generation, which must record the same facts
+
+
+def write_file(path, content, mtime=None):                      ## Writes a file (and its directories), optionally with a fixed modification time (ns)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def read_file(path):                                            ## The text of a file
+    with open(path, "r") as file:
+        return file.read()
+
+
+class SiteTestCase(unittest.TestCase):                          ## A throwaway site (content, static files, templates, output and manifest in a temporary directory)
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)                       # (so subclasses needn't chain tearDown)
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        self.templates = os.path.join(self.tmp.name, "templates")
+        self.root = os.path.join(self.tmp.name, "docs")
+        self.manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, "{{ Title }}|{{ Content }}")
+
+    def path(self, *parts):                                     ## A path inside the temporary directory
+        return os.path.join(self.tmp.name, *parts)
+
+    def output(self, *parts):                                   ## A path inside the output directory
+        return os.path.join(self.root, *parts)
+
+    def write(self, name, content, mtime=None):                 ## Writes a content file, optionally with a fixed modification time (ns)
+        write_file(os.path.join(self.content, name), content, mtime)
+
+    def generate(self, manifest, basepath="/", **options):     ## Generates every page into 'manifest', quietly
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(collect_pages(self.content, self.root), self.template, basepath, manifest, **options)
+        return manifest
+
+    def build(self, finish=None, basepath="/", **options):     ## An incremental build, with 'finish(manifest)' run before stale outputs are removed; returns its manifest
+        manifest = self.generate(BuildManifest.load(self.manifest_path, self.root), basepath, **options)
+        if finish is not None:
+            finish(manifest)
+        manifest.remove_stale()
+        manifest.save()
+        return manifest
+
+    def read(self, *parts):                                     ## The text of an output
+        return read_file(self.output(*parts))
@@ -0,0 +1,111 @@
+import os
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from urls import page_url
+
+
+SITEMAP_NAME = "sitemap.xml"    # Written at the root of the site,
+FEED_NAME = "feed.xml"          #   next to the RSS feed of its most recently changed pages
+FEED_LENGTH = 20                # Pages listed in the feed
+WORD_PATTERN = re.compile(r"\w+")   # What counts as a word of a page
+
+collect_metadata = False        # Whether pages record their word count and summary as they're built (enabled with `enable_metadata`)
+
+
+def enable_metadata(enabled=True):                              ## Makes pages record their metadata while they're parsed
+    global collect_metadata
+    collect_metadata = enabled
+    return enabled
+
+
+def page_metadata(node):                                        ## The word count and first paragraph of a parsed page, walking its HTML tree once
+    words = 0
+    summary = ""
+    stack = [node]
+    while stack:                                                # Children are pushed in reverse, so nodes come in document order
+        node = stack.pop()
+        if node.tag == "p" and not summary:
+            summary = " ".join(node_text(node).split())
+        if node.children:
+            stack.extend(reversed(node.children))
+        elif node.value:
+            words += len(WORD_PATTERN.findall(node.value))
+    return {"words": words, "summary": summary}
+
+
+def node_text(node):                                            ## The text of a node and its descendants, without markup
+    if node.children:
+        return "".join(node_text(child) for child in node.children)
+    return node.value or ""
+
+
+def source_mtime(entry):                                        ## When a page's source last changed, from the `stat` signature the manifest already holds
+    signature = entry.get("inputs", {}).get(entry["source"])
+    if signature is None:
+        return None
+    return datetime.fromtimestamp(signature[1] / 1e9, timezone.utc)
+
+
+def page_records(manifest, basepath):                           ## One record per page of the build: {url, title, modified, words, summary}, without reading any source
+    records = []
+    for key, entry in sorted(manifest.current.items()):
+        if "words" not in entry:                                # Static and generated files aren't pages
+            continue
+        records.append({
+            "url": page_url(key, basepath),
+            "title": entry["title"],
+            "modified": source_mtime(entry),
+            "words": entry["words"],
+            "summary": entry["summary"],
+        })
+    return records
+
+
+def render_sitemap(records, site_url):                          ## The sitemap of the given pages, as bytes
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for record in records:
+        lines.append(f"  <url><loc>{escape(site_url + record['url'])}</loc>")
+        if record["modified"] is not None:
+            lines.append(f"    <lastmod>{record['modified'].strftime('%Y-%m-%dT%H:%M:%SZ')}</lastmod>")
+        lines.append("  </url>")
+    lines.append("</urlset>")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def render_feed(records, site_url, basepath):                   ## An RSS 2.0 feed of the most recently changed pages, as bytes
+    recent = sorted(records, key=lambda record: (record["modified"] is not None, record["modified"] or 0, record["url"]),
+                    reverse=True)[:FEED_LENGTH]
+    home = site_url + basepath
+    title = next((record["title"] for record in records if record["url"] == basepath), home)   # The home page names the site
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<rss version="2.0">',
+             "<channel>",
+             f"  <title>{escape(title)}</title>",
+             f"  <link>{escape(home)}</link>",
+             f"  <description>{escape(title)}</description>"]
+    if recent and recent[0]["modified"] is not None:            # The feed changes when its newest page does
+        lines.append(f"  <lastBuildDate>{format_datetime(recent[0]['modified'])}</lastBuildDate>")
+    for record in recent:
+        link = escape(site_url + record["url"])
+        lines.append("  <item>")
+        lines.append(f"    <title>{escape(record['title'])}</title>")
+        lines.append(f"    <link>{link}</link>")
+        lines.append(f"    <guid>{link}</guid>")
+        if record["modified"] is not None:
+            lines.append(f"    <pubDate>{format_datetime(record['modified'])}</pubDate>")
+        lines.append(f"    <description>{escape(record['summary'])}</description>")
+        lines.append("  </item>")
+    lines += ["</channel>", "</rss>"]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def write_site_files(manifest, site_url, basepath):            ## Writes sitemap.xml and feed.xml from the metadata pages recorded; returns the number of pages listed
+    site_url = site_url.rstrip("/")                             # 'https://example.com/' + '/blog/' -> 'https://example.com/blog/'
+    records = page_records(manifest, basepath)
+    manifest.write_generated(os.path.join(manifest.root, SITEMAP_NAME), render_sitemap(records, site_url))
+    manifest.write_generated(os.path.join(manifest.root, FEED_NAME), render_feed(records, site_url, basepath))
+    return len(records)
@@ -0,0 +1,83 @@
+import os
+import re
+
+from urls import get_resolver
+
+SLOT_PATTERN = re.compile(r"\{\{ (Title|Content) \}\}")     # Placeholders a template can contain, e.g. "{{ Title }}"
+
+
+class CompiledTemplate:                                         ## A template split into static chrome and named slots, ready to be filled in
+    def __init__(self, source, basepath):                       # 'source' is the raw template text, 'basepath' is applied to its static chrome once
+        resolver = get_resolver(basepath)                       # Links in the chrome are resolved like the links in pages
+        self.segments = []                                      # Alternating static strings and slots: (None, text) or (name, None)
+        position = 0
+        for match in SLOT_PATTERN.finditer(source):             # For every placeholder in the template,
+            chrome = source[position:match.start()]             #   the text before it is static chrome,
+            self.segments.append((None, resolver.resolve_html(chrome)))     # stored with its links already resolved,
+            self.segments.append((match.group(1), None))        #   followed by a slot for the placeholder
+            position = match.end()
+        self.segments.append((None, resolver.resolve_html(source[position:])))     # The chrome after the last placeholder
+
+    def render(self, **values):                                 ## Joins the chrome with the slot values, e.g. render(Title="Home", Content="<div>...</div>")
+        return "".join(self.iter_render(**values))
+
+    def iter_render(self, **values):                            ## Yields the page in chunks; a slot value may be a string or an iterable of string chunks
+        for slot, text in self.segments:                        # For every segment,
+            if slot is None:                                    #   static chrome is used as-is,
+                yield text
+                continue
+            value = values[slot]                                #   slots are replaced by their value,
+            if isinstance(value, str):
+                yield value
+            else:                                               #   streaming the value chunk by chunk if it isn't a plain string
+                yield from value
+
+    def write(self, fp, **values):                              ## Streams the filled-in template into a file-like object
+        fp.writelines(self.iter_render(**values))
+
+
+_compiled_templates = {}        # Templates compiled by this process: (path, basepath) -> CompiledTemplate
+
+
+def load_template(template_path, basepath):                     ## Returns the compiled template, reading and compiling it only the first time
+    key = (template_path, basepath)
+    template = _compiled_templates.get(key)
+    if template is None:                                        # If this process hasn't compiled the template yet,
+        with open(template_path, "r") as file:                  #   read it once,
+            template = CompiledTemplate(file.read(), basepath)  #   compile it,
+        _compiled_templates[key] = template                     #   and keep it for every later page
+    return template
+
+
+def clear_template_cache():                                     ## Forgets every compiled template, e.g. after a template file changed
+    _compiled_templates.clear()
+
+
+class TemplateRegistry:                                         ## Maps template names to template files, and pages to the template they use
+    def __init__(self, default_path, template_dir=None, content_root=None):
+        self.default_path = default_path                        # Template used by pages without a named template of their own
+        self.content_root = content_root                        # Content directory that page paths are relative to
+        self.paths = {}                                         # Template name -> template file path
+        if template_dir is not None and os.path.isdir(template_dir):    # Every '<name>.html' in the template directory
+            for filename in sorted(os.listdir(template_dir)):           #   is registered as the named template '<name>'
+                name, extension = os.path.splitext(filename)
+                if extension == ".html":
+                    self.register(name, os.path.join(template_dir, filename))
+
+    def register(self, name, template_path):                    ## Registers (or replaces) a named template
+        self.paths[name] = template_path
+
+    def path_for(self, name):                                   ## Path of the named template, falling back to the default template
+        return self.paths.get(name, self.default_path)
+
+    def template_for(self, from_path):                          ## Path of the template a page uses: the template named after its top-level section
+        if self.content_root is None:
+            return self.default_path
+        relative_path = os.path.relpath(from_path, self.content_root)   # e.g. 'blog/tom/index.md' -> section 'blog'
+        parts = relative_path.split(os.sep)
+        if len(parts) < 2:                                      # Pages at the top of the content directory have no section
+            return self.default_path
+        return self.path_for(parts[0])
+
+    def get(self, name, basepath):                              ## The compiled version of a named template
+        return load_template(self.path_for(name), basepath)
@@ -0,0 +1,75 @@
+import contextlib
+import io
+import os
+import unittest
+from unittest import mock
+
+import assets
+from assets import AssetIndex, fingerprinted_name
+from copystatic import copy_files_recursive
+from manifest import BuildManifest
+from site_fixture import SiteTestCase, write_file
+from urls import URLResolver, set_asset_urls
+
+
+class TestAssets(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(set_asset_urls, {})
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "image")
+        write_file(os.path.join(self.static, "more", "a.png"), "image")
+
+    def copy(self, fingerprint=False, dedupe=False):
+        manifest = BuildManifest.load(self.manifest_path, self.root)
+        index = AssetIndex.scan(self.static, manifest, fingerprint, dedupe)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = copy_files_recursive(self.static, self.root, manifest, verbose=False, assets=index)
+        manifest.remove_stale()
+        manifest.save()
+        return index, stats
+
+    def test_fingerprinted_name(self):
+        self.assertEqual(fingerprinted_name("rivendell.png", "3f2a9c8d0011"), "rivendell.3f2a9c8d.png")
+        self.assertEqual(fingerprinted_name("LICENSE", "3f2a9c8d0011"), "LICENSE.3f2a9c8d")
+
+    def test_fingerprinted_outputs_and_urls(self):
+        index, _ = self.copy(fingerprint=True)
+        name = index.output_name(os.path.join(self.static, "index.css"))
+        self.assertRegex(name, r"^index\.[0-9a-f]{8}\.css$")
+        self.assertTrue(os.path.isfile(os.path.join(self.root, name)))
+        self.assertEqual(index.urls["/index.css"], "/" + name)
+
+    def test_duplicates_are_hardlinked(self):
+        _, stats = self.copy(dedupe=True)
+        self.assertEqual((stats.files, stats.linked), (2, 1))
+        self.assertTrue(os.path.samefile(os.path.join(self.root, "images", "a.png"), os.path.join(self.root, "more", "a.png")))
+        _, stats = self.copy(dedupe=True)
+        self.assertEqual((stats.files, stats.linked, stats.skipped), (0, 0, 3))
+
+    def test_scan_reuses_hashes(self):
+        self.copy(dedupe=True)
+        manifest = BuildManifest.load(self.manifest_path, self.root)
+        with mock.patch.object(assets, "hash_file") as hash_file:
+            AssetIndex.scan(self.static, manifest, dedupe=True)
+        hash_file.assert_not_called()
+
+    def test_changed_asset_replaces_old_name(self):
+        index, _ = self.copy(fingerprint=True)
+        old = index.output_name(os.path.join(self.static, "index.css"))
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        index, _ = self.copy(fingerprint=True)
+        new = index.output_name(os.path.join(self.static, "index.css"))
+        self.assertNotEqual(old, new)
+        self.assertEqual(sorted(name for name in os.listdir(self.root) if name.endswith(".css")), [new])
+
+    def test_links_point_at_fingerprinted_names(self):
+        set_asset_urls({"/index.css": "/index.3f2a9c8d.css"})
+        resolver = URLResolver("/site/")
+        self.assertEqual(resolver.resolve("/index.css"), "/site/index.3f2a9c8d.css")
+        self.assertEqual(resolver.resolve("/index.css?v=2#x"), "/site/index.3f2a9c8d.css?v=2#x")
+        self.assertEqual(resolver.resolve("/blog"), "/site/blog")
+
+
+if __name__ == "__main__":
+    unittest.main()
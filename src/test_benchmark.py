@@ -0,0 +1,29 @@
+import unittest
+
+from benchmark import CorpusGenerator, compare
+from markdown_blocks import markdown_to_html_node
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpus_is_deterministic(self):
+        first = CorpusGenerator(seed=1).corpus(3, paragraphs=2, list_items=5, code_lines=5, links=5)
+        second = CorpusGenerator(seed=1).corpus(3, paragraphs=2, list_items=5, code_lines=5, links=5)
+        third = CorpusGenerator(seed=2).corpus(3, paragraphs=2, list_items=5, code_lines=5, links=5)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+
+    def test_corpus_pages_render(self):
+        corpus = CorpusGenerator().corpus(2, paragraphs=2, list_items=5, code_lines=5, links=5)
+        for markdown in corpus.values():
+            html = markdown_to_html_node(markdown).to_html()
+            for tag in ["<h1>", "<ul>", "<ol>", "<pre>", "<blockquote>", "<a href", "<img"]:
+                self.assertIn(tag, html)
+
+    def test_compare(self):
+        baseline = {"parse": 1.0, "render": 1.0, "new": 0.0}
+        results = {"parse": 1.05, "render": 1.5, "new": 3.0, "extra": 1.0}
+        self.assertEqual(compare(results, baseline, 0.10), [("render", 1.0, 1.5)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+import inline_markdown
+from cache import LRUCache
+from inline_markdown import enable_inline_cache, parse_inline, text_to_textnodes
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats(), (2, 1, 1))
+
+    def test_add_stats(self):
+        cache = LRUCache(2)
+        cache.get("missing")
+        cache.add_stats((3, 1, 2))
+        self.assertEqual(cache.stats(), (3, 2, 2))
+        self.assertEqual(cache.summary(), "3 hits, 2 misses (60.0% hit rate), 2 evictions (size 2)")
+
+
+class TestInlineCache(unittest.TestCase):
+    def tearDown(self):
+        enable_inline_cache(0)
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(inline_markdown.inline_cache)
+        self.assertEqual(parse_inline("a **b**"), text_to_textnodes("a **b**"))
+
+    def test_cached_results_are_copies(self):
+        cache = enable_inline_cache(10)
+        text = "Home [about](/about) and **more**"
+        first = parse_inline(text)
+        first[0].text = "changed"
+        first.pop()
+        second = parse_inline(text)
+        self.assertEqual(second, text_to_textnodes(text))
+        self.assertEqual(cache.stats(), (1, 1, 0))
+
+    def test_errors_not_cached(self):
+        cache = enable_inline_cache(10)
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                parse_inline("not **closed")
+        self.assertEqual(len(cache), 0)
+
+    def test_enable_keeps_existing_cache(self):
+        cache = enable_inline_cache(10)
+        self.assertIs(enable_inline_cache(10), cache)
+        self.assertIsNot(enable_inline_cache(20), cache)
+        self.assertIsNone(enable_inline_cache(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
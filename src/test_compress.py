@@ -0,0 +1,52 @@
+import gzip
+import os
+import unittest
+
+from compress import compress_outputs
+from manifest import BuildManifest
+from site_fixture import SiteTestCase, write_file
+
+
+class TestCompress(SiteTestCase):
+
+    def build(self, files, enabled=True):                               # Writes the outputs that changed and records them all, like a build
+        manifest = BuildManifest.load(self.manifest_path, self.root)
+        for name, content in files.items():
+            path = self.output(name)
+            if content is not None:
+                write_file(path, content)
+                manifest.record(path, name, "digest")
+            else:
+                manifest.keep(path)
+        stats = compress_outputs(manifest, enabled, min_size=100, threads=2)
+        manifest.remove_stale()
+        manifest.save()
+        return stats
+
+    def test_compresses_large_text_outputs(self):
+        stats = self.build({"index.html": "<p>home</p>" * 50, "small.css": "body {}", "logo.png": "x" * 500})
+        self.assertEqual(stats.files, 1)
+        with gzip.open(self.output("index.html.gz"), "rt") as file:
+            self.assertEqual(file.read(), "<p>home</p>" * 50)
+        self.assertFalse(os.path.exists(self.output("small.css.gz")))
+        self.assertFalse(os.path.exists(self.output("logo.png.gz")))
+
+    def test_only_changed_bytes_are_recompressed(self):
+        self.build({"index.html": "<p>home</p>" * 50, "about.html": "<p>about</p>" * 50})
+        stats = self.build({"index.html": None, "about.html": "<p>about</p>" * 50})    # Rewritten with the same bytes
+        self.assertEqual((stats.files, stats.skipped), (0, 2))
+        stats = self.build({"index.html": None, "about.html": "<p>new</p>" * 50})
+        self.assertEqual((stats.files, stats.skipped), (1, 1))
+        with gzip.open(self.output("about.html.gz"), "rt") as file:
+            self.assertEqual(file.read(), "<p>new</p>" * 50)
+
+    def test_siblings_are_removed_with_outputs(self):
+        self.build({"index.html": "<p>home</p>" * 50, "about.html": "<p>about</p>" * 50})
+        self.build({"index.html": None})                                # 'about.html' lost its source
+        self.assertFalse(os.path.exists(self.output("about.html.gz")))
+        self.build({"index.html": None}, enabled=False)                 # Compression was turned off
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
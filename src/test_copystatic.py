@@ -0,0 +1,86 @@
+import os
+import unittest
+
+from copystatic import copy_files_recursive, zero_copy
+from manifest import BuildManifest
+from site_fixture import SiteTestCase, write_file
+
+
+class TestStaticSync(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "png")
+
+    def sync(self, **options):
+        manifest = BuildManifest.load(self.manifest_path, self.root)
+        stats = copy_files_recursive(self.static, self.root, manifest, verbose=False, **options)
+        manifest.remove_stale()
+        manifest.save()
+        return stats
+
+    def test_copies_everything_first(self):
+        self.sync()
+        self.assertEqual(self.read("index.css"), "body {}")
+        self.assertEqual(self.read("images", "a.png"), "png")
+
+    def test_unchanged_files_are_not_copied(self):
+        self.sync()
+        copy = self.output("index.css")
+        inode = os.stat(copy).st_ino
+        stats = self.sync()
+        self.assertEqual(os.stat(copy).st_ino, inode)
+        self.assertEqual((stats.files, stats.bytes, stats.skipped), (0, 0, 2))
+
+    def test_stats(self):
+        stats = self.sync(threads=2)
+        self.assertEqual((stats.files, stats.bytes, stats.skipped), (2, 10, 0))
+        self.assertIn("copied 2 files", stats.summary())
+
+    def test_zero_copy(self):
+        source = self.path("big.bin")
+        dest = self.path("big-copy.bin")
+        data = os.urandom(3 << 20)
+        with open(source, "wb") as file:
+            file.write(data)
+        zero_copy(source, dest)
+        with open(dest, "rb") as file:
+            self.assertEqual(file.read(), data)
+
+    def test_changed_file_is_copied(self):
+        self.sync()
+        source = os.path.join(self.static, "index.css")
+        write_file(source, "body { color: red }")
+        self.sync()
+        self.assertEqual(self.read("index.css"), "body { color: red }")
+
+    def test_checksum_detects_same_size_change(self):
+        self.sync(checksum=True)
+        source = os.path.join(self.static, "images", "a.png")
+        stat = os.stat(source)
+        write_file(source, "PNG")
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.sync(checksum=True)
+        self.assertEqual(self.read("images", "a.png"), "PNG")
+
+    def test_removed_file_is_deleted(self):
+        self.sync()
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.sync()
+        self.assertFalse(os.path.exists(self.output("images", "a.png")))
+        self.assertTrue(os.path.exists(self.output("index.css")))
+
+    def test_hardlink(self):
+        self.sync(link="hardlink")
+        self.assertEqual(
+            os.stat(self.output("index.css")).st_ino,
+            os.stat(os.path.join(self.static, "index.css")).st_ino,
+        )
+
+    def test_reflink_falls_back_to_copy(self):
+        self.sync(link="reflink")
+        self.assertEqual(self.read("index.css"), "body {}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import contextlib
+import io
+import os
+import unittest
+
+import search
+from copystatic import copy_files_recursive
+from depgraph import BuildGraph
+from gencontent import generate_pages_recursive
+from manifest import BuildManifest
+from publish import StagedPublish
+from site_fixture import SiteTestCase, write_file
+
+
+class TestBuildGraph(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(self.template, "{{ Title }}|{{ Content }}", 10)
+        self.write("index.md", "# Home", 10)
+        self.write(os.path.join("blog", "index.md"), "# Blog", 10)
+        write_file(os.path.join(self.static, "index.css"), "body {}", 10)
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest.load(self.manifest_path, self.root)
+        with contextlib.redirect_stdout(io.StringIO()):
+            copy_files_recursive(self.static, self.root, manifest, verbose=False)
+            generate_pages_recursive(self.content, self.template, self.root, basepath, manifest, 1, self.templates)
+        manifest.remove_stale()
+        manifest.save()
+
+    def plan(self, basepath="/", checksum=False, clean=False):
+        graph = BuildGraph.for_site(self.content, self.static, self.template, self.templates, self.root, basepath)
+        return graph.plan(BuildManifest.load(self.manifest_path, self.root), checksum, clean)
+
+    def published_build(self, incremental, checksum):                   # A build like `main.py`'s, staged then published; returns its `CopyStats`
+        staged = StagedPublish(self.root)
+        staging = staged.prepare(incremental)
+        manifest = BuildManifest.load(self.manifest_path, staging) if incremental else BuildManifest(self.manifest_path, staging)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = copy_files_recursive(self.static, staging, manifest, checksum, verbose=False)
+            generate_pages_recursive(self.content, self.template, staging, "/", manifest, 1, self.templates)
+        manifest.remove_stale()
+        staged.publish()
+        manifest.root = self.root
+        manifest.save()
+        return stats
+
+    def live_files(self):
+        return {os.path.join(dir_path, name) for dir_path, _, names in os.walk(self.root) for name in names}
+
+    def test_graph_edges(self):
+        write_file(os.path.join(self.templates, "blog.html"), "blog")
+        graph = BuildGraph.for_site(self.content, self.static, self.template, self.templates, self.root, "/")
+        blog = graph.outputs[self.output("blog", "index.html")]
+        self.assertEqual(blog.inputs, [os.path.join(self.content, "blog", "index.md"), os.path.join(self.templates, "blog.html")])
+        self.assertEqual(graph.outputs[self.output("index.css")].kind, "asset")
+
+    def test_first_build_does_everything(self):
+        plan = self.plan()
+        self.assertEqual(sorted(reason for _, reason in plan.render), ["new", "new"])
+        self.assertEqual(plan.copy, [(self.output("index.css"), "new")])
+
+    def test_nothing_to_do_after_build(self):
+        self.build()
+        plan = self.plan()
+        self.assertEqual((plan.render, plan.copy, plan.delete), ([], [], []))
+        self.assertEqual(len(plan.unchanged), 3)
+
+    def test_minimal_plan(self):
+        self.build()
+        home = os.path.join(self.content, "index.md")
+        write_file(home, "# Home page", 20)
+        write_file(os.path.join(self.static, "index.css"), "body {}", 20)
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        plan = self.plan()
+        self.assertEqual(plan.render, [(self.output("index.html"), f"{home} changed")])
+        self.assertEqual(plan.copy, [(self.output("index.css"), "changed")])
+        self.assertEqual(plan.delete, [self.output("blog", "index.html")])
+
+    def test_template_and_basepath_changes(self):
+        self.build()
+        write_file(self.template, "{{ Content }}", 20)
+        self.assertEqual(len(self.plan().render), 2)
+        self.build()
+        self.assertEqual(self.plan().render, [])
+        self.assertEqual(
+            [reason for _, reason in self.plan("/site/").render],
+            ["settings changed", "settings changed"],
+        )
+
+    def test_touched_page_is_kept_after_hashing(self):
+        self.build()
+        blog = self.output("blog", "index.html")
+        write_file(blog, "untouched")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog", 20)
+        self.build()
+        with open(blog, "r") as file:
+            self.assertEqual(file.read(), "untouched")
+        self.assertEqual(self.plan().render, [])
+
+    def test_plan_copies_and_deletes_agree_with_build(self):
+        self.build()
+        for step, (incremental, checksum) in enumerate([(False, False), (False, True), (True, False), (True, True)]):
+            write_file(os.path.join(self.root, "stray.html"), "not built by any source")   # Dropped only by clean builds
+            write_file(os.path.join(self.static, "extra.js"), f"step {step}", 20 + step)
+            plan = self.plan(checksum=checksum, clean=not incremental)
+            before = self.live_files()
+            stats = self.published_build(incremental, checksum)
+            self.assertEqual(len(plan.copy), stats.files + stats.linked)
+            self.assertEqual(sorted(plan.delete), sorted(before - self.live_files()))
+
+    def rendered(self, change):                                         # Pages the build actually rewrote (outputs are replaced, so their inode changes)
+        pages = [self.output("index.html"), self.output("blog", "index.html")]
+        before = {page: os.stat(page).st_ino for page in pages}
+        change()
+        planned = sorted(page for page, _ in self.plan().render)
+        self.build()
+        return planned, sorted(page for page in pages if os.stat(page).st_ino != before[page])
+
+    def test_plan_agrees_with_build(self):
+        self.build()
+        home = os.path.join(self.content, "index.md")
+        self.assertEqual(self.rendered(lambda: write_file(home, "# Home", 20)), ([], []))   # Touched, but unchanged
+        planned, rendered = self.rendered(lambda: write_file(home, "# Home page", 30))
+        self.assertEqual(planned, [self.output("index.html")])
+        self.assertEqual(planned, rendered)
+        self.addCleanup(search.enable_search, False)
+        planned, rendered = self.rendered(search.enable_search)            # Pages lacking the facts a build now collects
+        self.assertEqual(len(planned), 2)
+        self.assertEqual(planned, rendered)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import contextlib
+import io
+import os
+import unittest
+
+import doccache
+from doccache import DocumentCache, data_to_node, enable_document_cache, node_to_data
+from gencontent import collect_pages, generate_pages
+from markdown_blocks import markdown_to_html_node
+from site_fixture import SiteTestCase, read_file, write_file
+from urls import URLResolver
+
+
+MARKDOWN = "# Title\n\n[home](/) and ![logo](/logo.png)\n\n- **a**\n- [b](https://x/)"
+
+
+class TestDocumentCache(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = DocumentCache(self.path("cache"))
+        self.addCleanup(enable_document_cache, None)
+
+    def test_round_trip_resolves_urls(self):
+        tree = node_to_data(markdown_to_html_node(MARKDOWN))
+        resolver = URLResolver("/site/")
+        self.assertEqual(
+            data_to_node(tree, resolver).to_html(),
+            markdown_to_html_node(MARKDOWN, resolver).to_html(),
+        )
+
+    def test_get_put(self):
+        key = self.cache.key(MARKDOWN)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Title", [None, "text", None])
+        self.assertEqual(self.cache.get(key), ("Title", [None, "text", None]))
+        self.assertNotEqual(self.cache.key(MARKDOWN + " "), key)
+        self.assertEqual(self.cache.stats(), (1, 1, 1))
+
+    def test_corrupt_entry_is_a_miss(self):
+        key = self.cache.key(MARKDOWN)
+        self.cache.put(key, "Title", [None, "text", None])
+        with open(self.cache.entry_path(key), "w") as file:
+            file.write('{"title": ')
+        self.assertIsNone(self.cache.get(key))
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [self.cache.key(str(i)) for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "t", [None, "x" * 100, None])
+            os.utime(self.cache.entry_path(key), (1000 + i, 1000 + i))
+        size = os.path.getsize(self.cache.entry_path(keys[0]))
+        self.cache.get(keys[0])                                         # Using the oldest entry keeps it
+        self.cache.max_bytes = 2 * size
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_generate_pages_uses_cache(self):
+        self.write("index.md", MARKDOWN)
+        write_file(self.template, '<a href="/">{{ Title }}</a>{{ Content }}')
+        pages = collect_pages(self.content, self.root)
+        dest = pages[0][1]
+
+        outputs = {}
+        for basepath in ["/", "/site/"]:                                # Without the cache,
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages(pages, self.template, basepath)
+            outputs[basepath] = read_file(dest)
+
+        cache = enable_document_cache(self.path("cache"))
+        for jobs in [1, 2]:                                             # with it, whether the pages are parsed or loaded
+            for basepath in ["/", "/site/"]:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_pages(pages, self.template, basepath, jobs=jobs)
+                self.assertEqual(read_file(dest), outputs[basepath])
+        self.assertEqual(cache.stats(), (3, 1, 1))
+        self.assertIs(doccache.document_cache, cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
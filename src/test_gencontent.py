@@ -1,6 +1,12 @@
+import os
 import unittest
+from pathlib import Path
 
-from gencontent import extract_title
+import search
+import sitemap
+from gencontent import PAGE_FACTS, collect_pages, extract_title, generate_pages
+from manifest import BuildManifest
+from site_fixture import BUILD_MODES, SiteTestCase, read_file, write_file
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -46,5 +52,55 @@ no title
             pass
 
 
+class TestGeneratePages(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for name in ["b", "a", "c/d"]:
+            self.write(os.path.join(name, "index.md"), f"# Page {name}")
+
+    def test_collect_pages_sorted(self):
+        pages = collect_pages(self.content, self.root)
+        self.assertEqual(
+            [Path(dest).relative_to(self.root).as_posix() for _, dest in pages],
+            ["a/index.html", "b/index.html", "c/d/index.html"],
+        )
+
+    def test_parallel_matches_serial(self):
+        pages = collect_pages(self.content, self.root)
+        generate_pages(pages, self.template, "/", jobs=1)
+        serial = [read_file(dest) for _, dest in pages]
+        for _, dest in pages:
+            os.remove(dest)
+        generate_pages(pages, self.template, "/", jobs=2)
+        self.assertEqual([read_file(dest) for _, dest in pages], serial)
+
+    def test_parallel_reports_failures(self):
+        self.write(os.path.join("b", "index.md"), "no title")
+        pages = collect_pages(self.content, self.root)
+        with self.assertRaises(ValueError) as context:
+            generate_pages(pages, self.template, "/", jobs=2)
+        self.assertIn("1 page(s) failed", str(context.exception))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "c", "d", "index.html")))
+
+
+
+class TestPageFacts(SiteTestCase):
+    def test_facts_recorded_in_every_mode(self):
+        self.write("index.md", "Intro [blog](/blog/) and [up](../)\n# Home")   # The title is any '# ' line, even inside a block
+        self.addCleanup(search.enable_search, False)
+        self.addCleanup(sitemap.enable_metadata, False)
+        search.enable_search()
+        sitemap.enable_metadata()
+        for options in BUILD_MODES:                                     # Every way of generating pages records the same facts
+            entry = self.generate(BuildManifest(self.manifest_path, self.root), "/site/", **options).current["index.html"]
+            self.assertEqual({name: entry[name] for name in PAGE_FACTS if name in entry}, {
+                "links": ["../", "/blog/"],
+                "title": "Home",
+                "terms": {"intro": 1, "blog": 1, "and": 1, "up": 1, "home": 1},
+                "words": 5,
+                "summary": "Intro blog and up # Home",
+            })
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 from htmlnode import LeafNode, ParentNode, HTMLNode
 
@@ -108,6 +109,46 @@ class TestHTMLNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
         )
 
+    def test_slots(self):
+        for node in [HTMLNode("p"), LeafNode("b", "x"), ParentNode("div", [])]:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_tags_interned(self):
+        level = 2
+        first = ParentNode(f"h{level}", [])
+        second = ParentNode("".join(["h", str(level)]), [])
+        self.assertIs(first.tag, second.tag)
+
+    def test_iter_html_chunks(self):
+        node = ParentNode(
+            "p",
+            [LeafNode("b", "Bold"), LeafNode(None, "text")],
+            {"class": "x"},
+        )
+        self.assertEqual(
+            list(node.iter_html()),
+            ['<p class="x">', "<b>Bold</b>", "text", "</p>"],
+        )
+
+    def test_write_html(self):
+        node = ParentNode("div", [ParentNode("span", [LeafNode("i", "hi")])])
+        sink = io.StringIO()
+        node.write_html(sink)
+        self.assertEqual(sink.getvalue(), "<div><span><i>hi</i></span></div>")
+
+    def test_to_html_deep_nesting(self):
+        node = LeafNode(None, "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), 5000 * len("<span></span>") + len("deep"))
+
+    def test_to_html_no_children(self):
+        node = ParentNode("div", [ParentNode("p", None)])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
 
 if __name__ == "__main__":
     unittest.main()
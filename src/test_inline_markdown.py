@@ -191,6 +191,33 @@ class TestInlineMarkdown(unittest.TestCase):
             nodes,
         )
 
+    def test_text_to_textnodes_matches_split_passes(self):
+        cases = [
+            "",
+            "plain",
+            "**bold _not italic_** and _italic_",
+            "**[link in bold](https://boot.dev)**",
+            "![image](a.png)[link](b.html)",
+            "!![image](a.png) ![not](an image",
+            "`code with [link](x)` and [link](y)",
+            "_a_**b**`c`",
+            "[a](b)" * 50,
+        ]
+        for text in cases:
+            nodes = [TextNode(text, TextType.TEXT)]
+            nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = split_nodes_image(nodes)
+            nodes = split_nodes_link(nodes)
+            self.assertListEqual(nodes, text_to_textnodes(text), text)
+
+    def test_text_to_textnodes_unclosed(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("This is **unclosed")
+        with self.assertRaises(ValueError):
+            text_to_textnodes("**bold** and `unclosed code")
+
 
 if __name__ == "__main__":
     unittest.main()
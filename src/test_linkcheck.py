@@ -0,0 +1,59 @@
+import unittest
+
+from linkcheck import LinkChecker, link_target
+from site_fixture import SiteTestCase
+from urls import set_asset_urls
+
+
+class TestLinkTarget(unittest.TestCase):
+    def tearDown(self):
+        set_asset_urls({})
+
+    def test_internal(self):
+        self.assertEqual(link_target("/", "blog/index.html"), "")
+        self.assertEqual(link_target("/blog/tom", "index.html"), "blog/tom")
+        self.assertEqual(link_target("/index.css?v=2#top", "index.html"), "index.css")
+        self.assertEqual(link_target("../tom/", "blog/majesty/index.html"), "blog/tom")
+        self.assertEqual(link_target("img.png", "blog/index.html"), "blog/img.png")
+
+    def test_external(self):
+        for url in ["https://example.com/", "mailto:me@example.com", "//cdn.example.com/a.js", "#top"]:
+            self.assertIsNone(link_target(url, "index.html"))
+
+    def test_fingerprinted(self):
+        set_asset_urls({"/index.css": "/index.3f2a9c8d.css"})
+        self.assertEqual(link_target("/index.css", "index.html"), "index.3f2a9c8d.css")
+
+
+class TestLinkChecker(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("index.md", "# Home\n\n[blog](/blog) [about](/about) ![logo](/logo.png) [x](https://example.com)")
+        self.write("blog/index.md", "# Blog\n\n[home](/) [up](../)")
+
+    def check(self):
+        checker = None
+
+        def finish(manifest):
+            nonlocal checker
+            checker = LinkChecker(manifest)
+            checker.check()
+        self.build(finish, "/site/")
+        return checker
+
+    def test_broken_links(self):
+        checker = self.check()
+        self.assertEqual(checker.broken, [("index.html", "/about"), ("index.html", "/logo.png")])
+        self.assertEqual((checker.pages, checker.links), (2, 6))
+
+    def test_only_changed_pages_rechecked(self):
+        self.check()
+        checker = self.check()
+        self.assertEqual((checker.pages, checker.reused, len(checker.broken)), (0, 2, 2))
+        self.write("about/index.md", "# About")                        # A new page changes the set of outputs,
+        checker = self.check()
+        self.assertEqual((checker.pages, checker.reused), (3, 0))      #   so every page is checked again
+        self.assertEqual(checker.broken, [("index.html", "/logo.png")])
+
+if __name__ == "__main__":
+    unittest.main()
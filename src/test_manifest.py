@@ -0,0 +1,99 @@
+import os
+import unittest
+
+from gencontent import generate_pages_recursive
+from manifest import BuildManifest, hash_inputs
+from site_fixture import SiteTestCase, read_file, write_file
+
+
+class TestBuildManifest(SiteTestCase):
+    def test_hash_inputs_separates_parts(self):
+        self.assertNotEqual(hash_inputs("ab", "c"), hash_inputs("a", "bc"))
+
+    def test_fresh_after_save_and_load(self):
+        dest = os.path.join(self.root, "a", "index.html")
+        write_file(dest, "page")
+        manifest = BuildManifest(self.manifest_path, self.root)
+        manifest.record(dest, "content/a/index.md", "digest")
+        manifest.save()
+
+        loaded = BuildManifest.load(self.manifest_path, self.root)
+        self.assertEqual(
+            loaded.entries,
+            {"a/index.html": {"source": "content/a/index.md", "digest": "digest"}},
+        )
+        self.assertTrue(loaded.is_fresh(dest, "digest"))
+        self.assertFalse(loaded.is_fresh(dest, "other"))
+
+    def test_missing_output_is_not_fresh(self):
+        manifest = BuildManifest(
+            self.manifest_path, self.root, {"a.html": {"source": "a.md", "digest": "d"}}
+        )
+        self.assertFalse(manifest.is_fresh(os.path.join(self.root, "a.html"), "d"))
+
+    def test_load_corrupt_manifest(self):
+        write_file(self.manifest_path, "{not json")
+        self.assertEqual(BuildManifest.load(self.manifest_path, self.root).entries, {})
+
+    def test_remove_stale(self):
+        kept = os.path.join(self.root, "kept.html")
+        stale = os.path.join(self.root, "blog", "old", "index.html")
+        write_file(kept, "kept")
+        write_file(stale, "stale")
+        manifest = BuildManifest(
+            self.manifest_path,
+            self.root,
+            {
+                "kept.html": {"source": "kept.md", "digest": "d"},
+                "blog/old/index.html": {"source": "old.md", "digest": "d"},
+            },
+        )
+        manifest.record(kept, "kept.md", "d")
+        self.assertEqual(manifest.remove_stale(), [stale])
+        self.assertTrue(os.path.exists(kept))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "blog")))
+
+
+class TestIncrementalPages(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write("index.md", "# Home")
+        self.write(os.path.join("blog", "index.md"), "# Blog")
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest.load(self.manifest_path, self.root)
+        generate_pages_recursive(self.content, self.template, self.root, basepath, manifest)
+        manifest.remove_stale()
+        manifest.save()
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        blog = os.path.join(self.root, "blog", "index.html")
+        write_file(blog, "untouched")
+        write_file(os.path.join(self.content, "index.md"), "# New home")
+        self.build()
+        self.assertEqual(read_file(blog), "untouched")
+        self.assertEqual(
+            read_file(os.path.join(self.root, "index.html")),
+            "<title>New home</title><div><h1>New home</h1></div>",
+        )
+
+    def test_template_change_rebuilds_everything(self):
+        self.build()
+        blog = os.path.join(self.root, "blog", "index.html")
+        write_file(blog, "untouched")
+        write_file(self.template, "{{ Title }}|{{ Content }}")
+        self.build()
+        self.assertEqual(read_file(blog), "Blog|<div><h1>Blog</h1></div>")
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.root, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
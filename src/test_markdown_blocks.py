@@ -1,8 +1,13 @@
+import io
 import unittest
+from gencontent import extract_title
 from markdown_blocks import (
     markdown_to_html_node,
+    markdown_to_page,
     markdown_to_blocks,
     block_to_block_type,
+    classify_block,
+    iter_blocks,
     BlockType,
 )
 
@@ -163,6 +168,58 @@ the **same** even with inline stuff
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_markdown_to_blocks_whitespace_lines(self):
+        md = "# Title\n   \n\t\nfirst line  \n  second\n \n\n\n- item\n"
+        self.assertEqual(markdown_to_blocks(md), ["# Title", "first line  \n  second", "- item"])
+
+    def test_codeblock_keeps_blank_lines(self):
+        md = "```\nfirst\n\n\n  \nlast\n```\n\nafter"
+        self.assertEqual(markdown_to_blocks(md), ["```\nfirst\n\n\n  \nlast\n```", "after"])
+        html = markdown_to_html_node(md).to_html()
+        self.assertEqual(html, "<div><pre><code>first\n\n\n  \nlast\n</code></pre><p>after</p></div>")
+
+    def test_iter_blocks_from_file(self):
+        md = "# Title\n\n1. one\n2. two\n\n> quote\n"
+        blocks = list(iter_blocks(io.StringIO(md)))
+        self.assertEqual(blocks, list(iter_blocks(md)))
+        self.assertEqual(
+            blocks,
+            [
+                (BlockType.HEADING, (1, "Title")),
+                (BlockType.OLIST, ["one", "two"]),
+                (BlockType.QUOTE, "quote"),
+            ],
+        )
+
+    def test_classify_block(self):
+        self.assertEqual(classify_block(["### Title", "more"]), (BlockType.HEADING, (3, "Title\nmore")))
+        self.assertEqual(classify_block(["####### Title"]), (BlockType.PARAGRAPH, "####### Title"))
+        self.assertEqual(classify_block(["```", "code", "```"]), (BlockType.CODE, "```\ncode\n```"))
+        self.assertEqual(classify_block([">  a", ">b"]), (BlockType.QUOTE, "a b"))
+        self.assertEqual(classify_block(["- a", "- b"]), (BlockType.ULIST, ["a", "b"]))
+        self.assertEqual(classify_block(["- a", "b"]), (BlockType.PARAGRAPH, "- a b"))
+        self.assertEqual(classify_block(["1. a", "2. b"]), (BlockType.OLIST, ["a", "b"]))
+        self.assertEqual(classify_block(["1. a", "3. b"]), (BlockType.PARAGRAPH, "1. a 3. b"))
+
+
+    def test_markdown_to_page(self):
+        md = "Intro\n\n## Sub\n\n# Title *here*\nmore\n\n# Second"
+        node, title = markdown_to_page(io.StringIO(md))
+        self.assertEqual(title, "Title *here*")                         # The raw text of the first `# ` heading's first line
+        self.assertEqual(node.to_html(), markdown_to_html_node(md).to_html())
+        with self.assertRaises(ValueError):
+            markdown_to_page("## No title")
+
+    def test_markdown_to_page_title_anywhere(self):                     # Any line starting with "# " is the title, as with `extract_title`
+        for md, expected in [
+            ("Intro line\n# Title\n\nbody", "Title"),
+            ("- item\n# Title", "Title"),
+            ("```\n# not code\n```\n\n# Title", "not code"),
+            ("   # Indented\n\n# Title", "Title"),
+        ]:
+            self.assertEqual(markdown_to_page(md)[1], expected)
+            self.assertEqual(markdown_to_page(md)[1], extract_title(md))
+
 
 if __name__ == "__main__":
     unittest.main()
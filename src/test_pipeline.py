@@ -0,0 +1,48 @@
+import contextlib
+import io
+import os
+import unittest
+
+from gencontent import collect_pages, generate_pages
+from manifest import BuildManifest
+from pipeline import PageWriter, make_dirs, prefetch
+from site_fixture import SiteTestCase, read_file
+
+
+class TestPipeline(SiteTestCase):
+    def test_make_dirs(self):
+        make_dirs([self.path("a", "b", "index.html"), self.path("a", "index.html"), self.path("c", "x.html")])
+        self.assertTrue(os.path.isdir(self.path("a", "b")))
+        self.assertTrue(os.path.isdir(self.path("c")))
+
+    def test_prefetch_keeps_order(self):
+        self.assertEqual(list(prefetch(range(50), read=lambda n: n * 2, depth=3)), [n * 2 for n in range(50)])
+
+    def test_page_writer(self):
+        os.mkdir(self.path("blocked.html"))                             # A directory where a file should go can't be written
+        with PageWriter(3, queue_size=2) as writer:
+            for i in range(20):
+                writer.write(self.path(f"{i}.html"), f"page {i}")
+            writer.write(self.path("blocked.html"), "lost")
+        self.assertEqual([read_file(self.path(f"{i}.html")) for i in range(20)], [f"page {i}" for i in range(20)])
+        self.assertEqual([path for path, _ in writer.failures], [self.path("blocked.html")])
+
+    def test_pipelined_matches_serial(self):
+        for name in ["a", "b", "c/d"]:
+            self.write(os.path.join(name, "index.md"), f"# Page {name}\n\n[home](/)")
+        pages = collect_pages(self.content, self.root)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, "/site/")
+        serial = [read_file(dest) for _, dest in pages]
+        for _, dest in pages:
+            os.remove(dest)
+        manifest = BuildManifest(self.manifest_path, self.root)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, "/site/", manifest, writers=2)
+        self.assertEqual([read_file(dest) for _, dest in pages], serial)
+        self.assertEqual(sorted(manifest.current), ["a/index.html", "b/index.html", "c/d/index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import profiler
+from gencontent import collect_pages, generate_pages
+from profiler import BuildProfiler, PageProfile
+
+
+class TestProfiler(unittest.TestCase):
+    def test_nested_stages_not_counted_twice(self):
+        profile = PageProfile("page.md")
+        with profile:
+            with profile.stage("parse"):
+                with profile.stage("inline"):
+                    time.sleep(0.02)
+        self.assertGreaterEqual(profile.stages["inline"][0], 0.02)
+        self.assertLess(profile.stages["parse"][0], 0.02)
+        self.assertGreaterEqual(profile.wall, 0.02)
+        self.assertIsNone(profiler.active)
+
+    def test_repeated_stage_accumulates(self):
+        profile = PageProfile("page.md")
+        with profile:
+            for _ in range(2):
+                with profile.stage("template"):
+                    time.sleep(0.01)
+        self.assertGreaterEqual(profile.stages["template"][0], 0.02)
+
+    def test_track_memory(self):
+        profile = PageProfile("page.md", track_memory=True)
+        with profile:
+            data = [0] * 100000
+        del data
+        self.assertGreater(profile.to_dict()["peak_memory"], 100000)
+
+    def test_report(self):
+        build = BuildProfiler()
+        for name, wall in [("a.md", 0.3), ("b.md", 0.1), ("c.md", 0.2)]:
+            build.add({"page": name, "wall": wall, "cpu": wall, "peak_memory": None,
+                       "stages": {"parse": {"wall": wall, "cpu": wall}}})
+        report = build.report(top=2)
+        self.assertEqual(report["slowest"], ["a.md", "c.md"])
+        self.assertEqual(report["build"]["pages"], 3)
+        self.assertAlmostEqual(report["stages"]["parse"]["wall"], 0.6)
+
+    def test_generate_pages_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            template = os.path.join(tmp, "template.html")
+            for name in ["a", "b"]:
+                os.makedirs(os.path.join(content, name))
+                with open(os.path.join(content, name, "index.md"), "w") as file:
+                    file.write(f"# Page {name}\n\nSome **bold** text")
+            with open(template, "w") as file:
+                file.write("{{ Title }}|{{ Content }}")
+            pages = collect_pages(content, os.path.join(tmp, "docs"))
+
+            for jobs in [1, 2]:
+                build = BuildProfiler()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_pages(pages, template, "/", jobs=jobs, profiler=build)
+                report = build.write(os.path.join(tmp, "profile.json"))
+                self.assertEqual(report["build"]["pages"], 2)
+                self.assertEqual(set(report["stages"]),
+                                 {"read", "template", "parse", "inline", "render", "write"})
+                with open(os.path.join(tmp, "docs", "a", "index.html"), "r") as file:
+                    self.assertEqual(file.read(), "Page a|<div><h1>Page a</h1><p>Some <b>bold</b> text</p></div>")
+                with open(os.path.join(tmp, "profile.json"), "r") as file:
+                    self.assertEqual(json.load(file)["build"]["pages"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
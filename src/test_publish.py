@@ -0,0 +1,103 @@
+import os
+import unittest
+from unittest import mock
+
+import publish
+from copystatic import transfer_file
+from publish import StagedPublish, atomic_open, link_tree
+from site_fixture import SiteTestCase, read_file, write_file
+
+
+class TestPublish(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(self.output("index.html"), "old home")
+        write_file(self.output("blog", "index.html"), "old blog")
+
+    def test_atomic_open_leaves_links_intact(self):
+        linked = self.path("linked.html")
+        os.link(self.output("index.html"), linked)
+        with atomic_open(self.output("index.html")) as file:
+            file.write("new home")
+        self.assertEqual(read_file(self.output("index.html")), "new home")
+        self.assertEqual(read_file(linked), "old home")
+
+    def test_atomic_open_failure_keeps_old_file(self):
+        with self.assertRaises(ValueError):
+            with atomic_open(self.output("index.html")) as file:
+                file.write("half")
+                raise ValueError
+        self.assertEqual(read_file(self.output("index.html")), "old home")
+        self.assertEqual(sorted(os.listdir(self.root)), ["blog", "index.html"])
+
+    def test_transfer_file_replaces_linked_copy(self):
+        source = self.path("style.css")
+        write_file(source, "new style")
+        dest = self.output("style.css")
+        linked = self.path("linked.css")
+        write_file(dest, "old style")
+        os.link(dest, linked)
+        transfer_file(source, dest)
+        self.assertEqual(read_file(dest), "new style")
+        self.assertEqual(read_file(linked), "old style")
+        transfer_file(source, dest, "hardlink")                         # Relinking the same file leaves no temporary name behind
+        transfer_file(source, dest, "hardlink")
+        self.assertEqual(sorted(os.listdir(self.root)), ["blog", "index.html", "style.css"])
+
+    def test_link_tree_shares_files(self):
+        copy = self.path("copy")
+        self.assertEqual(link_tree(self.root, copy), 2)
+        self.assertTrue(os.path.samefile(os.path.join(copy, "blog", "index.html"), self.output("blog", "index.html")))
+
+    def test_link_tree_falls_back_to_copies(self):
+        copy = self.path("copy")
+        with mock.patch.object(publish.os, "link", side_effect=NotImplementedError):  # Platforms without hardlinks get copies
+            self.assertEqual(link_tree(self.root, copy), 2)
+        self.assertFalse(os.path.samefile(os.path.join(copy, "index.html"), self.output("index.html")))
+        self.assertEqual(read_file(os.path.join(copy, "blog", "index.html")), "old blog")
+
+    def test_staged_publish(self):
+        staged = StagedPublish(self.root)
+        staging = staged.prepare(reuse=True)
+        self.assertEqual(read_file(os.path.join(staging, "blog", "index.html")), "old blog")
+        with atomic_open(os.path.join(staging, "index.html")) as file:
+            file.write("new home")
+        self.assertEqual(read_file(self.output("index.html")), "old home")     # The live site is untouched until published
+        staged.publish()
+        self.assertEqual(read_file(self.output("index.html")), "new home")
+        self.assertEqual(read_file(self.output("blog", "index.html")), "old blog")
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["docs", "template.html"])   # No staging directory is left beside the site and its template
+
+    def test_clean_staging_and_fallback(self):
+        staged = StagedPublish(self.root + "/")
+        write_file(os.path.join(staged.staging_path, "stale.html"), "left by an interrupted build")
+        staging = staged.prepare()
+        self.assertEqual(os.listdir(staging), [])
+        write_file(os.path.join(staging, "index.html"), "new home")
+        with mock.patch.object(publish, "exchange", return_value=False):   # Without `renameat2`, the live site is renamed aside
+            staged.publish()
+        self.assertEqual(os.listdir(self.root), ["index.html"])
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["docs", "template.html"])
+
+    def test_exchange_unsupported(self):
+        other = self.path("other")
+        os.makedirs(other)
+        with mock.patch.object(publish.sys, "platform", "win32"):      # Never reaches for `renameat2` off Linux,
+            self.assertFalse(publish.exchange(self.root, other))
+        with mock.patch.object(publish.ctypes, "CDLL", side_effect=TypeError("no library")):    # nor fails where it can't be loaded
+            self.assertFalse(publish.exchange(self.root, other))
+            staged = StagedPublish(self.root)
+            write_file(os.path.join(staged.prepare(), "index.html"), "new home")
+            staged.publish()                                            #   (publishing falls back to renames)
+        self.assertEqual(read_file(self.output("index.html")), "new home")
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["docs", "other", "template.html"])
+
+    def test_first_publish(self):
+        staged = StagedPublish(self.path("site"))
+        write_file(os.path.join(staged.prepare(reuse=True), "index.html"), "home")
+        staged.publish()
+        self.assertEqual(read_file(self.path("site", "index.html")), "home")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import json
+import os
+import unittest
+
+import search
+from htmlnode import LeafNode, ParentNode
+from search import SearchIndex, page_terms
+from site_fixture import SiteTestCase
+
+
+class TestPageTerms(unittest.TestCase):
+    def test_weights(self):
+        node = ParentNode("div", [
+            ParentNode("h1", [LeafNode(None, "Tom Bombadil")]),
+            ParentNode("p", [LeafNode(None, "Tom sings, "), LeafNode("b", "tom")]),
+            ParentNode("pre", [LeafNode("code", "print(tom)")]),
+        ])
+        self.assertEqual(page_terms(node), {"tom": 5, "bombadil": 3, "sings": 1})
+
+
+class TestSearchIndex(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("a/index.md", "# Alpha\n\nshared words")
+        self.write("b/index.md", "# Beta\n\nshared")
+        self.write("c/index.md", "# Gamma\n\nshared")
+        search.enable_search()
+        self.addCleanup(search.enable_search, False)
+
+    def index(self):
+        index = None
+
+        def finish(manifest):
+            nonlocal index
+            index = SearchIndex(manifest, "/").build().write()
+        self.build(finish)
+        return index
+
+    def load(self, *parts):
+        return json.loads(self.read("search", *parts))
+
+    def test_index(self):
+        self.index()
+        self.assertEqual(self.load("index.json")["docs"], [["/a/", "Alpha"], ["/b/", "Beta"], ["/c/", "Gamma"]])
+        self.assertEqual(self.load("terms", "sh.json"), {"shared": [[0, 1], [1, 1], [2, 1]]})
+        self.assertEqual(self.load("terms", "al.json"), {"alpha": [[0, 3]]})
+
+    def test_only_changed_shards_rewritten(self):
+        self.index()
+        index = self.index()
+        self.assertEqual(index.written, 0)
+        self.write("b/index.md", "# Beta\n\nshared bravo")
+        index = self.index()
+        self.assertEqual(index.written, 2)                              # Only the new term's shard, and the list of shards
+        self.assertEqual(self.load("terms", "br.json"), {"bravo": [[1, 1]]})
+
+    def test_ids_are_stable(self):
+        self.index()
+        os.remove(os.path.join(self.content, "a/index.md"))
+        self.index()
+        self.assertEqual(self.load("index.json")["docs"], [None, ["/b/", "Beta"], ["/c/", "Gamma"]])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "search", "terms", "al.json")))
+        self.write("d/index.md", "# Delta")                             # A new page takes the freed id
+        self.index()
+        self.assertEqual(self.load("index.json")["docs"], [["/d/", "Delta"], ["/b/", "Beta"], ["/c/", "Gamma"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
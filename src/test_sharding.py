@@ -0,0 +1,77 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+
+import search
+from gencontent import check_facts, collect_pages, generate_pages_recursive
+from manifest import BuildManifest
+from search import SearchIndex
+from sharding import in_shard, merge_shards, parse_shard, shard_dir, shard_manifest, shard_of
+from site_fixture import SiteTestCase
+
+
+class TestSharding(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(12):
+            self.write(os.path.join(f"section{i % 3}", f"page{i}.md"), f"# Page {i}")
+
+    def build_shard(self, shard):
+        dest = shard_dir(self.root, shard)
+        manifest = BuildManifest(shard_manifest(self.manifest_path, shard), dest)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, dest, "/", manifest, shard=shard)
+        manifest.save()
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for text in ["0/4", "5/4", "a/4", "2"]:
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_shard_names(self):
+        self.assertEqual(shard_dir("./docs/", (1, 4)), "./docs.shard-1-of-4")
+        self.assertEqual(shard_manifest("./.build-manifest.json", (1, 4)), "./.build-manifest.shard-1-of-4.json")
+
+    def test_shards_partition_pages(self):
+        self.assertEqual(shard_of("blog/tom/index.html", 4), shard_of("blog/tom/index.html", 4))
+        pages = [dest for _, dest in collect_pages(self.content, self.root)]
+        owners = [[n for n in range(1, 4) if in_shard(dest, self.root, (n, 3))] for dest in pages]
+        self.assertTrue(all(len(owner) == 1 for owner in owners))      # Every page is in exactly one shard
+
+    def test_merge(self):
+        for n in range(1, 4):
+            self.build_shard((n, 3))
+        merge_shards(self.root, self.manifest_path, 3).save()
+        for _, dest in collect_pages(self.content, self.root):
+            self.assertTrue(os.path.isfile(dest))
+        manifest = BuildManifest.load(self.manifest_path, self.root)
+        self.assertEqual(len(manifest.entries), 12)
+
+    def test_merge_requires_the_same_flags(self):
+        for n in range(1, 3):                                           # Shards built without '--search',
+            self.build_shard((n, 2))
+        self.addCleanup(search.enable_search, False)
+        search.enable_search()                                          #   merged with it
+        with self.assertRaises(ValueError) as context:
+            merge_shards(self.root, self.manifest_path, 2, check_facts)
+        self.assertIn("12 page(s) lack", str(context.exception))
+        self.assertFalse(os.path.exists(self.root))                   # Nothing was published
+        for n in range(1, 3):                                           # Once they're built with it too, the index has every page
+            self.build_shard((n, 2))
+        def finish(merged):
+            check_facts(merged)
+            SearchIndex(merged, "/").build().write()
+        merge_shards(self.root, self.manifest_path, 2, finish)
+        self.assertEqual(len(json.loads(self.read("search", "index.json"))["docs"]), 12)
+
+    def test_merge_requires_every_shard(self):
+        self.build_shard((1, 2))
+        with self.assertRaises(FileNotFoundError):
+            merge_shards(self.root, self.manifest_path, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest import mock
+
+import sitemap
+from manifest import BuildManifest
+from markdown_blocks import markdown_to_html_node
+from site_fixture import SiteTestCase
+from sitemap import page_metadata, page_records, write_site_files
+
+
+MTIME = 1_700_000_000 * 10**9   # 2023-11-14T22:13:20Z
+
+
+class TestPageMetadata(unittest.TestCase):
+    def test_metadata(self):
+        node = markdown_to_html_node("# Tom Bombadil\n\nOld Tom is **merry**,\nhey dol!\n\nSecond paragraph.\n\n```\nnot words?\n```")
+        self.assertEqual(page_metadata(node), {"words": 12, "summary": "Old Tom is merry, hey dol!"})
+
+
+class TestSiteFiles(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("index.md", "# Home & away\n\nWelcome <home>.", MTIME)
+        self.write("blog/tom.md", "Old Tom Bombadil.\n# Tom", MTIME)       # A title needn't start its block
+        sitemap.enable_metadata()
+        self.addCleanup(sitemap.enable_metadata, False)
+
+    def build_site(self):
+        return self.build(lambda manifest: write_site_files(manifest, "https://example.com/", "/site/"), "/site/")
+
+    def test_records(self):
+        records = page_records(self.generate(BuildManifest(self.manifest_path, self.root), "/site/"), "/site/")
+        self.assertEqual([(r["url"], r["title"], r["words"], r["summary"]) for r in records],
+                         [("/site/blog/tom.html", "Tom", 4, "Old Tom Bombadil. # Tom"),
+                          ("/site/", "Home & away", 4, "Welcome <home>.")])
+        self.assertEqual(records[0]["modified"].year, 2023)
+
+    def test_sitemap_and_feed(self):
+        self.build_site()
+        self.assertIn("<loc>https://example.com/site/blog/tom.html</loc>\n    <lastmod>2023-11-14T22:13:20Z</lastmod>",
+                      self.read("sitemap.xml"))
+        feed = self.read("feed.xml")
+        self.assertIn("<title>Home &amp; away</title>\n  <link>https://example.com/site/</link>", feed)
+        self.assertIn("<description>Welcome &lt;home&gt;.</description>", feed)
+        self.assertIn("<pubDate>Tue, 14 Nov 2023 22:13:20 +0000</pubDate>", feed)
+
+    def test_unchanged_sources_not_read(self):
+        self.build_site()
+        feed = self.read("feed.xml")
+        with mock.patch("gencontent.parse_page", side_effect=AssertionError("source read")):
+            manifest = self.build_site()
+        self.assertEqual(self.read("feed.xml"), feed)
+        self.assertIn("sitemap.xml", manifest.current)
+
+if __name__ == "__main__":
+    unittest.main()
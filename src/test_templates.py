@@ -0,0 +1,102 @@
+import os
+import unittest
+
+from site_fixture import SiteTestCase, write_file
+from templates import (
+    CompiledTemplate,
+    TemplateRegistry,
+    clear_template_cache,
+    load_template,
+)
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    def test_segments(self):
+        template = CompiledTemplate(
+            '<title>{{ Title }}</title><a href="/">home</a>{{ Content }}', "/site/"
+        )
+        self.assertEqual(
+            template.segments,
+            [
+                (None, "<title>"),
+                ("Title", None),
+                (None, '</title><a href="/site/">home</a>'),
+                ("Content", None),
+                (None, ""),
+            ],
+        )
+
+    def test_render(self):
+        template = CompiledTemplate(
+            '<link href="/index.css"><h1>{{ Title }}</h1>{{ Content }}<img src="/a.png">',
+            "/base/",
+        )
+        self.assertEqual(
+            template.render(Title="Home", Content="<p>hi</p>"),
+            '<link href="/base/index.css"><h1>Home</h1><p>hi</p><img src="/base/a.png">',
+        )
+
+    def test_render_leaves_values_untouched(self):
+        template = CompiledTemplate("{{ Content }}", "/base/")
+        self.assertEqual(
+            template.render(Content='<a href="/x">'),
+            '<a href="/x">',
+        )
+
+    def test_iter_render_streams_chunks(self):
+        template = CompiledTemplate("<h1>{{ Title }}</h1>{{ Content }}", "/")
+        self.assertEqual(
+            list(template.iter_render(Title="t", Content=iter(["<p>", "a", "</p>"]))),
+            ["<h1>", "t", "</h1>", "<p>", "a", "</p>", ""],
+        )
+
+    def test_unknown_placeholder_is_chrome(self):
+        template = CompiledTemplate("{{ Other }}{{ Title }}", "/")
+        self.assertEqual(template.render(Title="t"), "{{ Other }}t")
+
+    def test_chrome_links_resolved(self):
+        template = CompiledTemplate('<a href="/a"><img src="/b">{{ Content }}<a href="http://x">', "/p/")
+        self.assertEqual(
+            template.render(Content='<a href="/c">'),
+            '<a href="/p/a"><img src="/p/b"><a href="/c"><a href="http://x">',
+        )
+
+
+class TestTemplateRegistry(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write_file(self.template, "default {{ Content }}")
+        write_file(os.path.join(self.templates, "blog.html"), "blog {{ Content }}")
+        clear_template_cache()
+        self.addCleanup(clear_template_cache)
+
+    def test_template_for_section(self):
+        registry = TemplateRegistry(self.template, self.templates, self.content)
+        blog_page = os.path.join(self.content, "blog", "tom", "index.md")
+        other_page = os.path.join(self.content, "contact", "index.md")
+        top_page = os.path.join(self.content, "blog.md")
+        self.assertEqual(
+            registry.template_for(blog_page), os.path.join(self.templates, "blog.html")
+        )
+        self.assertEqual(registry.template_for(other_page), self.template)
+        self.assertEqual(registry.template_for(top_page), self.template)
+
+    def test_missing_template_dir(self):
+        registry = TemplateRegistry(self.template, self.path("none"))
+        self.assertEqual(registry.paths, {})
+        self.assertEqual(registry.path_for("blog"), self.template)
+
+    def test_get_named(self):
+        registry = TemplateRegistry(self.template, self.templates)
+        self.assertEqual(registry.get("blog", "/").render(Content="x"), "blog x")
+
+    def test_load_template_cached(self):
+        first = load_template(self.template, "/")
+        write_file(self.template, "changed {{ Content }}")
+        self.assertIs(load_template(self.template, "/"), first)
+        clear_template_cache()
+        self.assertEqual(load_template(self.template, "/").render(Content="x"), "changed x")
+
+
+if __name__ == "__main__":
+    unittest.main()
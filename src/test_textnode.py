@@ -1,6 +1,7 @@
 import unittest
 
 from textnode import TextNode, TextType, text_node_to_html_node
+from urls import URLResolver
 
 
 class TestTextNode(unittest.TestCase):
@@ -30,6 +31,12 @@ class TestTextNode(unittest.TestCase):
             "TextNode(This is a text node, text, https://www.boot.dev)", repr(node)
         )
 
+    def test_slots(self):
+        node = TextNode("This is a text node", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = "not allowed"
+
 
 class TestTextNodeToHTMLNode(unittest.TestCase):
     def test_text(self):
@@ -54,6 +61,13 @@ class TestTextNodeToHTMLNode(unittest.TestCase):
         self.assertEqual(html_node.tag, "b")
         self.assertEqual(html_node.value, "This is bold")
 
+    def test_link_resolved(self):
+        resolver = URLResolver("/site/")
+        link = text_node_to_html_node(TextNode("home", TextType.LINK, "/blog"), resolver)
+        self.assertEqual(link.props, {"href": "/site/blog"})
+        image = text_node_to_html_node(TextNode("alt", TextType.IMAGE, "https://x/a.png"), resolver)
+        self.assertEqual(image.props, {"src": "https://x/a.png", "alt": "alt"})
+
 
 if __name__ == "__main__":
     unittest.main()
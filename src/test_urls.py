@@ -0,0 +1,45 @@
+import unittest
+
+from markdown_blocks import markdown_to_html_node
+from urls import URLResolver, get_resolver, page_url
+
+
+class TestURLResolver(unittest.TestCase):
+    def test_resolve(self):
+        resolver = URLResolver("/site/")
+        self.assertEqual(resolver.resolve("/"), "/site/")
+        self.assertEqual(resolver.resolve("/blog/tom"), "/site/blog/tom")
+        self.assertEqual(resolver.resolve("https://example.com/"), "https://example.com/")
+        self.assertEqual(resolver.resolve("#top"), "#top")
+        self.assertEqual(resolver.cache["/blog/tom"], "/site/blog/tom")
+
+    def test_resolve_html(self):
+        resolver = URLResolver("/site/")
+        self.assertEqual(
+            resolver.resolve_html('<link href="/index.css"><script src="/a.js"></script><a href="x">'),
+            '<link href="/site/index.css"><script src="/site/a.js"></script><a href="x">',
+        )
+
+    def test_get_resolver_shared(self):
+        self.assertIs(get_resolver("/site/"), get_resolver("/site/"))
+        self.assertIsNot(get_resolver("/site/"), get_resolver("/"))
+
+    def test_only_links_resolved(self):
+        md = '[home](/) and `href="/raw"`\n\n```\n<a href="/code">\n```'
+        html = markdown_to_html_node(md, URLResolver("/site/")).to_html()
+        self.assertEqual(
+            html,
+            '<div><p><a href="/site/">home</a> and <code>href="/raw"</code></p>'
+            '<pre><code><a href="/code">\n</code></pre></div>',
+        )
+
+
+class TestPageURL(unittest.TestCase):
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html", "/site/"), "/site/")
+        self.assertEqual(page_url("blog/tom/index.html", "/site/"), "/site/blog/tom/")
+        self.assertEqual(page_url("about.html", "/"), "/about.html")
+
+
+if __name__ == "__main__":
+    unittest.main()
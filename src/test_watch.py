@@ -0,0 +1,70 @@
+import os
+import unittest
+
+from gencontent import generate_pages_recursive
+from manifest import BuildManifest
+from site_fixture import SiteTestCase, read_file, write_file
+from watch import SiteWatcher, Watcher, is_under
+
+
+class TestWatch(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("index.md", "# Home")
+        self.write(os.path.join("blog", "index.md"), "# Blog")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+
+    def test_is_under(self):
+        self.assertTrue(is_under(os.path.join("content", "a.md"), "content"))
+        self.assertFalse(is_under(os.path.join("contents", "a.md"), "content"))
+        self.assertFalse(is_under("content", None))
+
+    def test_poll(self):
+        watcher = Watcher([self.content, self.template])
+        self.assertEqual(watcher.poll(), ([], []))
+        home = os.path.join(self.content, "index.md")
+        write_file(home, "# Home, edited")
+        new_page = os.path.join(self.content, "new.md")
+        write_file(new_page, "# New")
+        blog = os.path.join(self.content, "blog", "index.md")
+        os.remove(blog)
+        self.assertEqual(watcher.poll(), (sorted([home, new_page]), [blog]))
+        self.assertEqual(watcher.poll(), ([], []))
+
+    def test_rebuild_only_changed(self):
+        manifest = BuildManifest(self.manifest_path, self.root)
+        generate_pages_recursive(self.content, self.template, self.root, "/", manifest)
+        manifest.rebase()
+        site = SiteWatcher(self.content, self.static, self.template, self.templates,
+                           self.root, "/", manifest)
+
+        blog_html = os.path.join(self.root, "blog", "index.html")
+        write_file(blog_html, "untouched")
+        home = os.path.join(self.content, "index.md")
+        write_file(home, "# Edited")
+        site.rebuild([home, os.path.join(self.static, "index.css")], [])
+        self.assertEqual(self.read("index.html"), "Edited|<div><h1>Edited</h1></div>")
+        self.assertEqual(read_file(blog_html), "untouched")
+        self.assertEqual(self.read("index.css"), "body {}")
+
+        blog = os.path.join(self.content, "blog", "index.md")
+        os.remove(blog)
+        site.rebuild([], [blog])
+        self.assertFalse(os.path.exists(blog_html))
+        self.assertNotIn("blog/index.html", BuildManifest.load(manifest.path, self.root).entries)
+
+    def test_template_change_regenerates(self):
+        manifest = BuildManifest(self.manifest_path, self.root)
+        generate_pages_recursive(self.content, self.template, self.root, "/", manifest)
+        manifest.rebase()
+        site = SiteWatcher(self.content, self.static, self.template, self.templates,
+                           self.root, "/", manifest)
+        blog_template = os.path.join(self.templates, "blog.html")
+        write_file(blog_template, "blog: {{ Title }}")
+        site.rebuild([blog_template], [])
+        self.assertEqual(self.read("blog", "index.html"), "blog: Blog")
+        self.assertEqual(self.read("index.html"), "Home|<div><h1>Home</h1></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,6 +12,8 @@ class TextType(Enum):       ## Enumeration of text types, each representing a di
 
 
 class TextNode:                                        ## Represents a unit of formatted text, including plain, blod, italic, code, links, and images.
+    __slots__ = ("text", "text_type", "url")           # Fixed attributes instead of a per-instance __dict__, since every inline fragment is a TextNode
+
     def __init__(self, text, text_type, url=None):     # Inittialize a TextNode with text content, type, and an optional URL (for links and images)
         self.text = text                               # The main content of the node (the displayed text)
         self.text_type = text_type                     # The type of text (TextType Enum)
@@ -26,7 +28,7 @@ class TextNode:                                        ## Represents a unit of f
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
 
-def text_node_to_html_node(text_node):                                              ## Converts a TextNode object into a LeafNode HTML representation based on its text_type.
+def text_node_to_html_node(text_node, resolver=None):                               ## Converts a TextNode object into a LeafNode HTML representation based on its text_type.
     if text_node.text_type == TextType.TEXT:                                        # 'plain text', (no tag)
         return LeafNode(None, text_node.text) 
     if text_node.text_type == TextType.BOLD:                                        # 'bold text', (<b>)
@@ -36,7 +38,13 @@ def text_node_to_html_node(text_node):
     if text_node.text_type == TextType.CODE:                                        # 'code text', (<code>)
         return LeafNode("code", text_node.text)   
     if text_node.text_type == TextType.LINK:                                        # 'link text', (<a> with href)
-        return LeafNode("a", text_node.text, {"href": text_node.url})  
+        return LeafNode("a", text_node.text, {"href": resolve_url(text_node.url, resolver)})
     if text_node.text_type == TextType.IMAGE:                                       # 'image text', (<img> with src and alt)
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})   
-    raise ValueError(f"invalid text type: {text_node.text_type}")                   # Raise an error for unsupported or invalid text types
\ No newline at end of file
+        return LeafNode("img", "", {"src": resolve_url(text_node.url, resolver), "alt": text_node.text})
+    raise ValueError(f"invalid text type: {text_node.text_type}")                   # Raise an error for unsupported or invalid text types
+
+
+def resolve_url(url, resolver):                                                     ## The URL as written into the page: resolved (e.g. given the base path) if there's a resolver
+    if resolver is None:
+        return url
+    return resolver.resolve(url)
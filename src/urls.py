@@ -0,0 +1,74 @@
+import re
+
+from manifest import hash_inputs
+
+
+LINK_PATTERN = re.compile(r'(href|src)="(/[^"]*)')      # Root-relative link attributes in raw HTML, e.g. 'href="/blog"'
+QUERY_PATTERN = re.compile(r"[?#]")                     # Start of a URL's query string or fragment
+
+asset_urls = {}     # Root-relative URL of a static file -> the (fingerprinted) URL it's served at, for every resolver
+
+
+class URLResolver:                                              ## Turns the URLs written in markdown and templates into the URLs the built site uses
+    def __init__(self, basepath):
+        self.basepath = basepath                                # Base path the site is served from, e.g. "/static-site-generator/"
+        self.cache = {}                                         # URL -> resolved URL, as pages link to the same URLs again and again
+
+    def resolve(self, url):                                     ## Returns the URL as emitted into the page: root-relative URLs get the base path
+        resolved = self.cache.get(url)
+        if resolved is None:
+            if url.startswith("/"):                             # '/blog' -> '/static-site-generator/blog',
+                resolved = self.basepath + rename_asset(url)[1:]    #   with static files under their served name
+            else:                                               #   anything else (external, relative, anchors) is left alone
+                resolved = url
+            self.cache[url] = resolved
+        return resolved
+
+    def resolve_html(self, html):                               ## Resolves the href/src links in raw HTML, e.g. a template's static chrome
+        return LINK_PATTERN.sub(lambda match: f'{match.group(1)}="{self.resolve(match.group(2))}', html)
+
+
+class LinkCollector:                                            ## Wraps a resolver, recording every URL it resolves (the links and images of one page)
+    def __init__(self, resolver):
+        self.resolver = resolver
+        self.links = set()                                      # URLs as written in the markdown, before resolving
+
+    def resolve(self, url):
+        self.links.add(url)
+        return self.resolver.resolve(url)
+
+
+def rename_asset(url):                                          ## A root-relative URL with its path replaced by the asset's served URL, if it has one
+    if not asset_urls:
+        return url
+    match = QUERY_PATTERN.search(url)
+    split = match.start() if match else len(url)                # '/a.png?v=1' keeps its '?v=1'
+    return asset_urls.get(url[:split], url[:split]) + url[split:]
+
+
+def set_asset_urls(urls):                                       ## Sets the URLs static files are served at, e.g. after fingerprinting
+    global asset_urls
+    asset_urls = dict(urls)
+    _resolvers.clear()                                          # Resolved URLs cached with the previous mapping no longer hold
+
+
+def asset_urls_digest():                                        ## Digest of the asset URLs, which every page depends on ("" without any)
+    if not asset_urls:
+        return ""
+    return hash_inputs(*(part for item in sorted(asset_urls.items()) for part in item))
+
+
+_resolvers = {}     # Resolvers created by this process: basepath -> URLResolver
+
+
+def get_resolver(basepath):                                     ## The resolver for a base path, shared by every page (and its cache with it)
+    resolver = _resolvers.get(basepath)
+    if resolver is None:
+        resolver = _resolvers[basepath] = URLResolver(basepath)
+    return resolver
+
+
+def page_url(key, basepath):                                    ## The URL a page is served at, from its manifest key: 'blog/tom/index.html' -> '/blog/tom/'
+    if key == "index.html" or key.endswith("/index.html"):
+        key = key[:-len("index.html")]
+    return basepath + key
@@ -0,0 +1,123 @@
+import os
+import time
+
+from compress import DEFAULT_MIN_SIZE, compress_outputs
+from copystatic import stat_digest, transfer_file
+from gencontent import generate_pages, generate_pages_recursive, page_for
+from search import SearchIndex
+from sitemap import write_site_files
+from templates import TemplateRegistry
+
+
+def snapshot(paths):                                            ## Returns {file path: (size, modification time)} for every file under 'paths'
+    state = {}
+    for path in paths:                                          # 'paths' may mix files and directories,
+        if os.path.isfile(path):                                #   a file is recorded directly,
+            stat = os.stat(path)
+            state[path] = (stat.st_size, stat.st_mtime_ns)
+        elif os.path.isdir(path):                               #   a directory is walked recursively,
+            _snapshot_dir(path, state)                          #   and missing paths are simply skipped
+    return state
+
+
+def _snapshot_dir(dir_path, state):                             ## Adds every file under 'dir_path' to 'state', using `scandir` to avoid extra calls
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                _snapshot_dir(entry.path, state)
+            elif entry.is_file():
+                stat = entry.stat()
+                state[entry.path] = (stat.st_size, stat.st_mtime_ns)
+
+
+def is_under(path, dir_path):                                   ## True if 'path' lies inside the directory 'dir_path'
+    return dir_path is not None and path.startswith(os.path.join(dir_path, ""))
+
+
+class Watcher:                                                  ## Polls a set of files and directories for changes, without any external dependency
+    def __init__(self, paths):
+        self.paths = paths                                      # Files and directories being watched
+        self.state = snapshot(paths)                            # What they looked like at the last poll
+
+    def poll(self):                                             ## Returns (changed, removed) paths since the last poll; 'changed' includes new files
+        state = snapshot(self.paths)
+        changed = sorted(path for path, signature in state.items() if self.state.get(path) != signature)
+        removed = sorted(path for path in self.state if path not in state)
+        self.state = state
+        return changed, removed
+
+
+class SiteWatcher:                                              ## Keeps a built site up to date, rebuilding only the outputs affected by each change
+    def __init__(self, dir_path_content, dir_path_static, template_path, dir_path_templates,
+                 dir_path_public, basepath, manifest, link=None, compress=False, compress_min_size=DEFAULT_MIN_SIZE, search=False, site_url=None):
+        self.content = dir_path_content                         # Markdown pages,
+        self.static = dir_path_static                           #   static assets,
+        self.template_path = template_path                      #   the default template,
+        self.template_dir = dir_path_templates                  #   and the named templates are watched,
+        self.public = dir_path_public                           #   while the site is written to the public directory
+        self.basepath = basepath
+        self.manifest = manifest                                # Manifest of the current build, kept up to date between rebuilds
+        self.link = link                                        # How static files are placed ('hardlink', 'reflink' or copied)
+        self.compress = compress                                # Whether outputs get pre-compressed siblings,
+        self.compress_min_size = compress_min_size              #   and from what size
+        self.search = search                                    # Whether the search index is kept up to date,
+        self.site_url = site_url                                #   and the sitemap and feed (for the site at this URL)
+        self.templates = TemplateRegistry(template_path, dir_path_templates, dir_path_content)
+        self.watcher = Watcher([dir_path_content, dir_path_static, template_path, dir_path_templates])
+
+    def rebuild(self, changed, removed):                        ## Regenerates the pages and copies the assets affected by the given changes
+        template_changed = any(path == self.template_path or is_under(path, self.template_dir)
+                               for path in changed + removed)
+        if template_changed:                                    # A template changed: every page is checked against the
+            print(" * templates changed, regenerating affected pages...")   # manifest, and only pages built from it are regenerated
+            self.templates = TemplateRegistry(self.template_path, self.template_dir, self.content)
+            generate_pages_recursive(self.content, self.template_path, self.public, self.basepath,
+                                     self.manifest, 1, self.template_dir)
+        else:                                                   # Otherwise only the changed markdown files are regenerated
+            pages = [page_for(path, self.content, self.public) for path in changed if is_under(path, self.content)]
+            generate_pages(pages, self.template_path, self.basepath, self.manifest, 1, self.templates)
+
+        for path in changed:                                    # Changed static files are copied again,
+            if is_under(path, self.static):
+                dest_path = os.path.join(self.public, os.path.relpath(path, self.static))
+                print(f" * {path} -> {dest_path}")
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                transfer_file(path, dest_path, self.link)
+                self.manifest.record(dest_path, path, stat_digest(os.stat(path)))
+
+        for path in removed:                                    # and the outputs of removed pages and assets are deleted
+            if is_under(path, self.content):
+                dest_path = page_for(path, self.content, self.public)[1]
+            elif is_under(path, self.static):
+                dest_path = os.path.join(self.public, os.path.relpath(path, self.static))
+            else:
+                continue
+            if self.manifest.forget(dest_path):
+                print(f" * removed {dest_path}")
+
+        if self.search:                                         # The index is rebuilt from the terms in the manifest; only changed shards are written
+            SearchIndex(self.manifest, self.basepath).build().write()
+        if self.site_url:
+            write_site_files(self.manifest, self.site_url, self.basepath)
+        compress_outputs(self.manifest, self.compress, self.compress_min_size)  # Siblings of rebuilt outputs are brought up to date
+
+        self.manifest.save()                                    # Remember the new state, both on disk
+        self.manifest.rebase()                                  #   and as the baseline for the next rebuild
+
+    def run(self, interval):                                    ## Polls for changes every 'interval' seconds until interrupted
+        print("Watching for changes (press Ctrl+C to stop)...")
+        try:
+            while True:
+                time.sleep(interval)
+                changed, removed = self.watcher.poll()
+                if not changed and not removed:                 # Nothing to do until something changes
+                    continue
+                started = time.perf_counter()
+                try:
+                    self.rebuild(changed, removed)
+                except Exception as e:                          # A broken page shouldn't stop the watcher,
+                    print(f" ! rebuild failed: {type(e).__name__}: {e}")    # the next edit may well fix it
+                    continue
+                print(f"Rebuilt in {(time.perf_counter() - started) * 1000:.1f} ms")
+        except KeyboardInterrupt:
+            print("Stopped watching.")